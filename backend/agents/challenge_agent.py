@@ -1,9 +1,11 @@
 # agents/challenge_agent.py
 
 from typing import Dict, Any, Optional
-import json
 
-from services.llm_client import call_gemini
+from services.llm_client import call_gemini, estimate_tokens, input_budget
+from services.prompt_budget import compact_json, fit_sections
+from services.llm_output import parse_model_json
+from agents.output_schemas import ChallengeOutput, EvalOutput
 from services.opik_client import create_opik_tracer
 
 # -----------------------------------------------------------------------------
@@ -70,13 +72,13 @@ Output STRICT JSON:
 }
 """
 
-def eval_challenge_quality(node: Dict[str, Any], challenge_json: Dict[str, Any]):
+def eval_challenge_quality(node: Dict[str, Any], challenge_json: Dict[str, Any], span=None):
     eval_user_msg = f"""
 Learning node:
-{json.dumps(node, indent=2)}
+{compact_json(node)}
 
 Generated challenge:
-{json.dumps(challenge_json, indent=2)}
+{compact_json(challenge_json)}
 
 Evaluate this challenge.
 """
@@ -84,8 +86,11 @@ Evaluate this challenge.
         raw = call_gemini(
             system_instruction=CHALLENGE_EVAL_SYSTEM_PROMPT,
             user_message=eval_user_msg,
+            response_schema=EvalOutput,
+            agent="challenge_eval",
+            span=span,
         )
-        parsed = json.loads(raw)
+        parsed = parse_model_json(raw, agent="challenge_eval", schema=EvalOutput)
         return parsed.get("overall_score", 0.0), parsed
     except Exception:
         return 0.5, {"error": "challenge_eval_failed"}
@@ -122,25 +127,29 @@ def run_challenge_agent(
 Domain hint: {domain_hint or "N/A"}
 
 Node to build challenge for:
-{json.dumps(node, indent=2)}
+{compact_json(node)}
 
 ---
 Research Content to base the challenge on:
+"""
+    instructions = """
+---
+Create ONE challenge as described in the system prompt, based primarily on the provided research content.
 """
     if research_context:
-        for item in research_context:
-            # Truncate content to avoid excessive prompt length.
-            # This is a simple strategy; more advanced would be summarization or embedding-based search.
-            content_preview = (item.get('content', '') or '')[:3000]
-            user_msg += f"\nURL: {item.get('url', 'N/A')}\nContent Preview:\n{content_preview}\n---"
+        # Share what is left of the input budget across the research pages.
+        content_budget = (
+            input_budget("challenge")
+            - estimate_tokens(CHALLENGE_SYSTEM_PROMPT)
+            - estimate_tokens(user_msg + instructions)
+        )
+        for item in fit_sections(research_context, content_budget):
+            user_msg += f"\nURL: {item.get('url', 'N/A')}\nContent Preview:\n{item.get('content') or ''}\n---"
     else:
         user_msg += "\nNo external research content provided."
 
 
-    user_msg += """
----
-Create ONE challenge as described in the system prompt, based primarily on the provided research content.
-"""
+    user_msg += instructions
 
     span = None
     if opik_tracer:
@@ -160,6 +169,9 @@ Create ONE challenge as described in the system prompt, based primarily on the p
         raw_output = call_gemini(
             system_instruction=CHALLENGE_SYSTEM_PROMPT,
             user_message=user_msg,
+            response_schema=ChallengeOutput,
+            agent="challenge",
+            span=span,
         )
 
         if span:
@@ -169,7 +181,7 @@ Create ONE challenge as described in the system prompt, based primarily on the p
             )
 
         try:
-            parsed = json.loads(raw_output)
+            parsed = parse_model_json(raw_output, agent="challenge", schema=ChallengeOutput)
         except Exception as parse_error:
             parsed = {
                 "error": "invalid_json_from_model",
@@ -190,7 +202,7 @@ Create ONE challenge as described in the system prompt, based primarily on the p
                 )
 
         # ---- Evaluation hook ---------------------------------------
-        score, details = eval_challenge_quality(node, parsed)
+        score, details = eval_challenge_quality(node, parsed, span=span)
         if span:
             span.add_evaluation(
                 name="challenge_quality",
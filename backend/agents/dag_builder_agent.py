@@ -1,10 +1,14 @@
 # agents/dag_builder_agent.py
 
-from typing import Dict, Any, Optional
-import json
+from typing import Dict, Any, Iterator, Optional, Tuple
 
-from services.llm_client import call_gemini
+from services.llm_client import call_gemini, stream_gemini
+from services.prompt_budget import compact_json
+from services.json_stream import iter_object_events
+from services.llm_output import PARSE_ATTEMPTS, PARSE_FAILURES, parse_model_json
+from agents.output_schemas import DagOutput, EvalOutput, RemedialNodeOutput
 from services.opik_client import create_opik_tracer
+from graph.validate import repair_dag
 
 # -----------------------------------------------------------------------------
 # System Prompt
@@ -75,21 +79,72 @@ Output STRICT JSON:
 }
 """
 
-def eval_dag_quality(goal_title: str, dag_json: Dict[str, Any]):
+# Used when graph.validate has already checked (and repaired) the structure
+DAG_EVAL_CONTENT_SYSTEM_PROMPT = """
+You are an expert curriculum evaluator.
+
+You are evaluating a learning DAG for a user goal. Its structure (acyclic,
+valid references) has already been verified; do not assess it.
+
+Assess the DAG on:
+1. Learning progression (concepts build logically)
+2. Coverage (important areas not missing or duplicated)
+
+Score each dimension from 0-5.
+Provide an overall score between 0.0 and 1.0.
+
+Output STRICT JSON:
+{
+  "dimension_scores": [
+    { "name": "Progression", "score": 0-5, "comment": "..." },
+    { "name": "Coverage", "score": 0-5, "comment": "..." }
+  ],
+  "overall_score": 0.0,
+  "summary": "Brief evaluation summary"
+}
+"""
+
+def eval_dag_quality(
+    goal_title: str,
+    dag_json: Dict[str, Any],
+    span=None,
+    structure: Optional[Dict[str, Any]] = None,
+):
+    """
+    `structure` is a graph.validate report (DagReport.as_metadata()); when
+    given, the model only judges content and the Structure dimension comes
+    from the report.
+    """
     eval_user_msg = f"""
 User goal: {goal_title}
 
 Generated DAG JSON:
-{json.dumps(dag_json, indent=2)}
+{compact_json(dag_json)}
 
 Please evaluate this DAG.
 """
     try:
         raw = call_gemini(
-            system_instruction=DAG_EVAL_SYSTEM_PROMPT,
+            system_instruction=DAG_EVAL_CONTENT_SYSTEM_PROMPT if structure else DAG_EVAL_SYSTEM_PROMPT,
             user_message=eval_user_msg,
+            response_schema=EvalOutput,
+            agent="dag_eval",
+            span=span,
         )
-        parsed = json.loads(raw)
+        parsed = parse_model_json(raw, agent="dag_eval", schema=EvalOutput)
+        if structure:
+            # Three equally weighted dimensions, as in the full prompt
+            parsed["dimension_scores"] = [
+                {
+                    "name": "Structure",
+                    "score": structure["structure_score"],
+                    "comment": "validated locally" + (", repaired" if structure["repaired"] else ""),
+                },
+                *parsed.get("dimension_scores", []),
+            ]
+            parsed["overall_score"] = (
+                2 * parsed.get("overall_score", 0.0) + structure["structure_score"] / 5
+            ) / 3
         return parsed.get("overall_score", 0.0), parsed
     except Exception:
         return 0.5, {"error": "dag_evaluation_failed"}
@@ -112,6 +167,20 @@ opik_tracer = create_opik_tracer(
 # Agent Execution
 # -----------------------------------------------------------------------------
 
+def _build_dag_user_message(
+    goal_title: str,
+    competencies: Dict[str, Any],
+    user_background: Optional[str],
+) -> str:
+    return f"""
+    User goal: {goal_title}
+    User background (free text): {user_background or "N/A"}
+
+    Competencies JSON:
+    {compact_json(competencies)}
+    """
+
+
 def run_dag_builder_agent(
     user_id: str,
     goal_title: str,
@@ -123,13 +192,7 @@ def run_dag_builder_agent(
     Fully instrumented with core Opik tracing.
     """
 
-    user_msg = f"""
-    User goal: {goal_title}
-    User background (free text): {user_background or "N/A"}
-
-    Competencies JSON:
-    {json.dumps(competencies, indent=2)}
-    """
+    user_msg = _build_dag_user_message(goal_title, competencies, user_background)
 
     # ---- Start Opik span -----------------------------------------------------
     span = None
@@ -147,6 +210,9 @@ def run_dag_builder_agent(
         raw_output = call_gemini(
             system_instruction=DAG_BUILDER_SYSTEM_PROMPT,
             user_message=user_msg,
+            response_schema=DagOutput,
+            agent="dag_builder",
+            span=span,
         )
 
         if span:
@@ -156,7 +222,7 @@ def run_dag_builder_agent(
             )
 
         try:
-            parsed = json.loads(raw_output)
+            parsed = parse_model_json(raw_output, agent="dag_builder", schema=DagOutput)
         except Exception as parse_error:
             parsed = {
                 "summary": "",
@@ -174,7 +240,12 @@ def run_dag_builder_agent(
                     },
                 )
 
-        score, details = eval_dag_quality(goal_title, parsed)
+        parsed, report = repair_dag(parsed)
+        structure = report.as_metadata()
+        if span:
+            span.add_event(name="dag_validated", metadata=structure)
+
+        score, details = eval_dag_quality(goal_title, parsed, span=span, structure=structure)
         if span:
             span.add_evaluation(
                 name="dag_quality",
@@ -198,6 +269,101 @@ def run_dag_builder_agent(
             span.end()
 
 
+def stream_dag_builder_agent(
+    user_id: str,
+    goal_title: str,
+    competencies: Dict[str, Any],
+    user_background: Optional[str],
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming variant of run_dag_builder_agent.
+
+    Yields ("summary", str), ("node", dict) and ("edge", dict) events as soon
+    as each part of the DAG is complete in the model output, followed by a
+    final ("dag", dict) event with the assembled DAG once evaluation is done.
+    The streamed events are the raw model output; the final DAG has been
+    through graph.validate.repair_dag, so it may have fewer edges.
+    """
+
+    user_msg = _build_dag_user_message(goal_title, competencies, user_background)
+
+    span = None
+    if opik_tracer:
+        span = opik_tracer.start_span(
+            name="build_learning_dag_stream",
+            metadata={
+                "user_id": user_id,
+                "goal_title": goal_title,
+                "competencies_count": len(competencies.get("competencies", [])),
+            },
+        )
+
+    dag: Dict[str, Any] = {"summary": "", "nodes": [], "edges": []}
+
+    try:
+        chunks = stream_gemini(
+            system_instruction=DAG_BUILDER_SYSTEM_PROMPT,
+            user_message=user_msg,
+            response_schema=DagOutput,
+            agent="dag_builder",
+            span=span,
+        )
+
+        for kind, key, value in iter_object_events(chunks, array_keys=("nodes", "edges")):
+            if kind == "value" and key == "summary":
+                dag["summary"] = value or ""
+                yield "summary", dag["summary"]
+            elif kind == "item" and key == "nodes":
+                dag["nodes"].append(value)
+                yield "node", value
+            elif kind == "item" and key == "edges":
+                dag["edges"].append(value)
+                yield "edge", value
+
+        if span:
+            span.add_event(
+                name="model_stream_completed",
+                metadata={
+                    "nodes_count": len(dag["nodes"]),
+                    "edges_count": len(dag["edges"]),
+                },
+            )
+
+        PARSE_ATTEMPTS.inc(agent="dag_builder")
+        if not dag["nodes"]:
+            PARSE_FAILURES.inc(agent="dag_builder")
+            dag["error"] = "invalid_json_from_model"
+            if span:
+                span.add_event(name="json_parse_failure", metadata={"error": "no nodes streamed"})
+
+        dag, report = repair_dag(dag)
+        structure = report.as_metadata()
+        if span:
+            span.add_event(name="dag_validated", metadata=structure)
+
+        score, details = eval_dag_quality(goal_title, dag, span=span, structure=structure)
+        if span:
+            span.add_evaluation(
+                name="dag_quality",
+                score=score,
+                details=details,
+            )
+
+        yield "dag", dag
+
+    except Exception as exc:
+        if span:
+            span.add_event(
+                name="dag_builder_exception",
+                metadata={"error": str(exc)},
+            )
+        raise
+
+    finally:
+        if span:
+            span.end()
+
+
 # -----------------------------------------------------------------------------
 # Remedial Node Agent
 # -----------------------------------------------------------------------------
@@ -257,11 +423,14 @@ def run_remedial_node_agent(
         raw_output = call_gemini(
             system_instruction=REMEDIAL_NODE_SYSTEM_PROMPT,
             user_message=user_msg,
+            response_schema=RemedialNodeOutput,
+            agent="remedial_node",
+            span=span,
         )
         if span:
             span.add_event("remedial_model_response", {"raw_output": raw_output})
         
-        parsed = json.loads(raw_output)
+        parsed = parse_model_json(raw_output, agent="remedial_node", schema=RemedialNodeOutput)
         return parsed
 
     except Exception as exc:
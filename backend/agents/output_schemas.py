@@ -0,0 +1,104 @@
+# agents/output_schemas.py
+
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+# -----------------------------------------------------------------------------
+# Structured output schemas
+# -----------------------------------------------------------------------------
+#
+# One model per agent output. They are passed to call_gemini as the JSON
+# response schema and used to validate the parsed output.
+
+
+class DimensionScore(BaseModel):
+    name: str
+    score: float
+    comment: str = ""
+
+
+class EvalOutput(BaseModel):
+    dimension_scores: List[DimensionScore] = []
+    overall_score: float
+    summary: str = ""
+
+
+# ---- Research agent ---------------------------------------------------------
+
+class Competency(BaseModel):
+    id: str
+    name: str
+    description: str
+    type: str = "technical"
+    example_tasks: List[str] = []
+
+
+class ResearchOutput(BaseModel):
+    normalized_goal: str
+    competencies: List[Competency]
+
+
+# ---- DAG builder agent ------------------------------------------------------
+
+class DagNodeOutput(BaseModel):
+    id: str
+    title: str
+    description: str
+    node_type: str = "concept"
+    estimated_minutes: Optional[int] = None
+    tags: List[str] = []
+
+
+class DagEdgeOutput(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    from_: str = Field(alias="from")
+    to: str
+
+
+class DagOutput(BaseModel):
+    summary: str = ""
+    nodes: List[DagNodeOutput]
+    edges: List[DagEdgeOutput] = []
+
+
+class RemedialNodeOutput(BaseModel):
+    title: str
+    description: str
+    node_type: str = "concept"
+    estimated_minutes: Optional[int] = None
+    tags: List[str] = []
+
+
+# ---- Challenge agent --------------------------------------------------------
+
+class RubricDimension(BaseModel):
+    name: str
+    description: str = ""
+
+
+class Rubric(BaseModel):
+    dimensions: List[RubricDimension] = []
+    scoring_scale: str = "0-5"
+
+
+class ChallengeOutput(BaseModel):
+    challenge_type: Optional[str] = None
+    prompt: str
+    expected_answer_outline: List[str] = []
+    rubric: Rubric = Rubric()
+    difficulty: Optional[str] = None
+
+
+# ---- Tutor agent ------------------------------------------------------------
+
+class TutorOutput(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    dimension_scores: List[DimensionScore] = []
+    overall_score: float
+    pass_: bool = Field(alias="pass")
+    feedback_summary: str = ""
+    suggestions: List[str] = []
+    adaptation_suggestion: Optional[str] = None
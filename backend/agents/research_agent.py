@@ -1,9 +1,11 @@
 # agents/research_agent.py
 
 from typing import Dict, Any, Optional
-import json
 
-from services.llm_client import call_gemini, google_web_search, web_fetch
+from services.llm_client import call_gemini, estimate_tokens, input_budget, google_web_search, web_fetch
+from services.prompt_budget import compact_json, fit_sections, rank_sections
+from services.llm_output import parse_model_json
+from agents.output_schemas import EvalOutput, ResearchOutput
 from services.opik_client import create_opik_tracer
 
 # -----------------------------------------------------------------------------
@@ -80,7 +82,7 @@ Output STRICT JSON:
 }
 """
 
-def eval_research_quality(goal_title: str, competencies_json: Dict[str, Any]):
+def eval_research_quality(goal_title: str, competencies_json: Dict[str, Any], span=None):
     """
     Uses an LLM-as-judge to evaluate the quality of the generated competencies.
     """
@@ -88,7 +90,7 @@ def eval_research_quality(goal_title: str, competencies_json: Dict[str, Any]):
     User Goal: {goal_title}
 
     Generated Competencies JSON:
-    {json.dumps(competencies_json, indent=2)}
+    {compact_json(competencies_json)}
 
     Please evaluate the quality of this output based on the criteria provided.
     """
@@ -97,8 +99,11 @@ def eval_research_quality(goal_title: str, competencies_json: Dict[str, Any]):
         raw_output = call_gemini(
             system_instruction=EVAL_SYSTEM_PROMPT,
             user_message=eval_user_msg,
+            response_schema=EvalOutput,
+            agent="research_eval",
+            span=span,
         )
-        parsed_eval = json.loads(raw_output)
+        parsed_eval = parse_model_json(raw_output, agent="research_eval", schema=EvalOutput)
         return parsed_eval.get("overall_score", 0.0), parsed_eval
     except Exception:
         # In case of any failure (model call, JSON parse), return a neutral score
@@ -184,21 +189,32 @@ Level: {level or "N/A"}
 
 ---
 Research Content:
+"""
+        instructions = """
+---
+
+Derive competencies as described, primarily using the provided Research Content.
 """
         if fetched_content:
-            for item in fetched_content:
+            # Fit the most relevant pages into what is left of the input budget
+            content_budget = (
+                input_budget("research")
+                - estimate_tokens(RESEARCH_SYSTEM_PROMPT)
+                - estimate_tokens(user_msg + instructions)
+            )
+            ranked = rank_sections(f"{goal_title} {goal_description or ''}", fetched_content)
+            for item in fit_sections(ranked, content_budget):
                 user_msg += f"\nURL: {item['url']}\nContent:\n{item['content']}\n"
         else:
             user_msg += "\nNo external research content found. Relying on general knowledge."
 
-        user_msg += """
----
-
-Derive competencies as described, primarily using the provided Research Content.
-"""
+        user_msg += instructions
         raw_output = call_gemini(
             system_instruction=RESEARCH_SYSTEM_PROMPT,
             user_message=user_msg,
+            response_schema=ResearchOutput,
+            agent="research",
+            span=span,
         )
 
         if span:
@@ -208,7 +224,7 @@ Derive competencies as described, primarily using the provided Research Content.
             )
 
         try:
-            parsed = json.loads(raw_output)
+            parsed = parse_model_json(raw_output, agent="research", schema=ResearchOutput)
         except Exception as parse_error:
             parsed = {
                 "normalized_goal": goal_title,
@@ -226,7 +242,7 @@ Derive competencies as described, primarily using the provided Research Content.
                 )
 
         # ---- Evaluation hook --------------------------------------------------
-        score, details = eval_research_quality(goal_title, parsed)
+        score, details = eval_research_quality(goal_title, parsed, span=span)
         if span:
             span.add_evaluation(
                 name="research_quality",
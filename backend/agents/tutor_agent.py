@@ -1,9 +1,11 @@
 # agents/tutor_agent.py
 
 from typing import Dict, Any, Optional
-import json
 
-from services.llm_client import call_gemini
+from services.llm_client import call_gemini, input_budget, truncate_to_tokens
+from services.prompt_budget import compact_json
+from services.llm_output import parse_model_json
+from agents.output_schemas import EvalOutput, TutorOutput
 from services.opik_client import create_opik_tracer
 
 # -----------------------------------------------------------------------------
@@ -85,16 +87,17 @@ def eval_tutor_feedback(
     challenge: Dict[str, Any],
     user_answer: str,
     tutor_output: Dict[str, Any],
+    span=None,
 ):
     eval_user_msg = f"""
 Challenge:
-{json.dumps(challenge, indent=2)}
+{compact_json(challenge)}
 
 User answer:
-{user_answer}
+{truncate_to_tokens(user_answer, input_budget("tutor_eval") // 2)}
 
 Tutor feedback:
-{json.dumps(tutor_output, indent=2)}
+{compact_json(tutor_output)}
 
 Evaluate the tutor feedback.
 """
@@ -102,8 +105,11 @@ Evaluate the tutor feedback.
         raw = call_gemini(
             system_instruction=TUTOR_EVAL_SYSTEM_PROMPT,
             user_message=eval_user_msg,
+            response_schema=EvalOutput,
+            agent="tutor_eval",
+            span=span,
         )
-        parsed = json.loads(raw)
+        parsed = parse_model_json(raw, agent="tutor_eval", schema=EvalOutput)
         return parsed.get("overall_score", 0.0), parsed
     except Exception:
         return 0.5, {"error": "tutor_eval_failed"}
@@ -144,10 +150,10 @@ Expected answer outline:
 {challenge.get("expected_answer_outline", [])}
 
 Rubric:
-{challenge.get("rubric", {})}
+{compact_json(challenge.get("rubric", {}))}
 
 User answer:
-{user_answer}
+{truncate_to_tokens(user_answer, input_budget("tutor") // 2)}
 
 Attempts count: {attempts_count}
 Prior attempts summary (optional):
@@ -170,6 +176,9 @@ Prior attempts summary (optional):
         raw_output = call_gemini(
             system_instruction=TUTOR_SYSTEM_PROMPT,
             user_message=user_msg,
+            response_schema=TutorOutput,
+            agent="tutor",
+            span=span,
         )
 
         if span:
@@ -179,12 +188,10 @@ Prior attempts summary (optional):
             )
 
         try:
-            parsed = json.loads(raw_output)
-            # Ensure adaptation_suggestion is null if not provided
-            if "adaptation_suggestion" not in parsed:
-                parsed["adaptation_suggestion"] = None
+            parsed = parse_model_json(raw_output, agent="tutor", schema=TutorOutput)
         except Exception as parse_error:
             parsed = {
+                "error": "invalid_json_from_model",
                 "dimension_scores": [],
                 "overall_score": 0.0,
                 "pass": False,
@@ -203,7 +210,7 @@ Prior attempts summary (optional):
                 )
 
         # ---- Evaluation hook ---------------------------------------
-        score, details = eval_tutor_feedback(challenge, user_answer, parsed)
+        score, details = eval_tutor_feedback(challenge, user_answer, parsed, span=span)
         if span:
             span.add_evaluation(
                 name="tutor_feedback_quality",
@@ -244,6 +251,7 @@ Hint Level: {hint_level}
     hint_text = call_gemini(
         system_instruction=HINT_SYSTEM_PROMPT,
         user_message=user_msg,
+        agent="hint",
     )
     return hint_text
 
@@ -0,0 +1,57 @@
+"""Add remedial_drafts and learning_paths.version
+
+Revision ID: 1d6c8e4f7a52
+Revises: e7f2b5a9c310
+Create Date: 2026-10-19 13:31:52.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d6c8e4f7a52'
+down_revision: Union[str, Sequence[str], None] = 'e7f2b5a9c310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'learning_paths',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table('remedial_drafts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('path_id', sa.Integer(), nullable=False),
+    sa.Column('struggling_node_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('speculative', sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.Column('apply_requested', sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.Column('adaptation_suggestion', sa.Text(), nullable=True),
+    sa.Column('catalog_id', sa.Integer(), nullable=True),
+    sa.Column('node_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['path_id'], ['learning_paths.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['struggling_node_id'], ['path_nodes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['catalog_id'], ['node_catalog.id'], ),
+    sa.ForeignKeyConstraint(['node_id'], ['path_nodes.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_remedial_drafts_user_node', 'remedial_drafts', ['user_id', 'struggling_node_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_remedial_drafts_user_node', table_name='remedial_drafts')
+    op.drop_table('remedial_drafts')
+    op.drop_column('learning_paths', 'version')
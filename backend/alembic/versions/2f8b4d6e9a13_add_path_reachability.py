@@ -0,0 +1,56 @@
+"""Add path_reachability (transitive closure of path edges)
+
+Revision ID: 2f8b4d6e9a13
+Revises: 9a3e6f1c2b84
+Create Date: 2026-10-19 17:24:08.551907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f8b4d6e9a13'
+down_revision: Union[str, Sequence[str], None] = '9a3e6f1c2b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('path_reachability',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path_id', sa.Integer(), nullable=False),
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['path_id'], ['learning_paths.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['path_nodes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['path_nodes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ancestor_id', 'descendant_id', name='uq_path_reachability_pair')
+    )
+    op.create_index('ix_path_reachability_path_id', 'path_reachability', ['path_id'])
+    op.create_index('ix_path_reachability_descendant', 'path_reachability', ['descendant_id'])
+
+    # Closure of every existing path. UNION (not UNION ALL) also terminates
+    # on a path that somehow contains a cycle.
+    op.execute("""
+        INSERT INTO path_reachability (path_id, ancestor_id, descendant_id)
+        WITH RECURSIVE reach(path_id, ancestor_id, descendant_id) AS (
+            SELECT path_id, from_node_id, to_node_id FROM path_edges
+            UNION
+            SELECT r.path_id, r.ancestor_id, e.to_node_id
+            FROM reach r
+            JOIN path_edges e ON e.from_node_id = r.descendant_id
+        )
+        SELECT path_id, ancestor_id, descendant_id FROM reach
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_path_reachability_descendant', table_name='path_reachability')
+    op.drop_index('ix_path_reachability_path_id', table_name='path_reachability')
+    op.drop_table('path_reachability')
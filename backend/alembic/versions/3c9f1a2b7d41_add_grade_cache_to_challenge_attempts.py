@@ -0,0 +1,38 @@
+"""Add grade cache columns to challenge_attempts
+
+Revision ID: 3c9f1a2b7d41
+Revises: bd8e7738cbe4
+Create Date: 2026-10-19 09:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9f1a2b7d41'
+down_revision: Union[str, Sequence[str], None] = 'bd8e7738cbe4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('challenge_attempts', sa.Column('answer_hash', sa.String(length=64), nullable=True))
+    op.add_column('challenge_attempts', sa.Column('answer_simhash', sa.BigInteger(), nullable=True))
+    op.add_column('challenge_attempts', sa.Column('grading_json', sa.JSON(), nullable=True))
+    op.create_index(
+        'ix_challenge_attempts_challenge_answer_hash',
+        'challenge_attempts',
+        ['challenge_id', 'answer_hash'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_challenge_attempts_challenge_answer_hash', table_name='challenge_attempts')
+    op.drop_column('challenge_attempts', 'grading_json')
+    op.drop_column('challenge_attempts', 'answer_simhash')
+    op.drop_column('challenge_attempts', 'answer_hash')
@@ -0,0 +1,155 @@
+"""Add content-addressed node_catalog and move node text out of path_nodes
+
+Revision ID: 5b7e9d3c2a18
+Revises: 8e2d4c6a1f93
+Create Date: 2026-10-19 11:26:07.530914
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e9d3c2a18'
+down_revision: Union[str, Sequence[str], None] = '8e2d4c6a1f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+CONTENT_COLUMNS = ('title', 'description', 'node_type', 'estimated_minutes', 'metadata_json')
+
+path_nodes = sa.table(
+    'path_nodes',
+    sa.column('id', sa.Integer),
+    sa.column('catalog_id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('description', sa.Text),
+    sa.column('node_type', sa.String),
+    sa.column('estimated_minutes', sa.Integer),
+    sa.column('metadata_json', sa.JSON),
+)
+
+node_catalog = sa.table(
+    'node_catalog',
+    sa.column('id', sa.Integer),
+    sa.column('content_hash', sa.String),
+    sa.column('title', sa.String),
+    sa.column('description', sa.Text),
+    sa.column('node_type', sa.String),
+    sa.column('estimated_minutes', sa.Integer),
+    sa.column('metadata_json', sa.JSON),
+)
+
+
+def _content_hash(row) -> str:
+    # Same canonical form as services.node_catalog.content_hash
+    canonical = json.dumps(
+        [row.title, row.description, row.node_type, row.estimated_minutes, row.metadata_json],
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _backfill() -> None:
+    """
+    One catalog row per distinct node content; every path node points at it.
+    """
+    conn = op.get_bind()
+    catalog_ids = {}
+    last_id = 0
+
+    while True:
+        rows = conn.execute(
+            sa.select(path_nodes.c.id, *[path_nodes.c[name] for name in CONTENT_COLUMNS])
+            .where(path_nodes.c.id > last_id)
+            .order_by(path_nodes.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            h = _content_hash(row)
+            if h not in catalog_ids:
+                catalog_ids[h] = conn.execute(
+                    node_catalog.insert()
+                    .values(
+                        content_hash=h,
+                        node_type=row.node_type or 'concept',
+                        **{name: getattr(row, name) for name in CONTENT_COLUMNS if name != 'node_type'},
+                    )
+                    .returning(node_catalog.c.id)
+                ).scalar_one()
+            updates.append({'node_id': row.id, 'cid': catalog_ids[h]})
+
+        conn.execute(
+            path_nodes.update()
+            .where(path_nodes.c.id == sa.bindparam('node_id'))
+            .values(catalog_id=sa.bindparam('cid')),
+            updates,
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('node_catalog',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('node_type', sa.String(), nullable=False),
+    sa.Column('estimated_minutes', sa.Integer(), nullable=True),
+    sa.Column('metadata_json', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', name='uq_node_catalog_content_hash')
+    )
+    op.add_column('path_nodes', sa.Column('catalog_id', sa.Integer(), nullable=True))
+
+    _backfill()
+
+    with op.batch_alter_table('path_nodes') as batch_op:
+        batch_op.alter_column('catalog_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key(
+            'fk_path_nodes_catalog_id', 'node_catalog', ['catalog_id'], ['id']
+        )
+        batch_op.create_index('ix_path_nodes_catalog_id', ['catalog_id'])
+        for name in CONTENT_COLUMNS:
+            batch_op.drop_column(name)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('path_nodes') as batch_op:
+        batch_op.add_column(sa.Column('title', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('description', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('node_type', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('estimated_minutes', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('metadata_json', sa.JSON(), nullable=True))
+
+    catalog = sa.select(node_catalog).where(node_catalog.c.id == path_nodes.c.catalog_id)
+    op.get_bind().execute(
+        path_nodes.update().values(
+            **{name: catalog.with_only_columns(node_catalog.c[name]).scalar_subquery()
+               for name in CONTENT_COLUMNS}
+        )
+    )
+
+    with op.batch_alter_table('path_nodes') as batch_op:
+        batch_op.alter_column('title', existing_type=sa.String(), nullable=False)
+        batch_op.alter_column('description', existing_type=sa.Text(), nullable=False)
+        batch_op.alter_column('node_type', existing_type=sa.String(), nullable=False)
+        batch_op.drop_index('ix_path_nodes_catalog_id')
+        batch_op.drop_constraint('fk_path_nodes_catalog_id', type_='foreignkey')
+        batch_op.drop_column('catalog_id')
+
+    op.drop_table('node_catalog')
@@ -0,0 +1,38 @@
+"""Add path_layouts
+
+Revision ID: 6e1d9b3f7c25
+Revises: 2f8b4d6e9a13
+Create Date: 2026-10-19 18:47:13.902614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1d9b3f7c25'
+down_revision: Union[str, Sequence[str], None] = '2f8b4d6e9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Not backfilled: existing paths get their layout on first request
+    op.create_table('path_layouts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('layout_json', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['path_id'], ['learning_paths.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path_id', 'version', name='uq_path_layouts_path_version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('path_layouts')
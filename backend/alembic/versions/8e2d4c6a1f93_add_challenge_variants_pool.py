@@ -0,0 +1,48 @@
+"""Add challenge_variants pool
+
+Revision ID: 8e2d4c6a1f93
+Revises: 3c9f1a2b7d41
+Create Date: 2026-10-19 10:03:51.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2d4c6a1f93'
+down_revision: Union[str, Sequence[str], None] = '3c9f1a2b7d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('challenge_variants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('challenge_type', sa.String(), nullable=True),
+    sa.Column('prompt', sa.Text(), nullable=False),
+    sa.Column('expected_answer_outline', sa.Text(), nullable=True),
+    sa.Column('rubric_json', sa.JSON(), nullable=True),
+    sa.Column('difficulty', sa.String(), nullable=True),
+    sa.Column('served_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('active', sa.Boolean(), nullable=False, server_default=sa.true()),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_challenge_variants_fingerprint', 'challenge_variants', ['fingerprint'])
+    op.add_column('challenges', sa.Column('variant_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_challenges_variant_id', 'challenges', 'challenge_variants', ['variant_id'], ['id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_challenges_variant_id', 'challenges', type_='foreignkey')
+    op.drop_column('challenges', 'variant_id')
+    op.drop_index('ix_challenge_variants_fingerprint', table_name='challenge_variants')
+    op.drop_table('challenge_variants')
@@ -0,0 +1,70 @@
+"""Add path_frontier and edge / progress lookup indexes
+
+Revision ID: 9a3e6f1c2b84
+Revises: 1d6c8e4f7a52
+Create Date: 2026-10-19 16:02:27.318240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3e6f1c2b84'
+down_revision: Union[str, Sequence[str], None] = '1d6c8e4f7a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_path_edges_from_node_id', 'path_edges', ['from_node_id'])
+    op.create_index('ix_path_edges_to_node_id', 'path_edges', ['to_node_id'])
+    op.create_index('ix_node_progress_user_node', 'node_progress', ['user_id', 'node_id'])
+
+    op.create_table('path_frontier',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('path_id', sa.Integer(), nullable=False),
+    sa.Column('node_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['path_id'], ['learning_paths.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['node_id'], ['path_nodes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'node_id', name='uq_path_frontier_user_node')
+    )
+    op.create_index('ix_path_frontier_user_path', 'path_frontier', ['user_id', 'path_id'])
+
+    # Frontier of every existing path for its owner
+    op.execute("""
+        INSERT INTO path_frontier (user_id, path_id, node_id, created_at)
+        SELECT lp.user_id, n.path_id, n.id, CURRENT_TIMESTAMP
+        FROM path_nodes n
+        JOIN learning_paths lp ON lp.id = n.path_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM node_progress np
+            WHERE np.user_id = lp.user_id AND np.node_id = n.id AND np.status = 'completed'
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM path_edges e
+            WHERE e.to_node_id = n.id
+            AND NOT EXISTS (
+                SELECT 1 FROM node_progress np
+                WHERE np.user_id = lp.user_id AND np.node_id = e.from_node_id
+                AND np.status = 'completed'
+            )
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_path_frontier_user_path', table_name='path_frontier')
+    op.drop_table('path_frontier')
+    op.drop_index('ix_node_progress_user_node', table_name='node_progress')
+    op.drop_index('ix_path_edges_to_node_id', table_name='path_edges')
+    op.drop_index('ix_path_edges_from_node_id', table_name='path_edges')
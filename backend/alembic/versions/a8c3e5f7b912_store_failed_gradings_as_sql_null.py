@@ -0,0 +1,33 @@
+"""Store failed gradings as SQL NULL
+
+Revision ID: a8c3e5f7b912
+Revises: 4d2a7c9e1b56
+Create Date: 2026-10-20 10:04:17.530281
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e5f7b912'
+down_revision: Union[str, Sequence[str], None] = '4d2a7c9e1b56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Failed gradings were written as the JSON value null, not SQL NULL
+    op.execute(
+        "UPDATE challenge_attempts SET grading_json = NULL "
+        "WHERE CAST(grading_json AS TEXT) = 'null'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # SQL NULL reads back the same as JSON null through the ORM
+    pass
@@ -0,0 +1,30 @@
+"""Add dedupe_key to jobs
+
+Revision ID: b5d1f3a7c820
+Revises: a8c3e5f7b912
+Create Date: 2026-10-20 11:26:51.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1f3a7c820'
+down_revision: Union[str, Sequence[str], None] = 'a8c3e5f7b912'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('dedupe_key', sa.String(), nullable=True))
+    op.create_index('ix_jobs_dedupe', 'jobs', ['job_type', 'dedupe_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_dedupe', table_name='jobs')
+    op.drop_column('jobs', 'dedupe_key')
@@ -0,0 +1,48 @@
+"""Unique dedupe_key among active jobs
+
+Revision ID: d2e6a9c4f158
+Revises: b5d1f3a7c820
+Create Date: 2026-10-21 09:42:13.618204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e6a9c4f158'
+down_revision: Union[str, Sequence[str], None] = 'b5d1f3a7c820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status IN ('queued', 'running')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Concurrent enqueues may already have left duplicates: the oldest
+    # active job keeps the key
+    op.execute(
+        "UPDATE jobs SET dedupe_key = NULL "
+        f"WHERE dedupe_key IS NOT NULL AND {ACTIVE} AND id > ("
+        "SELECT MIN(j.id) FROM jobs j "
+        "WHERE j.job_type = jobs.job_type AND j.dedupe_key = jobs.dedupe_key "
+        f"AND j.{ACTIVE})"
+    )
+    op.drop_index('ix_jobs_dedupe', table_name='jobs')
+    op.create_index(
+        'ux_jobs_dedupe',
+        'jobs',
+        ['job_type', 'dedupe_key'],
+        unique=True,
+        postgresql_where=sa.text(ACTIVE),
+        sqlite_where=sa.text(ACTIVE),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_jobs_dedupe', table_name='jobs')
+    op.create_index('ix_jobs_dedupe', 'jobs', ['job_type', 'dedupe_key'])
@@ -0,0 +1,116 @@
+# benchmarks/auth_overhead.py
+"""
+Per-request cost of core.auth.verify_supabase_jwt with and without the
+verified-token cache, for RS256 and ES256 tokens. Clients are simulated
+as a pool of distinct tokens, each sent `--requests-per-token` times (a
+browser tab polling with one access token). Run from backend/:
+
+    python -m benchmarks.auth_overhead
+
+No network access: the signing keys are generated locally and installed
+into core.auth.jwks directly.
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+# core.config insists on these; nothing here uses them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("GEMINI_MODEL", "bench")
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk, jwt
+
+import core.auth as auth
+
+
+def signing_key(alg: str) -> Tuple[bytes, Dict]:
+    """
+    (private PEM, public JWK) for `alg`.
+    """
+    if alg == "RS256":
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private = ec.generate_private_key(ec.SECP256R1())
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    public = jwk.construct(public_pem, alg).to_dict()
+    public.update(kid=alg.lower(), alg=alg)
+    return pem, public
+
+
+def tokens(pem: bytes, alg: str, count: int) -> List[str]:
+    exp = int(time.time()) + 3600
+    return [
+        jwt.encode(
+            {
+                "sub": str(uuid.uuid4()),
+                "aud": auth.JWT_AUDIENCE,
+                "exp": exp,
+                "email": "bench@example.com",
+                "role": "authenticated",
+            },
+            pem,
+            algorithm=alg,
+            headers={"kid": alg.lower()},
+        )
+        for _ in range(count)
+    ]
+
+
+def measure(cache_size: int, stream: List[str], repeat: int) -> float:
+    """
+    Median microseconds per verification over the request stream.
+    """
+    runs = []
+    for _ in range(repeat):
+        auth.verified_tokens = auth.TokenCache(cache_size)
+        started = time.perf_counter()
+        for token in stream:
+            auth.verify_supabase_jwt(token)
+        runs.append((time.perf_counter() - started) / len(stream) * 1e6)
+    return statistics.median(runs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests-per-token", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'alg':>6} | {'uncached':>12} | {'cached':>12} | {'hit ratio':>9} | speedup")
+    for alg in ("RS256", "ES256"):
+        pem, public = signing_key(alg)
+        auth.jwks._keys = {public["kid"]: public}
+
+        pool = tokens(pem, alg, args.clients)
+        # Round-robin, as interleaved requests from many clients arrive
+        stream = pool * args.requests_per_token
+
+        uncached = measure(0, stream, args.repeat)
+        cached = measure(auth.TOKEN_CACHE_SIZE, stream, args.repeat)
+        hit_ratio = 1 - args.clients / len(stream)
+        print(
+            f"{alg:>6} | {uncached:>9.1f} us | {cached:>9.1f} us | {hit_ratio:>9.0%} | "
+            f"{uncached / cached:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
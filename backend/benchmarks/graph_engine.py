@@ -0,0 +1,169 @@
+# benchmarks/graph_engine.py
+"""
+graph.dag.CSRDag on synthetic layered DAGs versus the equivalent
+dict-of-lists Python code. Run from backend/:
+
+    python -m benchmarks.graph_engine --nodes 10000
+
+No database needed; graphs are generated in memory.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Tuple
+
+from graph.dag import CSRDag
+from models import NodeProgressStatus
+
+
+def synthetic_dag(nodes: int, width: int, fan_in: int, seed: int) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """
+    `nodes` ids in layers of `width`; every node past the first layer gets
+    up to `fan_in` prerequisites from the previous few layers, so some
+    edges are transitively implied.
+    """
+    rng = random.Random(seed)
+    ids = list(range(1000, 1000 + nodes))
+    edges = set()
+    for i in range(width, nodes):
+        layer = i // width
+        lo = max(0, (layer - 3) * width)
+        hi = layer * width
+        for _ in range(fan_in):
+            edges.add((ids[rng.randrange(lo, hi)], ids[i]))
+    return ids, sorted(edges)
+
+
+# -----------------------------------------------------------------------------
+# Pure-Python baseline
+# -----------------------------------------------------------------------------
+
+
+def py_adjacency(ids, edges):
+    succ: Dict[int, List[int]] = {i: [] for i in ids}
+    pred: Dict[int, List[int]] = {i: [] for i in ids}
+    for a, b in edges:
+        succ[a].append(b)
+        pred[b].append(a)
+    return succ, pred
+
+
+def py_topo_depth(succ, pred):
+    indegree = {n: len(p) for n, p in pred.items()}
+    depth = {n: 0 for n in succ}
+    queue = deque(n for n, d in indegree.items() if d == 0)
+    order = []
+    while queue:
+        n = queue.popleft()
+        order.append(n)
+        for c in succ[n]:
+            depth[c] = max(depth[c], depth[n] + 1)
+            indegree[c] -= 1
+            if indegree[c] == 0:
+                queue.append(c)
+    return order, depth
+
+
+def py_frontier(succ, pred, status):
+    out = defaultdict(list)
+    for n in succ:
+        s = status.get(n, NodeProgressStatus.NOT_STARTED)
+        if s != NodeProgressStatus.NOT_STARTED:
+            out[s].append(n)
+        elif all(status.get(p) == NodeProgressStatus.COMPLETED for p in pred[n]):
+            out["available"].append(n)
+        else:
+            out["locked"].append(n)
+    return out
+
+
+def py_redundant(succ, order):
+    below: Dict[int, set] = {}
+    redundant = []
+    for u in reversed(order):
+        reach = set()
+        for c in succ[u]:
+            reach |= below[c]
+        redundant.extend((u, c) for c in succ[u] if c in reach)
+        reach.update(succ[u])
+        below[u] = reach
+    return redundant
+
+
+# -----------------------------------------------------------------------------
+# Harness
+# -----------------------------------------------------------------------------
+
+
+def timed(fn: Callable, repeat: int) -> Tuple[float, object]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--width", type=int, default=50)
+    parser.add_argument("--fan-in", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    ids, edges = synthetic_dag(args.nodes, args.width, args.fan_in, args.seed)
+    rng = random.Random(args.seed)
+    done = set(ids[: args.nodes // 2])
+    status = {n: NodeProgressStatus.COMPLETED for n in done}
+    status.update({n: NodeProgressStatus.IN_PROGRESS for n in rng.sample(ids[args.nodes // 2:], 20)})
+
+    print(f"{args.nodes} nodes, {len(edges)} edges, width {args.width}")
+
+    rows = []
+
+    ms_np, dag = timed(lambda: CSRDag.from_edges(ids, edges), args.repeat)
+    ms_py, (succ, pred) = timed(lambda: py_adjacency(ids, edges), args.repeat)
+    rows.append(("build", ms_py, ms_np))
+
+    def np_topo():
+        dag._kahn_cache = None
+        return dag.topological_order(), dag.depth()
+
+    ms_np, (order, depth) = timed(np_topo, args.repeat)
+    ms_py, (py_order, py_depth) = timed(lambda: py_topo_depth(succ, pred), args.repeat)
+    assert depth == py_depth
+    position = {n: i for i, n in enumerate(order)}
+    assert all(position[a] < position[b] for a, b in edges)
+    rows.append(("topo sort + depth", ms_py, ms_np))
+
+    ms_np, frontier = timed(lambda: dag.frontier(status), args.repeat)
+    ms_py, py_front = timed(lambda: py_frontier(succ, pred, status), args.repeat)
+    assert sorted(frontier["available"]) == sorted(py_front["available"])
+    rows.append(("frontier", ms_py, ms_np))
+
+    ms_np, redundant = timed(dag.redundant_edges, max(1, args.repeat // 2))
+    ms_py, py_red = timed(lambda: py_redundant(succ, py_order), max(1, args.repeat // 2))
+    assert sorted(redundant) == sorted(py_red)
+    rows.append((f"transitive reduction ({len(redundant)} redundant)", ms_py, ms_np))
+
+    cyclic = CSRDag.from_edges(ids, edges + [(ids[-1], ids[0])])
+    ms_np, cycle = timed(lambda: (setattr(cyclic, "_kahn_cache", None), cyclic.find_cycle())[1], args.repeat)
+    assert cycle and cycle[0] in ids
+
+    cyc_succ, cyc_pred = py_adjacency(ids, edges + [(ids[-1], ids[0])])
+    ms_py, _ = timed(lambda: len(py_topo_depth(cyc_succ, cyc_pred)[0]) < len(ids), args.repeat)
+    rows.append(("cycle detection", ms_py, ms_np))
+
+    print(f"{'operation':<40} | {'python':>10} | {'CSRDag':>10} | speedup")
+    for name, py, np_ in rows:
+        print(f"{name:<40} | {py:>7.2f} ms | {np_:>7.2f} ms | {py / np_:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/graph_surgery.py
+"""
+Remedial-node surgery on a node with many incoming edges: the previous
+ORM loop (load every PathEdge, mutate to_node_id one by one, add the new
+node, edge and progress rows) versus services.graph_mutations.insert_node_before.
+Run from backend/:
+
+    python -m benchmarks.graph_surgery --database-url postgresql://.../bench
+
+Defaults to an in-memory SQLite database. Creates its own tables, so point
+it at a scratch database.
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from models import (
+    Base, User, LearningPath, NodeCatalog, PathNode, PathEdge,
+    NodeProgress, NodeProgressStatus,
+)
+from services.graph_mutations import insert_node_before
+
+
+def legacy_insert_before(db: Session, path_id: int, target_id: int, catalog_id: int, user_id) -> int:
+    remedial_node = PathNode(path_id=path_id, catalog_id=catalog_id)
+    db.add(remedial_node)
+    db.flush()
+    db.add(NodeProgress(
+        user_id=user_id,
+        node_id=remedial_node.id,
+        status=NodeProgressStatus.NOT_STARTED,
+    ))
+    incoming_edges = db.query(PathEdge).filter(
+        PathEdge.path_id == path_id,
+        PathEdge.to_node_id == target_id,
+    ).all()
+    for edge in incoming_edges:
+        edge.to_node_id = remedial_node.id
+    db.add(PathEdge(path_id=path_id, from_node_id=remedial_node.id, to_node_id=target_id))
+    db.flush()
+    return remedial_node.id
+
+
+def set_based_insert_before(db: Session, path_id: int, target_id: int, catalog_id: int, user_id) -> int:
+    return insert_node_before(
+        db, path_id=path_id, target_node_id=target_id, catalog_id=catalog_id, user_id=user_id
+    ).node_id
+
+
+def build_fan_in(db: Session, fan_in: int, user_id) -> Dict[str, int]:
+    """
+    A path with `fan_in` prerequisite nodes all pointing at one target.
+    """
+    entry = NodeCatalog(content_hash=uuid.uuid4().hex * 2, title="t", description="d", node_type="concept")
+    lp = LearningPath(user_id=user_id, goal_title="bench")
+    db.add_all([entry, lp])
+    db.flush()
+
+    nodes = [PathNode(path_id=lp.id, catalog_id=entry.id) for _ in range(fan_in + 1)]
+    db.add_all(nodes)
+    db.flush()
+    target = nodes[-1]
+    db.add_all([
+        PathEdge(path_id=lp.id, from_node_id=n.id, to_node_id=target.id) for n in nodes[:-1]
+    ])
+    db.commit()
+    return {"path_id": lp.id, "target_id": target.id, "catalog_id": entry.id}
+
+
+def run(engine, make_session, fn: Callable, fan_in: int, repeat: int, user_id) -> Dict[str, float]:
+    timings: List[float] = []
+    statements = 0
+
+    # The first round warms SQLAlchemy's statement cache and is discarded
+    for _ in range(repeat + 1):
+        db = make_session()
+        graph = build_fan_in(db, fan_in, user_id)
+
+        count = [0]
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            # executemany sends one statement per parameter set
+            count[0] += len(parameters) if executemany else 1
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        started = time.perf_counter()
+        new_id = fn(db, graph["path_id"], graph["target_id"], graph["catalog_id"], user_id)
+        db.commit()
+        timings.append(time.perf_counter() - started)
+        event.remove(engine, "before_cursor_execute", on_execute)
+        statements = count[0]
+
+        rerouted = db.query(PathEdge).filter(PathEdge.to_node_id == new_id).count()
+        assert rerouted == fan_in, (rerouted, fan_in)
+        db.close()
+
+    return {"ms": statistics.median(timings[1:]) * 1000, "statements": statements}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--fan-in", default="10,100,300,1000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    make_session = sessionmaker(bind=engine, autoflush=False)
+
+    db = make_session()
+    user = User(id=uuid.uuid4(), email=f"bench-{uuid.uuid4().hex}@example.com")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    print(f"{'fan-in':>7} | {'ORM loop':>20} | {'set-based':>20} | speedup")
+    for fan_in in [int(n) for n in args.fan_in.split(",")]:
+        legacy = run(engine, make_session, legacy_insert_before, fan_in, args.repeat, user_id)
+        set_based = run(engine, make_session, set_based_insert_before, fan_in, args.repeat, user_id)
+        print(
+            f"{fan_in:>7} | {legacy['ms']:>8.2f} ms {legacy['statements']:>4} stmt "
+            f"| {set_based['ms']:>8.2f} ms {set_based['statements']:>4} stmt "
+            f"| {legacy['ms'] / set_based['ms']:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
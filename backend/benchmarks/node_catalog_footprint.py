@@ -0,0 +1,156 @@
+# benchmarks/node_catalog_footprint.py
+"""
+Estimates the storage and cache footprint of path node content with and
+without the content-addressed node catalog, on a synthetic dataset of
+paths with overlapping curricula. Run from backend/:
+
+    python -m benchmarks.node_catalog_footprint --paths 100000
+
+Sizes follow the Postgres on-disk layout (24-byte tuple header, 4-byte
+line pointer, 1- or 4-byte varlena headers, ~16 bytes per btree entry on
+integer keys), so the numbers are estimates, not measurements.
+"""
+
+import argparse
+import json
+import random
+from typing import Dict, List
+
+from services.node_catalog import content_hash
+
+TUPLE_OVERHEAD = 24 + 4
+INT = 4
+BTREE_INT_ENTRY = 16
+BTREE_HASH_ENTRY = 8 + 4 + 65  # index tuple header + line pointer + varlena(64)
+
+WORDS = (
+    "data model query index graph vector matrix function closure type class "
+    "module async thread cache network protocol stream parser compiler tensor "
+    "gradient loss layer kernel memory process schema table join transaction"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _node(rng: random.Random) -> Dict:
+    return {
+        "title": _text(rng, rng.randint(2, 6)),
+        "description": _text(rng, rng.randint(25, 70)) + ".",
+        "node_type": rng.choice(["concept", "concept", "skill", "project"]),
+        "estimated_minutes": rng.choice([15, 20, 30, 45, 60, 90]),
+        "tags": [rng.choice(WORDS) for _ in range(rng.randint(1, 4))],
+    }
+
+
+def _content(node: Dict) -> Dict:
+    return {
+        "title": node["title"],
+        "description": node["description"],
+        "node_type": node["node_type"],
+        "estimated_minutes": node["estimated_minutes"],
+        "metadata_json": {"tags": node["tags"]},
+    }
+
+
+def _varlena(value: str) -> int:
+    size = len(value.encode("utf-8"))
+    return size + (1 if size < 127 else 4)
+
+
+def _content_bytes(content: Dict) -> int:
+    return (
+        _varlena(content["title"])
+        + _varlena(content["description"])
+        + _varlena(content["node_type"])
+        + INT
+        + _varlena(json.dumps(content["metadata_json"]))
+    )
+
+
+def synthesize(paths: int, domains: int, nodes_per_domain: int, unique_ratio: float, seed: int):
+    rng = random.Random(seed)
+    catalogs = [[_content(_node(rng)) for _ in range(nodes_per_domain)] for _ in range(domains)]
+    # Zipf-like popularity: early curriculum steps appear in most paths
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(nodes_per_domain)]
+
+    dataset: List[List[Dict]] = []
+    for _ in range(paths):
+        domain = catalogs[rng.randrange(domains)]
+        size = rng.randint(12, 30)
+        picked = {id(c): c for c in rng.choices(domain, weights=weights, k=size)}
+        nodes = list(picked.values())
+        # Wording drift and remedial nodes are unique to one path
+        nodes += [_content(_node(rng)) for _ in range(int(round(size * unique_ratio)))]
+        dataset.append(nodes)
+    return dataset
+
+
+def measure(dataset: List[List[Dict]]) -> Dict[str, int]:
+    rows = 0
+    inline_bytes = 0
+    inline_json = 0
+    unique: Dict[str, Dict] = {}
+
+    for nodes in dataset:
+        for content in nodes:
+            rows += 1
+            inline_bytes += _content_bytes(content)
+            inline_json += len(json.dumps(content))
+            unique.setdefault(content_hash(content), content)
+
+    before_table = rows * (TUPLE_OVERHEAD + 2 * INT) + inline_bytes
+    before_index = rows * BTREE_INT_ENTRY
+
+    catalog_table = sum(
+        TUPLE_OVERHEAD + INT + 65 + 8 + _content_bytes(c) for c in unique.values()
+    )
+    catalog_index = len(unique) * (BTREE_INT_ENTRY + BTREE_HASH_ENTRY)
+    after_table = rows * (TUPLE_OVERHEAD + 3 * INT) + catalog_table
+    after_index = rows * 2 * BTREE_INT_ENTRY + catalog_index
+
+    # Serialized-node cache: every path's nodes vs. per-path (id, catalog_id)
+    # references plus each catalog entry once.
+    ref_bytes = len(json.dumps({"id": 10_000_000, "catalog_id": 1_000_000}))
+    cache_before = inline_json
+    cache_after = rows * ref_bytes + sum(len(json.dumps(c)) for c in unique.values())
+
+    return {
+        "rows": rows,
+        "distinct": len(unique),
+        "storage_before": before_table + before_index,
+        "storage_after": after_table + after_index,
+        "cache_before": cache_before,
+        "cache_after": cache_after,
+    }
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1_000_000:,.1f} MB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--domains", type=int, default=40)
+    parser.add_argument("--nodes-per-domain", type=int, default=120)
+    parser.add_argument("--unique-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    result = measure(synthesize(
+        args.paths, args.domains, args.nodes_per_domain, args.unique_ratio, args.seed
+    ))
+
+    print(f"path nodes:        {result['rows']:,}")
+    print(f"distinct contents: {result['distinct']:,} "
+          f"({result['rows'] / result['distinct']:.1f} rows per entry)")
+    for label, key in (("storage", "storage"), ("node cache", "cache")):
+        before, after = result[f"{key}_before"], result[f"{key}_after"]
+        print(f"{label + ':':<19}{_mb(before)} -> {_mb(after)} "
+              f"({100 * (1 - after / before):.1f}% smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/reachability.py
+"""
+Ancestor / descendant queries on deep paths: a level-by-level BFS over
+path_edges (one query per level), a single recursive CTE, and the
+services.reachability closure index. Run from backend/:
+
+    python -m benchmarks.reachability --database-url postgresql://.../bench
+
+Defaults to an in-memory SQLite database. Creates its own tables, so point
+it at a scratch database.
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List, Set
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from models import Base, User, LearningPath, NodeCatalog, PathNode, PathEdge
+from services.reachability import ancestors, descendants, index_path
+
+
+def build_deep_path(db: Session, depth: int, skip_ratio: float, user_id, seed: int) -> List[int]:
+    """
+    A prerequisite chain of `depth` nodes plus random skip edges back to
+    earlier nodes, as long remedial-heavy paths end up.
+    """
+    rng = random.Random(seed)
+    entry = NodeCatalog(content_hash=uuid.uuid4().hex * 2, title="t", description="d", node_type="concept")
+    lp = LearningPath(user_id=user_id, goal_title="bench")
+    db.add_all([entry, lp])
+    db.flush()
+
+    nodes = [PathNode(path_id=lp.id, catalog_id=entry.id) for _ in range(depth)]
+    db.add_all(nodes)
+    db.flush()
+    ids = [n.id for n in nodes]
+
+    edges = {(ids[i - 1], ids[i]) for i in range(1, depth)}
+    for i in range(2, depth):
+        if rng.random() < skip_ratio:
+            edges.add((ids[rng.randrange(0, i - 1)], ids[i]))
+    db.add_all([PathEdge(path_id=lp.id, from_node_id=a, to_node_id=b) for a, b in edges])
+    db.commit()
+    return [lp.id] + ids
+
+
+# -----------------------------------------------------------------------------
+# Strategies
+# -----------------------------------------------------------------------------
+
+
+def bfs(db: Session, node_id: int, downstream: bool) -> Set[int]:
+    here, there = (
+        (PathEdge.from_node_id, PathEdge.to_node_id) if downstream
+        else (PathEdge.to_node_id, PathEdge.from_node_id)
+    )
+    seen: Set[int] = set()
+    frontier = {node_id}
+    while frontier:
+        found = set(db.execute(select(there).where(here.in_(frontier))).scalars())
+        frontier = found - seen
+        seen |= frontier
+    return seen
+
+
+def recursive_cte(db: Session, node_id: int, downstream: bool) -> Set[int]:
+    here, there = (
+        (PathEdge.from_node_id, PathEdge.to_node_id) if downstream
+        else (PathEdge.to_node_id, PathEdge.from_node_id)
+    )
+    walk = select(there.label("node_id")).where(here == node_id).cte("walk", recursive=True)
+    walk = walk.union(select(there).where(here == walk.c.node_id))
+    return set(db.execute(select(walk.c.node_id)).scalars())
+
+
+def index(db: Session, node_id: int, downstream: bool) -> Set[int]:
+    return set(descendants(db, node_id) if downstream else ancestors(db, node_id))
+
+
+# -----------------------------------------------------------------------------
+# Harness
+# -----------------------------------------------------------------------------
+
+
+def measure(engine, db: Session, fn: Callable, ids: List[int], repeat: int) -> Dict[str, float]:
+    count = [0]
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        count[0] += 1
+
+    timings = []
+    result = None
+    # The first round warms SQLAlchemy's statement cache and is discarded
+    for _ in range(repeat + 1):
+        count[0] = 0
+        event.listen(engine, "before_cursor_execute", on_execute)
+        started = time.perf_counter()
+        result = (fn(db, ids[-1], False), fn(db, ids[0], True))
+        timings.append(time.perf_counter() - started)
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    return {"ms": statistics.median(timings[1:]) * 1000, "statements": count[0], "result": result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--depths", default="50,200,1000")
+    parser.add_argument("--skip-ratio", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    make_session = sessionmaker(bind=engine, autoflush=False)
+
+    db = make_session()
+    user = User(id=uuid.uuid4(), email=f"bench-{uuid.uuid4().hex}@example.com")
+    db.add(user)
+    db.commit()
+
+    print(
+        f"{'depth':>6} | {'closure rows':>12} | {'build':>9} | "
+        f"{'BFS':>18} | {'recursive CTE':>18} | {'index':>18} | vs BFS | vs CTE"
+    )
+    for depth in [int(d) for d in args.depths.split(",")]:
+        path_id, *ids = build_deep_path(db, depth, args.skip_ratio, user.id, seed=depth)
+
+        started = time.perf_counter()
+        rows = index_path(db, path_id)
+        db.commit()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        results = {
+            name: measure(engine, db, fn, ids, args.repeat)
+            for name, fn in (("bfs", bfs), ("cte", recursive_cte), ("index", index))
+        }
+        assert results["bfs"]["result"] == results["cte"]["result"] == results["index"]["result"]
+
+        def cell(name: str) -> str:
+            return f"{results[name]['ms']:>8.2f} ms {results[name]['statements']:>4} st"
+
+        print(
+            f"{depth:>6} | {rows:>12} | {build_ms:>6.0f} ms | {cell('bfs')} | {cell('cte')} | "
+            f"{cell('index')} | {results['bfs']['ms'] / results['index']['ms']:>5.1f}x | "
+            f"{results['cte']['ms'] / results['index']['ms']:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
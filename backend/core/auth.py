@@ -1,13 +1,22 @@
-from functools import lru_cache
+import hashlib
+import logging
 import os
+import threading
+import time
 import requests
-from typing import Optional
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 from uuid import UUID
 
 from jose import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from services import request_timing
+from services.metrics import Counter, hit_ratio
+
+logger = logging.getLogger(__name__)
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
@@ -25,21 +34,110 @@ if not SUPABASE_ANON_KEY:
 JWKS_URL = f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
 
 
-@lru_cache
-def get_jwks():
-    try:
-        res = requests.get(
-            JWKS_URL,
-            headers={
-                "apikey": SUPABASE_ANON_KEY,
-            },
-            timeout=5,
-        )
-        res.raise_for_status()
-        return res.json()
-    except Exception as e:
-        raise RuntimeError(f"Failed to fetch JWKS: {e}")
+# -----------------------------------------------------------------------------
+# JWKS
+# -----------------------------------------------------------------------------
+#
+# Supabase's signing keys are fetched once at startup and refreshed in the
+# background every JWKS_TTL_SECONDS, so requests never wait on the network
+# for a known key. A token signed with an unknown kid (key rotation) makes
+# one request refetch on the spot, at most every JWKS_MIN_REFETCH_SECONDS,
+# so a flood of bad kids cannot hammer the endpoint. A failed fetch keeps
+# the previous keys.
+
+JWKS_TTL_SECONDS = float(os.getenv("JWKS_TTL_SECONDS", "600"))
+JWKS_MIN_REFETCH_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_SECONDS", "30"))
+JWKS_FETCH_TIMEOUT_SECONDS = float(os.getenv("JWKS_FETCH_TIMEOUT_SECONDS", "5"))
 
+JWKS_FETCHES = Counter(
+    "jwks_fetches_total",
+    "JWKS fetches by trigger (startup, ttl, kid_miss) and outcome (ok, error)",
+    ["trigger", "outcome"],
+)
+
+
+class JWKSManager:
+    def __init__(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        *,
+        ttl: float = JWKS_TTL_SECONDS,
+        min_refetch_interval: float = JWKS_MIN_REFETCH_SECONDS,
+        timeout: float = JWKS_FETCH_TIMEOUT_SECONDS,
+    ):
+        self.url = url
+        self.headers = headers
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        # kid -> JWK. Replaced wholesale on refresh, so readers need no lock.
+        self._keys: Dict[str, dict] = {}
+        self._last_miss_fetch = float("-inf")
+        self._fetch_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self, trigger: str) -> bool:
+        """
+        Fetches the key set and swaps it in. False (old keys kept) on error.
+        """
+        try:
+            res = requests.get(self.url, headers=self.headers, timeout=self.timeout)
+            res.raise_for_status()
+            keys = {key["kid"]: key for key in res.json()["keys"] if "kid" in key}
+        except Exception:
+            logger.exception("JWKS fetch (%s) failed", trigger)
+            JWKS_FETCHES.inc(trigger=trigger, outcome="error")
+            return False
+        if self._keys.keys() - keys.keys():
+            # A key was revoked: tokens it signed must be verified again
+            verified_tokens.clear()
+        self._keys = keys
+        JWKS_FETCHES.inc(trigger=trigger, outcome="ok")
+        return True
+
+    def get(self, kid: str) -> Optional[dict]:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: refetch unless another miss did so recently (retry
+        # sooner while there are no keys at all, e.g. after a failed startup
+        # fetch). Concurrent misses wait for one fetch instead of each
+        # making their own.
+        interval = self.min_refetch_interval if self._keys else min(self.min_refetch_interval, 1.0)
+        with self._fetch_lock:
+            key = self._keys.get(kid)
+            if key is None and time.monotonic() - self._last_miss_fetch >= interval:
+                self._last_miss_fetch = time.monotonic()
+                self.refresh("kid_miss")
+                key = self._keys.get(kid)
+        return key
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl):
+            with self._fetch_lock:
+                self.refresh("ttl")
+
+    def start(self) -> None:
+        """
+        Prefetches the keys and starts the background refresh.
+        """
+        if self._thread is not None:
+            return
+        with self._fetch_lock:
+            self.refresh("startup")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+
+jwks = JWKSManager(JWKS_URL, {"apikey": SUPABASE_ANON_KEY})
 
 
 class AuthenticatedUser:
@@ -55,22 +153,98 @@ class AuthenticatedUser:
         self.role = role
         self.claims = claims or {}
 
+
+# -----------------------------------------------------------------------------
+# Verified tokens
+# -----------------------------------------------------------------------------
+#
+# A client sends the same bearer token with every request until it expires.
+# Tokens that passed verification are remembered (by SHA-256, not the token
+# itself) together with their AuthenticatedUser until their `exp`, so
+# repeats skip header parsing and the signature check. Least recently used
+# entries are evicted beyond TOKEN_CACHE_SIZE; 0 disables the cache.
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+TOKEN_CACHE = Counter(
+    "token_cache_total",
+    "Token verifications by cache result (hit, miss)",
+    ["result"],
+)
+hit_ratio("verified_tokens", TOKEN_CACHE, ["hit"])
+
+
+class TokenCache:
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        # sha256(token) -> (exp, user), least recently used first
+        self._entries: "OrderedDict[bytes, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, token: str, exp: Optional[float], user: AuthenticatedUser) -> None:
+        # Tokens without an expiry are never cached
+        if self.maxsize <= 0 or exp is None:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(exp), user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+verified_tokens = TokenCache()
+
+
 def get_public_key(token: str):
-    jwks = get_jwks()
     headers = jwt.get_unverified_header(token)
     kid = headers.get("kid")
 
     if not kid:
         raise HTTPException(status_code=401, detail="Missing kid in token")
 
-    for key in jwks["keys"]:
-        if key["kid"] == kid:
-            return key
-
-    raise HTTPException(status_code=401, detail="Public key not found")
+    key = jwks.get(kid)
+    if key is None:
+        raise HTTPException(status_code=401, detail="Public key not found")
+    return key
 
 
 def verify_supabase_jwt(token: str) -> AuthenticatedUser:
+    with request_timing.phase("auth"):
+        return _verify_supabase_jwt(token)
+
+
+def _verify_supabase_jwt(token: str) -> AuthenticatedUser:
+    # The returned user is shared between requests: treat it as read-only
+    cached = verified_tokens.get(token)
+    if cached is not None:
+        TOKEN_CACHE.inc(result="hit")
+        return cached
+    TOKEN_CACHE.inc(result="miss")
+
     try:
         public_key = get_public_key(token)
         if "alg" not in public_key:
@@ -96,12 +270,14 @@ def verify_supabase_jwt(token: str) -> AuthenticatedUser:
     email = payload.get("email")
     role = payload.get("role") or payload.get("app_metadata", {}).get("role")
 
-    return AuthenticatedUser(
+    user = AuthenticatedUser(
         user_id=user_id,
         email=email,
         role=role,
         claims=payload,
     )
+    verified_tokens.put(token, payload.get("exp"), user)
+    return user
 
 
 def get_current_user(
@@ -1,15 +1,143 @@
 # backend/core/config.py
 
+import json
 import os
 from dotenv import load_dotenv
 
 # Load .env file (backend/.env)
 load_dotenv()
 
+
+def _merge_env_entries(defaults: dict, env_var: str) -> dict:
+    """
+    Per-entry settings (e.g. per agent) with JSON overrides from `env_var`
+    merged field by field, so '{"default": {"timeout_seconds": 30}}' keeps
+    the other default fields.
+    """
+    merged = {key: dict(entry) for key, entry in defaults.items()}
+    for key, entry in json.loads(os.getenv(env_var, "{}")).items():
+        merged[key] = {**merged.get(key, {}), **entry}
+    return merged
+
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL")
 
+# Number of streamed DAG nodes persisted per batch in POST /api/paths/stream
+DAG_STREAM_BATCH_SIZE = int(os.getenv("DAG_STREAM_BATCH_SIZE", "5"))
+
+# Input token budget per agent. Override individual entries with e.g.
+# LLM_INPUT_BUDGETS='{"research": 48000, "tutor": 4000}'
+DEFAULT_LLM_INPUT_BUDGETS = {
+    "research": 32000,
+    "research_eval": 8000,
+    "dag_builder": 12000,
+    "dag_eval": 12000,
+    "remedial_node": 2000,
+    "challenge": 8000,
+    "challenge_eval": 4000,
+    "tutor": 8000,
+    "tutor_eval": 8000,
+    "hint": 2000,
+    "default": 16000,
+}
+LLM_INPUT_BUDGETS = {
+    **DEFAULT_LLM_INPUT_BUDGETS,
+    **json.loads(os.getenv("LLM_INPUT_BUDGETS", "{}")),
+}
+
+# Client-side limits shared by every Gemini call (provider quota)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "300"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+
+# Per-agent call policies: deadline, retries, backoff and an optional
+# per-agent request rate. Entries are merged over "default"; override with
+# e.g. LLM_CALL_POLICIES='{"hint": {"timeout_seconds": 10}}'
+DEFAULT_LLM_CALL_POLICIES = {
+    "default": {
+        "timeout_seconds": 60.0,
+        "max_retries": 2,
+        "backoff_base_seconds": 0.5,
+        "backoff_max_seconds": 8.0,
+        "requests_per_minute": None,
+    },
+    "research": {"timeout_seconds": 120.0},
+    "dag_builder": {"timeout_seconds": 120.0},
+    "tutor": {"timeout_seconds": 45.0},
+    "hint": {"timeout_seconds": 15.0, "max_retries": 1},
+}
+LLM_CALL_POLICIES = _merge_env_entries(DEFAULT_LLM_CALL_POLICIES, "LLM_CALL_POLICIES")
+
+# Circuit breaker (per model): open when at least MIN_CALLS calls in the
+# window failed at FAILURE_RATIO or more, and stay open for OPEN_SECONDS.
+LLM_BREAKER_FAILURE_RATIO = float(os.getenv("LLM_BREAKER_FAILURE_RATIO", "0.5"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_WINDOW_SECONDS = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "30"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "15"))
+
+# Latency SLO (seconds) per agent; calls slower than this are counted as
+# violations. Override with e.g. LLM_LATENCY_SLOS='{"tutor": 10}'
+DEFAULT_LLM_LATENCY_SLOS = {
+    "tutor": 15.0,
+    "hint": 4.0,
+    "challenge": 30.0,
+    "remedial_node": 15.0,
+    "default": 60.0,
+}
+LLM_LATENCY_SLOS = {
+    **DEFAULT_LLM_LATENCY_SLOS,
+    **json.loads(os.getenv("LLM_LATENCY_SLOS", "{}")),
+}
+
+# Hedged requests for latency-critical agents: when no response arrived
+# after the agent's rolling `percentile` latency (clamped to min/max, or
+# `initial_delay_seconds` until enough samples exist), an identical second
+# request is sent and the first to finish wins. `max_hedge_ratio` caps the
+# share of recent calls that may be hedged.
+DEFAULT_LLM_HEDGE_POLICIES = {
+    "tutor": {
+        "percentile": 90,
+        "min_delay_seconds": 2.0,
+        "max_delay_seconds": 20.0,
+        "initial_delay_seconds": 10.0,
+        "max_hedge_ratio": 0.2,
+    },
+    "hint": {
+        "percentile": 90,
+        "min_delay_seconds": 0.5,
+        "max_delay_seconds": 5.0,
+        "initial_delay_seconds": 3.0,
+        "max_hedge_ratio": 0.2,
+    },
+}
+LLM_HEDGE_POLICIES = _merge_env_entries(DEFAULT_LLM_HEDGE_POLICIES, "LLM_HEDGE_POLICIES")
+LLM_HEDGE_MAX_WORKERS = int(os.getenv("LLM_HEDGE_MAX_WORKERS", "32"))
+LLM_LATENCY_WINDOW_SIZE = int(os.getenv("LLM_LATENCY_WINDOW_SIZE", "512"))
+
+# Model routing: each agent maps to a primary and an optional fallback model.
+# Plain names are Gemini models; "litellm:<model>" targets are called through
+# LiteLLM (OpenAI-compatible or local endpoints, LITELLM_API_BASE by default).
+# Calls switch to the fallback when the primary's rolling p95 for that agent
+# exceeds the agent's LLM_LATENCY_SLOS entry, or when the primary fails.
+# Override with e.g. LLM_ROUTES='{"hint": {"primary": "litellm:openai/qwen2.5"}}'
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", GEMINI_MODEL)
+LITELLM_API_BASE = os.getenv("LITELLM_API_BASE")
+
+DEFAULT_LLM_ROUTES = {
+    "default": {"primary": GEMINI_MODEL, "fallback": GEMINI_FAST_MODEL},
+    "hint": {"primary": GEMINI_FAST_MODEL, "fallback": None},
+    "remedial_node": {"primary": GEMINI_FAST_MODEL, "fallback": GEMINI_MODEL},
+    "research_eval": {"primary": GEMINI_FAST_MODEL, "fallback": None},
+    "dag_eval": {"primary": GEMINI_FAST_MODEL, "fallback": None},
+    "challenge_eval": {"primary": GEMINI_FAST_MODEL, "fallback": None},
+    "tutor_eval": {"primary": GEMINI_FAST_MODEL, "fallback": None},
+}
+LLM_ROUTES = _merge_env_entries(DEFAULT_LLM_ROUTES, "LLM_ROUTES")
+# Share of calls still sent to a primary that is over its SLO, so its
+# latency window keeps being refreshed and routing can switch back.
+LLM_ROUTE_PROBE_RATIO = float(os.getenv("LLM_ROUTE_PROBE_RATIO", "0.05"))
+
 if not DATABASE_URL:
     raise RuntimeError(
         "DATABASE_URL is not set. "
@@ -27,3 +155,101 @@ if not GEMINI_MODEL:
         "GEMINI_MODEL is not set. "
         "Make sure it exists in your backend .env file."
     )
+
+# Grade cache for resubmitted answers (services/grade_cache.py).
+# GRADE_CACHE_MODE: "exact" (normalized answer hash) or "simhash" (also
+# reuse grades of near-duplicate answers within the given Hamming distance).
+GRADE_CACHE_ENABLED = os.getenv("GRADE_CACHE_ENABLED", "true").lower() == "true"
+GRADE_CACHE_MODE = os.getenv("GRADE_CACHE_MODE", "exact")
+GRADE_CACHE_SIMHASH_MAX_DISTANCE = int(os.getenv("GRADE_CACHE_SIMHASH_MAX_DISTANCE", "3"))
+GRADE_CACHE_SIMHASH_CANDIDATES = int(os.getenv("GRADE_CACHE_SIMHASH_CANDIDATES", "200"))
+
+# Cross-user challenge pool (services/challenge_pool.py). Nodes with the same
+# canonical fingerprint share up to CHALLENGE_POOL_SIZE pre-generated
+# variants, served "round_robin" (least served first) or "random". A variant
+# is retired after CHALLENGE_POOL_MAX_SERVES uses and the pool is refilled
+# by the job worker.
+CHALLENGE_POOL_ENABLED = os.getenv("CHALLENGE_POOL_ENABLED", "true").lower() == "true"
+CHALLENGE_POOL_SIZE = int(os.getenv("CHALLENGE_POOL_SIZE", "3"))
+CHALLENGE_POOL_SELECTION = os.getenv("CHALLENGE_POOL_SELECTION", "round_robin")
+CHALLENGE_POOL_MAX_SERVES = int(os.getenv("CHALLENGE_POOL_MAX_SERVES", "500"))
+
+# Job queue and `python -m worker` (services/job_queue.py). The worker runs
+# challenge pool refills and remedial node generation; the API only queues
+# them, so at least one worker must be running. A claimed job is
+# invisible to other workers for JOB_VISIBILITY_TIMEOUT_SECONDS (extended by
+# the worker's heartbeat while it runs); failed jobs are retried after
+# JOB_RETRY_BACKOFF_SECONDS * 2^(attempt-1), up to JOB_MAX_ATTEMPTS tries.
+# Worker threads per job type, e.g. JOB_CONCURRENCY='{"remedial_node": 4}'
+DEFAULT_JOB_CONCURRENCY = {
+    "challenge_pool_refill": 4,
+    "remedial_node": 2,
+}
+JOB_CONCURRENCY = {
+    **DEFAULT_JOB_CONCURRENCY,
+    **json.loads(os.getenv("JOB_CONCURRENCY", "{}")),
+}
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+
+# Idempotency-Key support for POST /api/paths and challenge submissions
+# (services/idempotency.py). Stored responses expire after
+# IDEMPOTENCY_TTL_SECONDS. A retry of a request still in progress waits up
+# to IDEMPOTENCY_WAIT_SECONDS for it; an in-progress entry older than
+# IDEMPOTENCY_STALE_SECONDS is assumed abandoned and re-executed.
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))
+IDEMPOTENCY_STALE_SECONDS = float(os.getenv("IDEMPOTENCY_STALE_SECONDS", "900"))
+
+# Remedial nodes (services/remedial.py) are generated in the background.
+# With speculation on, generation starts after the second failed attempt so
+# the node is usually ready when the learner is blocked on the third. A draft
+# still pending after REMEDIAL_PENDING_TIMEOUT_SECONDS is assumed lost and
+# replaced by a new one on the learner's next failed submission.
+REMEDIAL_SPECULATIVE_ENABLED = os.getenv("REMEDIAL_SPECULATIVE_ENABLED", "true").lower() == "true"
+REMEDIAL_SPECULATIVE_ATTEMPTS = int(os.getenv("REMEDIAL_SPECULATIVE_ATTEMPTS", "2"))
+REMEDIAL_PENDING_TIMEOUT_SECONDS = float(os.getenv("REMEDIAL_PENDING_TIMEOUT_SECONDS", "900"))
+
+# Path change log for GET /api/paths/{id}/changes (services/path_changes.py).
+# Only the last PATH_CHANGE_LOG_RETENTION changes per path are kept; clients
+# further behind get a full snapshot instead.
+PATH_CHANGE_LOG_RETENTION = int(os.getenv("PATH_CHANGE_LOG_RETENTION", "500"))
+
+# Per-user event stream GET /api/events (services/events.py). "memory"
+# delivers events only to streams served by the process that committed
+# them; "postgres" fans them out to every API process over LISTEN/NOTIFY.
+# Events from the job worker always go over NOTIFY (Postgres only).
+# Each stream buffers up to EVENTS_QUEUE_SIZE events and sends a ping
+# every EVENTS_HEARTBEAT_SECONDS when idle.
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+# Metrics (services/metrics.py, GET /metrics). With several worker
+# processes, point METRICS_MULTIPROC_DIR at a directory shared by all of
+# them on one host (emptied on deploy to reset totals); each process writes
+# its snapshot there every METRICS_FLUSH_SECONDS and /metrics serves the
+# merged view. Snapshots of exited processes are folded into one archive
+# file and removed.
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Request timing (services/request_timing.py): every response carries a
+# Server-Timing header; requests slower than SLOW_REQUEST_SECONDS are logged
+# to "traverse.slow_request" as one JSON line with up to
+# SLOW_REQUEST_MAX_EVENTS timed events. With REQUEST_PROFILING_ENABLED, a
+# request sent with `X-Profile: 1` is sampled every
+# REQUEST_PROFILE_INTERVAL_SECONDS and its profile written to
+# REQUEST_PROFILE_DIR. Keep profiling off where clients are untrusted.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "2.0"))
+SLOW_REQUEST_MAX_EVENTS = int(os.getenv("SLOW_REQUEST_MAX_EVENTS", "200"))
+REQUEST_PROFILING_ENABLED = os.getenv("REQUEST_PROFILING_ENABLED", "false").lower() == "true"
+REQUEST_PROFILE_INTERVAL_SECONDS = float(os.getenv("REQUEST_PROFILE_INTERVAL_SECONDS", "0.005"))
+REQUEST_PROFILE_DIR = os.getenv("REQUEST_PROFILE_DIR", "profiles")
+
+# Query counting (services/query_budget.py): a statement shape that runs
+# more than N_PLUS_ONE_THRESHOLD times within one request is logged as a
+# possible N+1 query.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
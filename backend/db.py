@@ -1,17 +1,61 @@
 # backend/db.py
 
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from typing import Generator
 
 from core.config import DATABASE_URL
+from services.metrics import Gauge, Histogram, on_collect
+
+# -----------------------------------------------------------------------------
+# Connection pool metrics
+# -----------------------------------------------------------------------------
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a pooled connection (waiting for a free one, or opening one)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Pool connections by state (checked_out, idle, overflow, size)",
+    ["state"],
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
 
 # Create SQLAlchemy engine
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
+    # SQLite keeps its own (non-queue) pools
+    poolclass=None if make_url(DATABASE_URL).get_backend_name() == "sqlite" else InstrumentedQueuePool,
 )
 
+
+def _sample_pool() -> None:
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        DB_POOL_CONNECTIONS.set(pool.checkedout(), state="checked_out")
+        DB_POOL_CONNECTIONS.set(pool.checkedin(), state="idle")
+        DB_POOL_CONNECTIONS.set(max(pool.overflow(), 0), state="overflow")
+        DB_POOL_CONNECTIONS.set(pool.size(), state="size")
+
+
+on_collect(_sample_pool)
+
 # Session factory
 SessionLocal = sessionmaker(
     autocommit=False,
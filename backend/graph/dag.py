@@ -0,0 +1,361 @@
+# graph/dag.py
+
+from itertools import chain
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import PathNode, PathEdge, NodeProgressStatus
+
+# -----------------------------------------------------------------------------
+# Compact DAG
+# -----------------------------------------------------------------------------
+#
+# A learning path's graph as CSR arrays: node i's successors are
+# indices[indptr[i]:indptr[i + 1]] (and likewise for predecessors with the
+# rev_* arrays). Positions 0..n-1 map to PathNode ids through `node_ids`.
+# Instances are immutable; derived results (topological order, depth) are
+# computed once and cached.
+
+
+class CycleError(ValueError):
+    def __init__(self, cycle: List[int]):
+        self.cycle = cycle
+        super().__init__(f"graph has a cycle: {' -> '.join(map(str, cycle + cycle[:1]))}")
+
+
+def _expand(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (neighbours, owning row) for every CSR entry of `rows`, without a
+    Python-level loop.
+    """
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=indices.dtype)
+        return empty, empty
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return indices[offsets], np.repeat(rows, counts)
+
+
+def _csr(n: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32)
+
+
+class CSRDag:
+    __slots__ = (
+        "node_ids", "_position", "indptr", "indices", "rev_indptr", "rev_indices",
+        "_kahn_cache",
+    )
+
+    def __init__(self, node_ids: np.ndarray, src: np.ndarray, dst: np.ndarray):
+        """
+        `src`/`dst` are positions into `node_ids`; prefer the from_* builders.
+        """
+        n = len(node_ids)
+        self.node_ids = node_ids
+        self._position = dict(zip(node_ids.tolist(), range(n)))
+        self.indptr, self.indices = _csr(n, src, dst)
+        self.rev_indptr, self.rev_indices = _csr(n, dst, src)
+        self._kahn_cache = None
+
+    # -------------------------------------------------------------------------
+    # Construction
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_edges(cls, node_ids: Iterable[int], edges: Iterable[Tuple[int, int]]) -> "CSRDag":
+        """
+        Builds the graph from node ids and (from_id, to_id) pairs. Edges to
+        unknown ids and duplicate edges are dropped; duplicate node ids are
+        a ValueError.
+        """
+        ids = np.fromiter(node_ids, dtype=np.int64)
+        if np.unique(ids).size != ids.size:
+            raise ValueError("duplicate node ids")
+
+        pairs = np.fromiter(chain.from_iterable(edges), dtype=np.int64).reshape(-1, 2)
+        sorter = np.argsort(ids)
+        sorted_ids = ids[sorter]
+
+        def positions(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            at = np.searchsorted(sorted_ids, values)
+            at = np.minimum(at, max(len(ids) - 1, 0))
+            known = sorted_ids[at] == values if len(ids) else np.zeros(len(values), bool)
+            return sorter[at] if len(ids) else at, known
+
+        src, src_known = positions(pairs[:, 0])
+        dst, dst_known = positions(pairs[:, 1])
+        keep = src_known & dst_known
+        src, dst = src[keep], dst[keep]
+
+        # Duplicate edges collapse to one
+        n = len(ids)
+        unique = np.unique(src * max(n, 1) + dst)
+        return cls(ids, unique // max(n, 1), unique % max(n, 1))
+
+    @classmethod
+    def from_path(cls, nodes: Iterable[PathNode], edges: Iterable[PathEdge]) -> "CSRDag":
+        return cls.from_edges(
+            (n.id for n in nodes),
+            ((e.from_node_id, e.to_node_id) for e in edges),
+        )
+
+    @classmethod
+    def from_db(cls, db: Session, path_id: int) -> "CSRDag":
+        """
+        Two column-only queries; no ORM objects are loaded.
+        """
+        node_ids = [
+            row[0] for row in db.query(PathNode.id).filter(PathNode.path_id == path_id)
+        ]
+        edges = db.query(PathEdge.from_node_id, PathEdge.to_node_id).filter(
+            PathEdge.path_id == path_id
+        )
+        return cls.from_edges(node_ids, (tuple(row) for row in edges))
+
+    # -------------------------------------------------------------------------
+    # Basics
+    # -------------------------------------------------------------------------
+
+    @property
+    def n(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def m(self) -> int:
+        return len(self.indices)
+
+    def position(self, node_id: int) -> int:
+        return self._position[node_id]
+
+    def edge_positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        src = np.repeat(np.arange(self.n), np.diff(self.indptr))
+        return src, self.indices
+
+    def edges(self) -> List[Tuple[int, int]]:
+        src, dst = self.edge_positions()
+        return list(zip(self.node_ids[src].tolist(), self.node_ids[dst].tolist()))
+
+    def successors(self, node_id: int) -> List[int]:
+        i = self._position[node_id]
+        return self.node_ids[self.indices[self.indptr[i]:self.indptr[i + 1]]].tolist()
+
+    def predecessors(self, node_id: int) -> List[int]:
+        i = self._position[node_id]
+        return self.node_ids[self.rev_indices[self.rev_indptr[i]:self.rev_indptr[i + 1]]].tolist()
+
+    # -------------------------------------------------------------------------
+    # Topological order, depth, cycles
+    # -------------------------------------------------------------------------
+
+    def _kahn(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Level-synchronous Kahn: every iteration releases a whole level at
+        once. Returns (order, level) with level -1 for nodes on or behind a
+        cycle. O(n + m) overall.
+        """
+        if self._kahn_cache is not None:
+            return self._kahn_cache
+
+        n = self.n
+        indegree = np.diff(self.rev_indptr)
+        level = np.full(n, -1, dtype=np.int64)
+        frontier = np.flatnonzero(indegree == 0)
+        chunks = []
+        depth = 0
+
+        while frontier.size:
+            level[frontier] = depth
+            chunks.append(frontier)
+            successors, _ = _expand(self.indptr, self.indices, frontier)
+            if not successors.size:
+                break
+            touched, counts = np.unique(successors, return_counts=True)
+            indegree[touched] -= counts
+            frontier = touched[indegree[touched] == 0]
+            depth += 1
+
+        order = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+        self._kahn_cache = (order, level)
+        return self._kahn_cache
+
+    def find_cycle(self) -> Optional[List[int]]:
+        """
+        One cycle as a list of node ids, or None for a DAG. Every node Kahn
+        could not release has an unreleased predecessor, so walking
+        predecessors from one of them must revisit a node.
+        """
+        _, level = self._kahn()
+        stuck = level < 0
+        if not stuck.any():
+            return None
+
+        walk: List[int] = []
+        seen: Dict[int, int] = {}
+        current = int(np.flatnonzero(stuck)[0])
+        while current not in seen:
+            seen[current] = len(walk)
+            walk.append(current)
+            preds = self.rev_indices[self.rev_indptr[current]:self.rev_indptr[current + 1]]
+            current = int(preds[stuck[preds]][0])
+
+        cycle = walk[seen[current]:][::-1]
+        return self.node_ids[cycle].tolist()
+
+    def has_cycle(self) -> bool:
+        return bool((self._kahn()[1] < 0).any())
+
+    def topological_order(self) -> List[int]:
+        """
+        Node ids, prerequisites first. Raises CycleError.
+        """
+        order, level = self._kahn()
+        if len(order) < self.n:
+            raise CycleError(self.find_cycle())
+        return self.node_ids[order].tolist()
+
+    def depth(self) -> Dict[int, int]:
+        """
+        node id -> length of the longest prerequisite chain leading to it
+        (roots are 0). Raises CycleError.
+        """
+        order, level = self._kahn()
+        if len(order) < self.n:
+            raise CycleError(self.find_cycle())
+        return dict(zip(self.node_ids.tolist(), level.tolist()))
+
+    def levels(self) -> List[List[int]]:
+        """
+        Node ids grouped by depth.
+        """
+        depth = self.depth()
+        grouped: List[List[int]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for node_id, d in depth.items():
+            grouped[d].append(node_id)
+        return grouped
+
+    # -------------------------------------------------------------------------
+    # Progress
+    # -------------------------------------------------------------------------
+
+    def frontier(self, status_by_id: Mapping[int, str]) -> Dict[str, List[int]]:
+        """
+        Splits the nodes by what the learner can do next, given NodeProgress
+        statuses (missing means not started):
+
+        - available:   not started, every prerequisite completed
+        - in_progress / blocked: as recorded, every prerequisite completed
+        - locked:      not completed, some prerequisite not completed
+          (e.g. behind a newly inserted remedial node)
+        - completed
+        """
+        n = self.n
+        status = np.zeros(n, dtype=np.int8)  # 0 not started
+        codes = {
+            NodeProgressStatus.IN_PROGRESS: 1,
+            NodeProgressStatus.BLOCKED: 2,
+            NodeProgressStatus.COMPLETED: 3,
+        }
+        for node_id, value in status_by_id.items():
+            i = self._position.get(node_id)
+            if i is not None:
+                status[i] = codes.get(value, 0)
+
+        completed = status == 3
+        src, dst = self.edge_positions()
+        pending = np.bincount(dst[~completed[src]], minlength=n)
+        unlocked = pending == 0
+
+        def ids(mask: np.ndarray) -> List[int]:
+            return self.node_ids[mask].tolist()
+
+        return {
+            "available": ids(unlocked & (status == 0)),
+            "in_progress": ids(unlocked & (status == 1)),
+            "blocked": ids(unlocked & (status == 2)),
+            "locked": ids(~unlocked & ~completed),
+            "completed": ids(completed),
+        }
+
+    # -------------------------------------------------------------------------
+    # Reachability and transitive reduction
+    # -------------------------------------------------------------------------
+
+    def _reach(self, node_id: int, indptr: np.ndarray, indices: np.ndarray) -> List[int]:
+        n = self.n
+        seen = np.zeros(n, dtype=bool)
+        frontier = np.array([self._position[node_id]])
+        while frontier.size:
+            nxt, _ = _expand(indptr, indices, frontier)
+            nxt = np.unique(nxt[~seen[nxt]])
+            seen[nxt] = True
+            frontier = nxt
+        return self.node_ids[seen].tolist()
+
+    def descendants(self, node_id: int) -> List[int]:
+        return self._reach(node_id, self.indptr, self.indices)
+
+    def ancestors(self, node_id: int) -> List[int]:
+        return self._reach(node_id, self.rev_indptr, self.rev_indices)
+
+    def _descendant_bits(self) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+        """
+        Packed descendant bitsets (row u has bit v set iff v is reachable
+        from u), filled in reverse topological order, and the positions of
+        the redundant edges found on the way. O(m * n / 8) byte operations.
+        Raises CycleError.
+        """
+        order, _ = self._kahn()
+        if len(order) < self.n:
+            raise CycleError(self.find_cycle())
+
+        n = self.n
+        desc = np.zeros((n, (n + 7) // 8), dtype=np.uint8)
+        redundant: List[Tuple[int, int]] = []
+
+        for u in order[::-1]:
+            children = self.indices[self.indptr[u]:self.indptr[u + 1]]
+            if not children.size:
+                continue
+            # Everything strictly below u's children
+            below = np.bitwise_or.reduce(desc[children], axis=0)
+            implied = (below[children >> 3] >> (children & 7).astype(np.uint8)) & 1
+            redundant.extend((int(u), int(v)) for v in children[implied.astype(bool)])
+            np.bitwise_or.at(below, children >> 3, (1 << (children & 7)).astype(np.uint8))
+            desc[u] = below
+
+        return desc, redundant
+
+    def redundant_edges(self) -> List[Tuple[int, int]]:
+        """
+        Edges u -> v implied by a longer path u -> ... -> v. Raises
+        CycleError.
+        """
+        _, redundant = self._descendant_bits()
+        return [(int(self.node_ids[u]), int(self.node_ids[v])) for u, v in redundant]
+
+    def closure(self) -> List[Tuple[int, int]]:
+        """
+        Every (ancestor, descendant) pair, i.e. the transitive closure.
+        Raises CycleError.
+        """
+        desc, _ = self._descendant_bits()
+        reach = np.unpackbits(desc, axis=1, count=self.n, bitorder="little")
+        ancestors, descendants = np.nonzero(reach)
+        return list(zip(self.node_ids[ancestors].tolist(), self.node_ids[descendants].tolist()))
+
+    def transitive_reduction(self) -> "CSRDag":
+        """
+        The same reachability with redundant edges removed.
+        """
+        redundant = set(self.redundant_edges())
+        return CSRDag.from_edges(
+            self.node_ids.tolist(),
+            (e for e in self.edges() if e not in redundant),
+        )
@@ -0,0 +1,170 @@
+# graph/layout.py
+
+from bisect import bisect_right, insort
+from collections import defaultdict
+from typing import Any, Dict, Hashable, List
+
+from graph.dag import CSRDag
+
+# -----------------------------------------------------------------------------
+# Layered (Sugiyama-style) layout
+# -----------------------------------------------------------------------------
+#
+# 1. Layering: each node's depth (longest prerequisite chain), so every
+#    edge points down.
+# 2. Edges spanning several layers get a dummy vertex per crossed layer.
+# 3. Crossing reduction: alternating down / up barycenter sweeps, keeping
+#    the best ordering seen.
+# 4. Coordinates: vertices are pulled toward the mean x of their
+#    neighbours, then pushed apart to the minimum spacing in layer order.
+#
+# Defaults match the project page's node box (180px wide).
+
+NODE_WIDTH = 180
+NODE_HEIGHT = 60
+H_GAP = 70
+V_GAP = 90
+
+
+def _crossings(upper: List[Hashable], lower: List[Hashable], down: Dict) -> int:
+    """
+    Crossings between two adjacent layers: inversions in the lower
+    positions of the edges taken in upper order.
+    """
+    lower_pos = {v: i for i, v in enumerate(lower)}
+    seen: List[int] = []
+    crossings = 0
+    for u in upper:
+        targets = sorted(lower_pos[v] for v in down[u])
+        for t in targets:
+            crossings += len(seen) - bisect_right(seen, t)
+        for t in targets:
+            insort(seen, t)
+    return crossings
+
+
+def _total_crossings(layers: List[List[Hashable]], down: Dict) -> int:
+    return sum(_crossings(layers[i], layers[i + 1], down) for i in range(len(layers) - 1))
+
+
+def _barycenter_sort(layer: List[Hashable], neighbours: Dict, position: Dict) -> List[Hashable]:
+    def key(item):
+        i, v = item
+        ns = neighbours[v]
+        return (sum(position[n] for n in ns) / len(ns)) if ns else float(i)
+
+    return [v for _, v in sorted(enumerate(layer), key=key)]
+
+
+def layered_layout(
+    dag: CSRDag,
+    *,
+    node_width: int = NODE_WIDTH,
+    node_height: int = NODE_HEIGHT,
+    h_gap: int = H_GAP,
+    v_gap: int = V_GAP,
+    sweeps: int = 8,
+) -> Dict[str, Any]:
+    """
+    {"width", "height", "nodes": [{"node_id", "x", "y", "layer"}]} with
+    top-left coordinates, prerequisites above their dependents. Raises
+    graph.dag.CycleError.
+    """
+    depth = dag.depth()
+    node_ids = dag.node_ids.tolist()
+    if not node_ids:
+        return {"width": 0, "height": 0, "nodes": []}
+
+    layers: List[List[Hashable]] = [[] for _ in range(max(depth.values()) + 1)]
+    for node_id in node_ids:
+        layers[depth[node_id]].append(node_id)
+
+    up: Dict[Hashable, List[Hashable]] = defaultdict(list)
+    down: Dict[Hashable, List[Hashable]] = defaultdict(list)
+    for a, b in dag.edges():
+        previous = a
+        for layer in range(depth[a] + 1, depth[b]):
+            dummy = ("dummy", a, b, layer)
+            layers[layer].append(dummy)
+            up[dummy].append(previous)
+            down[previous].append(dummy)
+            previous = dummy
+        up[b].append(previous)
+        down[previous].append(b)
+
+    # ---- Crossing reduction ----------------------------------------------------
+    best = [list(layer) for layer in layers]
+    best_crossings = _total_crossings(layers, down)
+    for sweep in range(sweeps):
+        if not best_crossings:
+            break
+        position = {v: i for layer in layers for i, v in enumerate(layer)}
+        if sweep % 2 == 0:
+            for i in range(1, len(layers)):
+                layers[i] = _barycenter_sort(layers[i], up, position)
+                position.update({v: j for j, v in enumerate(layers[i])})
+        else:
+            for i in range(len(layers) - 2, -1, -1):
+                layers[i] = _barycenter_sort(layers[i], down, position)
+                position.update({v: j for j, v in enumerate(layers[i])})
+        crossings = _total_crossings(layers, down)
+        if crossings < best_crossings:
+            best, best_crossings = [list(layer) for layer in layers], crossings
+    layers = best
+
+    # ---- Coordinates -----------------------------------------------------------
+    # x is a vertex's centre. Dummies are edge bends: no width, half the gap.
+    def width(v: Hashable) -> float:
+        return 0 if isinstance(v, tuple) else node_width
+
+    def separation(left: Hashable, right: Hashable) -> float:
+        gap = h_gap if not (isinstance(left, tuple) or isinstance(right, tuple)) else h_gap / 2
+        return (width(left) + width(right)) / 2 + gap
+
+    x: Dict[Hashable, float] = {}
+    for layer in layers:
+        x[layer[0]] = 0.0
+        for left, right in zip(layer, layer[1:]):
+            x[right] = x[left] + separation(left, right)
+
+    def place(layer: List[Hashable], neighbours: Dict) -> None:
+        desired = [
+            sum(x[n] for n in neighbours[v]) / len(neighbours[v]) if neighbours[v] else x[v]
+            for v in layer
+        ]
+        # Restore the minimum spacing in layer order, pushing rightwards and
+        # leftwards; the average of both satisfies it too without drifting.
+        pushed_right = list(desired)
+        for i in range(1, len(layer)):
+            pushed_right[i] = max(desired[i], pushed_right[i - 1] + separation(layer[i - 1], layer[i]))
+        pushed_left = list(desired)
+        for i in range(len(layer) - 2, -1, -1):
+            pushed_left[i] = min(desired[i], pushed_left[i + 1] - separation(layer[i], layer[i + 1]))
+        for v, r, l in zip(layer, pushed_right, pushed_left):
+            x[v] = (r + l) / 2
+
+    for _ in range(2):
+        for layer in layers[1:]:
+            place(layer, up)
+        for layer in reversed(layers[:-1]):
+            place(layer, down)
+
+    real = [v for v in x if not isinstance(v, tuple)]
+    min_x = min(x[v] for v in real) - node_width / 2
+    max_x = max(x[v] for v in real) + node_width / 2
+    nodes = [
+        {
+            "node_id": v,
+            "x": round(x[v] - node_width / 2 - min_x),
+            "y": layer_index * (node_height + v_gap),
+            "layer": layer_index,
+        }
+        for layer_index, layer in enumerate(layers)
+        for v in layer
+        if not isinstance(v, tuple)
+    ]
+    return {
+        "width": round(max_x - min_x),
+        "height": len(layers) * (node_height + v_gap) - v_gap,
+        "nodes": nodes,
+    }
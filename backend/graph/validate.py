@@ -0,0 +1,191 @@
+# graph/validate.py
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from graph.dag import CSRDag
+from services.metrics import Counter
+
+# -----------------------------------------------------------------------------
+# DAG validation and repair
+# -----------------------------------------------------------------------------
+#
+# The DAG builder's output is checked and repaired locally before anything
+# is persisted, so structural correctness no longer depends on the model
+# (or on an LLM judge): duplicate / missing node ids, dangling and duplicate
+# edges, cycles (back-edges are cut) and transitively implied edges.
+
+DAG_REPAIRS = Counter(
+    "dag_repairs_total",
+    "Structural issues repaired in model-generated DAGs",
+    ["issue"],
+)
+
+
+@dataclass
+class DagReport:
+    nodes: int = 0
+    edges: int = 0
+    depth: int = 0
+    missing_node_ids: int = 0
+    duplicate_node_ids: List[str] = field(default_factory=list)
+    dangling_edges: List[Tuple[str, str]] = field(default_factory=list)
+    duplicate_edges: int = 0
+    cycle_edges_cut: List[Tuple[str, str]] = field(default_factory=list)
+    transitive_edges_removed: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def repaired(self) -> bool:
+        return bool(
+            self.missing_node_ids or self.duplicate_node_ids or self.dangling_edges
+            or self.duplicate_edges or self.cycle_edges_cut or self.transitive_edges_removed
+        )
+
+    @property
+    def structure_score(self) -> float:
+        """
+        0-5 on the eval's Structure scale. Redundant edges cost little;
+        broken references and cycles are real defects of the model output.
+        """
+        score = 5.0
+        if self.duplicate_edges or self.transitive_edges_removed:
+            score -= 0.5
+        if self.missing_node_ids or self.duplicate_node_ids or self.dangling_edges:
+            score -= 1.5
+        if self.cycle_edges_cut:
+            score -= 2.5
+        return max(score, 0.0)
+
+    def as_metadata(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["repaired"] = self.repaired
+        data["structure_score"] = self.structure_score
+        return data
+
+
+class NodeIds:
+    """
+    repair_dag's node id rules, applied one node at a time so that nodes
+    streamed from the model can be persisted as they arrive: a node without
+    an id gets a synthetic one, a repeated id is dropped (the first wins).
+    """
+
+    def __init__(self):
+        # id -> position among the accepted nodes
+        self.position: Dict[str, int] = {}
+        self.missing = 0
+        self.duplicates: List[str] = []
+
+    def accept(self, node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The node to keep (with its id filled in), or None for a duplicate.
+        """
+        if not node.get("id"):
+            self.missing += 1
+            node = {**node, "id": f"_n{len(self.position)}"}
+        node_id = str(node["id"])
+        if node_id in self.position:
+            self.duplicates.append(node_id)
+            return None
+        self.position[node_id] = len(self.position)
+        return node
+
+
+def _back_edges(dag: CSRDag) -> List[Tuple[int, int]]:
+    """
+    Positions (u, v) of the edges closing a cycle in a DFS that visits
+    nodes in their original order. Removing them leaves a DAG.
+    """
+    n = dag.n
+    state = np.zeros(n, dtype=np.int8)  # 0 new, 1 on stack, 2 done
+    cut = []
+
+    for root in range(n):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, int(dag.indptr[root]))]
+        while stack:
+            u, next_edge = stack[-1]
+            if next_edge == dag.indptr[u + 1]:
+                state[u] = 2
+                stack.pop()
+                continue
+            stack[-1] = (u, next_edge + 1)
+            v = int(dag.indices[next_edge])
+            if state[v] == 1:
+                cut.append((u, v))
+            elif state[v] == 0:
+                state[v] = 1
+                stack.append((v, int(dag.indptr[v])))
+
+    return cut
+
+
+def repair_dag(dag: Dict[str, Any]) -> Tuple[Dict[str, Any], DagReport]:
+    """
+    Returns a structurally valid copy of a DAG builder result
+    ({"nodes": [{"id", ...}], "edges": [{"from", "to"}]}) and a report of
+    what was repaired. Node order and content are preserved.
+    """
+    report = DagReport()
+
+    # ---- Nodes ---------------------------------------------------------------
+    ids = NodeIds()
+    nodes = [n for n in map(ids.accept, dag.get("nodes") or []) if n is not None]
+    position = ids.position
+    report.missing_node_ids = ids.missing
+    report.duplicate_node_ids = ids.duplicates
+
+    # ---- Edges ---------------------------------------------------------------
+    pairs: List[Tuple[int, int]] = []
+    seen = set()
+    for edge in dag.get("edges") or []:
+        src, dst = str(edge.get("from")), str(edge.get("to"))
+        if src not in position or dst not in position:
+            report.dangling_edges.append((src, dst))
+            continue
+        pair = (position[src], position[dst])
+        if pair in seen:
+            report.duplicate_edges += 1
+            continue
+        seen.add(pair)
+        pairs.append(pair)
+
+    graph = CSRDag.from_edges(range(len(nodes)), pairs)
+
+    if graph.has_cycle():
+        cut = _back_edges(graph)
+        report.cycle_edges_cut = [(nodes[u]["id"], nodes[v]["id"]) for u, v in cut]
+        cut_set = set(cut)
+        graph = CSRDag.from_edges(range(len(nodes)), (p for p in pairs if p not in cut_set))
+
+    redundant = graph.redundant_edges()
+    if redundant:
+        report.transitive_edges_removed = [(nodes[u]["id"], nodes[v]["id"]) for u, v in redundant]
+        graph = graph.transitive_reduction()
+
+    # Keep the model's edge order for what survives
+    kept = set(graph.edges())
+    edges = [
+        {"from": nodes[u]["id"], "to": nodes[v]["id"]} for u, v in pairs if (u, v) in kept
+    ]
+
+    report.nodes = len(nodes)
+    report.edges = len(edges)
+    report.depth = max(graph.depth().values(), default=0)
+
+    for issue, count in (
+        ("missing_node_id", report.missing_node_ids),
+        ("duplicate_node_id", len(report.duplicate_node_ids)),
+        ("dangling_edge", len(report.dangling_edges)),
+        ("duplicate_edge", report.duplicate_edges),
+        ("cycle_edge", len(report.cycle_edges_cut)),
+        ("transitive_edge", len(report.transitive_edges_removed)),
+    ):
+        if count:
+            DAG_REPAIRS.inc(count, issue=issue)
+
+    return {**dag, "nodes": nodes, "edges": edges}, report
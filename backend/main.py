@@ -1,9 +1,19 @@
 # main.py
-from fastapi import FastAPI
+import math
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from routes import paths, challenges, progress
+from fastapi.responses import JSONResponse, PlainTextResponse
+from routes import paths, challenges, progress, events
 from models import Base
 from db import engine
+from core.auth import jwks
+from services.events import start_listener, stop_listener
+from services.http_metrics import MetricsMiddleware
+from services.metrics import render_latest, start_flusher
+from services.query_budget import QueryCountMiddleware
+from services.request_timing import TimingMiddleware
+from services.llm_resilience import LLMUnavailableError
 
 
 app = FastAPI(title="Traverse API")
@@ -19,11 +29,49 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryCountMiddleware)
+# Outermost, so the Server-Timing total covers the other middleware too
+app.add_middleware(TimingMiddleware)
 
 app.include_router(paths.router)
 app.include_router(challenges.router)
 app.include_router(progress.router)
+app.include_router(events.router)
+
+
+@app.on_event("startup")
+def start_background_threads():
+    # Signing keys are in memory before the first request arrives
+    jwks.start()
+    # No-op unless METRICS_MULTIPROC_DIR is set
+    start_flusher()
+    # No-op unless the database is Postgres
+    start_listener(engine)
+
+
+@app.on_event("shutdown")
+def stop_background_threads():
+    jwks.stop()
+    stop_listener()
+
+
+@app.exception_handler(LLMUnavailableError)
+def llm_unavailable_handler(request: Request, exc: LLMUnavailableError):
+    # Circuit open / deadline exhausted: tell clients to back off instead of
+    # surfacing a generic 500.
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
 
 @app.get("/")
 def root():
-    return {"status": "ok", "service": "traverse-backend"}
\ No newline at end of file
+    return {"status": "ok", "service": "traverse-backend"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    # Prometheus text format; merged across workers with METRICS_MULTIPROC_DIR
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime,
-    ForeignKey, JSON, Float
+    Column, Integer, BigInteger, String, Text, DateTime,
+    ForeignKey, JSON, Float, Index, Boolean, UniqueConstraint, text
 )
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.dialects.postgresql import UUID
@@ -31,6 +31,10 @@ class LearningPath(Base):
     summary = Column(Text, nullable=True)
     research_context = Column(JSON, nullable=True)
 
+    # Bumped on every change to the path's graph or the learner's progress
+    # on it; each bump has one PathChange entry
+    version = Column(Integer, nullable=False, default=0)
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -38,11 +42,16 @@ class LearningPath(Base):
     edges = relationship("PathEdge", backref="path", cascade="all, delete-orphan")
 
 
-class PathNode(Base):
-    __tablename__ = "path_nodes"
+class NodeCatalog(Base):
+    """
+    Content-addressed node text shared by every path that contains an
+    identical node. Rows are immutable; `content_hash` is the SHA-256 of
+    the canonical content (see services/node_catalog.py).
+    """
+    __tablename__ = "node_catalog"
 
     id = Column(Integer, primary_key=True)
-    path_id = Column(Integer, ForeignKey("learning_paths.id"), nullable=False)
+    content_hash = Column(String(64), nullable=False, unique=True)
 
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
@@ -50,14 +59,111 @@ class PathNode(Base):
     estimated_minutes = Column(Integer, nullable=True)
     metadata_json = Column(JSON, nullable=True)
 
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PathNode(Base):
+    __tablename__ = "path_nodes"
+
+    id = Column(Integer, primary_key=True)
+    path_id = Column(Integer, ForeignKey("learning_paths.id"), nullable=False)
+    catalog_id = Column(Integer, ForeignKey("node_catalog.id"), nullable=False, index=True)
+
+    # Joined so loading a path's nodes reads their content in the same query
+    catalog = relationship("NodeCatalog", lazy="joined", innerjoin=True)
+
+    @property
+    def title(self):
+        return self.catalog.title
+
+    @property
+    def description(self):
+        return self.catalog.description
+
+    @property
+    def node_type(self):
+        return self.catalog.node_type
+
+    @property
+    def estimated_minutes(self):
+        return self.catalog.estimated_minutes
+
+    @property
+    def metadata_json(self):
+        return self.catalog.metadata_json
+
 
 class PathEdge(Base):
     __tablename__ = "path_edges"
 
     id = Column(Integer, primary_key=True)
     path_id = Column(Integer, ForeignKey("learning_paths.id"), nullable=False)
-    from_node_id = Column(Integer, ForeignKey("path_nodes.id"), nullable=False)
-    to_node_id = Column(Integer, ForeignKey("path_nodes.id"), nullable=False)
+    from_node_id = Column(Integer, ForeignKey("path_nodes.id"), nullable=False, index=True)
+    to_node_id = Column(Integer, ForeignKey("path_nodes.id"), nullable=False, index=True)
+
+
+class PathReachability(Base):
+    """
+    Transitive closure of a path's edges: one row per (ancestor, descendant)
+    pair, so prerequisite queries are index lookups instead of graph walks.
+    Maintained by services/reachability.py.
+    """
+    __tablename__ = "path_reachability"
+
+    id = Column(Integer, primary_key=True)
+    path_id = Column(Integer, ForeignKey("learning_paths.id", ondelete="CASCADE"), nullable=False, index=True)
+    ancestor_id = Column(Integer, ForeignKey("path_nodes.id", ondelete="CASCADE"), nullable=False)
+    descendant_id = Column(Integer, ForeignKey("path_nodes.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("ancestor_id", "descendant_id", name="uq_path_reachability_pair"),
+        Index("ix_path_reachability_descendant", "descendant_id"),
+    )
+
+
+class PathLayout(Base):
+    """
+    Precomputed node coordinates (graph/layout.py), replaced whenever the
+    path's graph changes; `version` is the path version it was computed at.
+    """
+    __tablename__ = "path_layouts"
+
+    id = Column(Integer, primary_key=True)
+    path_id = Column(Integer, ForeignKey("learning_paths.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    layout_json = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("path_id", "version", name="uq_path_layouts_path_version"),
+    )
+
+
+class PathChangeType:
+    NODE_ADDED = "node_added"
+    EDGE_ADDED = "edge_added"
+    PROGRESS_CHANGED = "progress_changed"
+
+
+class PathChange(Base):
+    """
+    One entry of a path's change log: the change that produced `version`.
+    Compacted to the last PATH_CHANGE_LOG_RETENTION entries per path.
+    """
+    __tablename__ = "path_changes"
+
+    id = Column(Integer, primary_key=True)
+    path_id = Column(Integer, ForeignKey("learning_paths.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    change_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("path_id", "version", name="uq_path_changes_path_version"),
+    )
 
 
 class NodeProgressStatus:
@@ -82,12 +188,96 @@ class NodeProgress(Base):
 
     node = relationship("PathNode")
 
+    __table_args__ = (
+        Index("ix_node_progress_user_node", "user_id", "node_id"),
+    )
+
+
+class PathFrontier(Base):
+    """
+    A learner's unlocked nodes of a path: not completed, every prerequisite
+    completed. Maintained incrementally by services/frontier.py.
+    """
+    __tablename__ = "path_frontier"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    path_id = Column(Integer, ForeignKey("learning_paths.id", ondelete="CASCADE"), nullable=False)
+    node_id = Column(Integer, ForeignKey("path_nodes.id", ondelete="CASCADE"), nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "node_id", name="uq_path_frontier_user_node"),
+        Index("ix_path_frontier_user_path", "user_id", "path_id"),
+    )
+
+
+class RemedialStatus:
+    PENDING = "pending"
+    READY = "ready"
+    APPLIED = "applied"
+    FAILED = "failed"
+    DISCARDED = "discarded"
+
+
+class RemedialDraft(Base):
+    """
+    A remedial node generated in the background for a learner struggling
+    with `struggling_node_id` (services/remedial.py). It is spliced into the
+    path once `apply_requested` is set and the content is ready.
+    """
+    __tablename__ = "remedial_drafts"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    path_id = Column(Integer, ForeignKey("learning_paths.id", ondelete="CASCADE"), nullable=False)
+    struggling_node_id = Column(Integer, ForeignKey("path_nodes.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(String, nullable=False, default=RemedialStatus.PENDING)
+    speculative = Column(Boolean, nullable=False, default=False)
+    apply_requested = Column(Boolean, nullable=False, default=False)
+    adaptation_suggestion = Column(Text, nullable=True)
+
+    catalog_id = Column(Integer, ForeignKey("node_catalog.id"), nullable=True)
+    node_id = Column(Integer, ForeignKey("path_nodes.id", ondelete="SET NULL"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_remedial_drafts_user_node", "user_id", "struggling_node_id"),
+    )
+
+
+class ChallengeVariant(Base):
+    """
+    A pre-generated challenge shared by every node with the same canonical
+    fingerprint (normalized title + tags + domain).
+    """
+    __tablename__ = "challenge_variants"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False, index=True)
+
+    challenge_type = Column(String, nullable=True)
+    prompt = Column(Text, nullable=False)
+    expected_answer_outline = Column(Text, nullable=True)
+    rubric_json = Column(JSON, nullable=True)
+    difficulty = Column(String, nullable=True)
+
+    served_count = Column(Integer, nullable=False, default=0)
+    active = Column(Boolean, nullable=False, default=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 
 class Challenge(Base):
     __tablename__ = "challenges"
 
     id = Column(Integer, primary_key=True)
     node_id = Column(Integer, ForeignKey("path_nodes.id"), nullable=False)
+    variant_id = Column(Integer, ForeignKey("challenge_variants.id"), nullable=True)
 
     prompt = Column(Text, nullable=False)
     expected_answer_outline = Column(Text, nullable=True)
@@ -110,6 +300,99 @@ class ChallengeAttempt(Base):
     score = Column(Float, nullable=True)
     feedback = Column(Text, nullable=True)
 
+    # Grade cache (services/grade_cache.py)
+    answer_hash = Column(String(64), nullable=True)
+    answer_simhash = Column(BigInteger, nullable=True)
+    # Failed gradings are stored as SQL NULL, so `grading_json IS NULL` finds them
+    grading_json = Column(JSON(none_as_null=True), nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
 
     challenge = relationship("Challenge", backref="attempts")
+
+    __table_args__ = (
+        Index("ix_challenge_attempts_challenge_answer_hash", "challenge_id", "answer_hash"),
+    )
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+# Jobs that hold their dedupe_key (see ux_jobs_dedupe)
+DEDUPE_ACTIVE = "status IN ('queued', 'running')"
+
+
+class Job(Base):
+    """
+    A unit of agent work for `python -m worker` (services/job_queue.py).
+    A running job whose `locked_until` has passed is visible again and is
+    reclaimed by the next worker.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    job_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # At most one queued or running job per (job_type, dedupe_key)
+    dedupe_key = Column(String, nullable=True)
+
+    status = Column(String, nullable=False, default=JobStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    locked_by = Column(String, nullable=True)
+
+    result = Column(JSON, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_claim", "job_type", "status", "run_after"),
+        Index(
+            "ux_jobs_dedupe",
+            "job_type",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text(DEDUPE_ACTIVE),
+            sqlite_where=text(DEDUPE_ACTIVE),
+        ),
+    )
+
+
+class IdempotencyStatus:
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+
+class IdempotencyKey(Base):
+    """
+    The stored outcome of a request sent with an `Idempotency-Key` header
+    (services/idempotency.py), so client retries return it instead of
+    re-running the pipeline.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    endpoint = Column(String, nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+
+    status = Column(String, nullable=False, default=IdempotencyStatus.IN_PROGRESS)
+    response_status = Column(Integer, nullable=True)
+    response_json = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "endpoint", "key", name="uq_idempotency_keys_user_endpoint_key"),
+    )
@@ -1,30 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 from uuid import UUID
+from typing import Optional
 from pydantic import BaseModel
 
 from db import get_db
 from models import (
-    PathNode, LearningPath, Challenge, ChallengeAttempt, PathEdge,
-    NodeProgress, NodeProgressStatus
+    PathNode, LearningPath, Challenge, ChallengeAttempt,
+    NodeProgress, NodeProgressStatus, PathChangeType, RemedialStatus
 )
 from schemas import (
     ChallengeCreateResponse,
     ChallengeSubmitRequest,
     ChallengeSubmitResponse,
+    RemedialNodeStatus,
     Hint as HintSchema
 )
 from agents.challenge_agent import run_challenge_agent
 from agents.tutor_agent import run_tutor_agent, run_hint_agent
-from agents.dag_builder_agent import run_remedial_node_agent
 from core.auth import get_current_user_id
+from core.config import REMEDIAL_SPECULATIVE_ATTEMPTS, REMEDIAL_SPECULATIVE_ENABLED
+from services.grade_cache import cache_fields, lookup_cached_grade
+from services.idempotency import IdempotentRequest
+from services.challenge_pool import get_pooled_challenge
+from services.events import emit
+from services.frontier import completion_changed
+from services.path_changes import progress_payload, record_change
+from services.request_timing import TimedRoute
+from services.remedial import (
+    REMEDIAL_DRAFTS,
+    apply_if_requested,
+    discard_drafts,
+    request_remedial,
+)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 class HintRequest(BaseModel):
     hintLevel: int
 
-# ... (create_or_get_challenge is assumed to be here)
+@router.post(
+    "/api/paths/{path_id}/nodes/{node_id}/challenges",
+    response_model=ChallengeCreateResponse,
+)
+def create_or_get_challenge(
+    path_id: int,
+    node_id: int,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    path = db.query(LearningPath).filter(
+        LearningPath.id == path_id,
+        LearningPath.user_id == UUID(user_id),
+    ).first()
+    if not path:
+        raise HTTPException(status_code=404, detail="Path not found")
+
+    node = db.query(PathNode).filter(
+        PathNode.id == node_id,
+        PathNode.path_id == path_id,
+    ).first()
+    if not node:
+        raise HTTPException(status_code=404, detail="Node not found")
+
+    ch = (
+        db.query(Challenge)
+        .filter(Challenge.node_id == node_id)
+        .order_by(Challenge.created_at.desc())
+        .first()
+    )
+
+    if not ch:
+        # Served from the cross-user pool when an equivalent node already
+        # has variants; generated (and pooled) otherwise.
+        ch = get_pooled_challenge(
+            db,
+            user_id=user_id,
+            path_id=path.id,
+            node={
+                "id": node.id,
+                "title": node.title,
+                "description": node.description,
+                "node_type": node.node_type,
+                "tags": (node.metadata_json or {}).get("tags", []),
+            },
+            domain_hint=path.domain_hint,
+            research_context=path.research_context,
+        )
+        if ch is None:
+            raise HTTPException(status_code=502, detail="Challenge generation failed")
+        emit(db, path.user_id, {
+            "type": "challenge_created",
+            "path_id": path.id,
+            "node_id": node.id,
+            "challenge_id": ch.id,
+        })
+        db.commit()
+
+    return ChallengeCreateResponse(challenge_id=ch.id, prompt=ch.prompt)
 
 @router.post("/challenges/{challenge_id}/submit", response_model=ChallengeSubmitResponse)
 def submit_challenge(
@@ -32,125 +105,144 @@ def submit_challenge(
     payload: ChallengeSubmitRequest,
     db: Session = Depends(get_db),
     user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
     user_uuid = UUID(user_id)
 
-    ch = db.query(Challenge).filter(Challenge.id == challenge_id).first()
-    if not ch:
-        raise HTTPException(status_code=404, detail="Challenge not found")
-    
-    struggling_node = db.query(PathNode).filter(PathNode.id == ch.node_id).first()
-    if not struggling_node:
-        raise HTTPException(status_code=404, detail="Associated node not found")
+    # A retried submission must not be graded (and counted as an attempt)
+    # twice.
+    with IdempotentRequest(
+        db,
+        user_id,
+        "POST /challenges/{challenge_id}/submit",
+        idempotency_key,
+        {"challenge_id": challenge_id, **payload.dict()},
+    ) as idem:
+        if idem.response is not None:
+            return idem.response
 
-    path = db.query(LearningPath).filter(LearningPath.id == struggling_node.path_id).first()
-    if not path:
-        raise HTTPException(status_code=404, detail="Associated path not found")
+        ch = db.query(Challenge).filter(Challenge.id == challenge_id).first()
+        if not ch:
+            raise HTTPException(status_code=404, detail="Challenge not found")
+    
+        struggling_node = db.query(PathNode).filter(PathNode.id == ch.node_id).first()
+        if not struggling_node:
+            raise HTTPException(status_code=404, detail="Associated node not found")
 
-    np = db.query(NodeProgress).filter(
-        NodeProgress.user_id == user_uuid,
-        NodeProgress.node_id == ch.node_id,
-    ).first()
-    # Default to 0 if no progress record exists yet
-    current_attempts = np.attempts_count if np else 0
+        path = db.query(LearningPath).filter(LearningPath.id == struggling_node.path_id).first()
+        if not path:
+            raise HTTPException(status_code=404, detail="Associated path not found")
 
-    tutor_result = run_tutor_agent(
-        user_id=user_id,
-        challenge={
-            "id": ch.id,
-            "prompt": ch.prompt,
-            "expected_answer_outline": (ch.expected_answer_outline or "").split("\n"),
-            "rubric": ch.rubric_json or {},
-        },
-        user_answer=payload.answer,
-        attempts_count=current_attempts,
-    )
+        np = db.query(NodeProgress).filter(
+            NodeProgress.user_id == user_uuid,
+            NodeProgress.node_id == ch.node_id,
+        ).first()
+        # Default to 0 if no progress record exists yet
+        current_attempts = np.attempts_count if np else 0
 
-    overall_score = float(tutor_result.get("overall_score", 0.0))
-    passed = bool(tutor_result.get("pass", False))
-    adaptation_suggestion = tutor_result.get("adaptation_suggestion")
-
-    db.add(ChallengeAttempt(
-        challenge_id=ch.id,
-        user_id=user_uuid,
-        submitted_answer=payload.answer,
-        score=overall_score,
-        feedback=tutor_result.get("feedback_summary"),
-    ))
-
-    if np:
-        np.attempts_count += 1
-        np.last_score = overall_score
-        new_status = (
-            NodeProgressStatus.COMPLETED if passed
-            else NodeProgressStatus.BLOCKED if np.attempts_count >= 3
-            else NodeProgressStatus.IN_PROGRESS
-        )
-        np.status = new_status
+        # Identical resubmissions reuse the stored grade instead of paying for
+        # the tutor and eval calls again; the attempt is still recorded below.
+        answer_fields = cache_fields(payload.answer)
+        tutor_result = lookup_cached_grade(db, ch.id, answer_fields, current_attempts)
 
-        # ---- ADAPTIVE INTERVENTION LOGIC ----
-        if new_status == NodeProgressStatus.BLOCKED and adaptation_suggestion:
-            # 1. Generate the remedial node
-            remedial_node_data = run_remedial_node_agent(
+        if tutor_result is None:
+            tutor_result = run_tutor_agent(
                 user_id=user_id,
-                goal_title=path.goal_title,
-                struggling_node_title=struggling_node.title,
-                adaptation_suggestion=adaptation_suggestion,
+                challenge={
+                    "id": ch.id,
+                    "prompt": ch.prompt,
+                    "expected_answer_outline": (ch.expected_answer_outline or "").split("\n"),
+                    "rubric": ch.rubric_json or {},
+                },
+                user_answer=payload.answer,
+                attempts_count=current_attempts,
             )
 
-            # 2. Create the new node in the DB
-            remedial_node = PathNode(
-                path_id=path.id,
-                title=remedial_node_data["title"],
-                description=remedial_node_data["description"],
-                node_type=remedial_node_data.get("node_type", "concept"),
-                estimated_minutes=remedial_node_data.get("estimated_minutes"),
-                metadata_json={"tags": remedial_node_data.get("tags", [])},
+        overall_score = float(tutor_result.get("overall_score", 0.0))
+        passed = bool(tutor_result.get("pass", False))
+        adaptation_suggestion = tutor_result.get("adaptation_suggestion")
+
+        db.add(ChallengeAttempt(
+            challenge_id=ch.id,
+            user_id=user_uuid,
+            submitted_answer=payload.answer,
+            score=overall_score,
+            feedback=tutor_result.get("feedback_summary"),
+            # Failed gradings are not cached
+            grading_json=None if tutor_result.get("error") else tutor_result,
+            **answer_fields,
+        ))
+
+        remedial_draft = None
+        if np:
+            np.attempts_count += 1
+            np.last_score = overall_score
+            new_status = (
+                NodeProgressStatus.COMPLETED if passed
+                else NodeProgressStatus.BLOCKED if np.attempts_count >= 3
+                else NodeProgressStatus.IN_PROGRESS
             )
-            db.add(remedial_node)
-            db.flush() # Flush to get the new node's ID
-
-            # Create a progress entry for the new node
-            db.add(NodeProgress(
-                user_id=user_uuid,
-                node_id=remedial_node.id,
-                status=NodeProgressStatus.NOT_STARTED,
-            ))
-
-            # 3. Perform Graph Surgery
-            # Find incoming edges to the struggling node and reroute them
-            incoming_edges = db.query(PathEdge).filter(
-                PathEdge.path_id == path.id,
-                PathEdge.to_node_id == struggling_node.id
-            ).all()
-
-            if not incoming_edges:
-                # If the struggling node was a root, the new node becomes a root
-                pass
-            else:
-                for edge in incoming_edges:
-                    edge.to_node_id = remedial_node.id
-
-            # Create a new edge from the remedial node to the struggling node
-            db.add(PathEdge(
-                path_id=path.id,
-                from_node_id=remedial_node.id,
-                to_node_id=struggling_node.id
-            ))
-
-            # 4. Reset the struggling node's progress
-            np.status = NodeProgressStatus.NOT_STARTED
-            np.attempts_count = 0
-            np.last_score = None
-    
-    db.commit()
+            was_completed = np.status == NodeProgressStatus.COMPLETED
+            np.status = new_status
 
-    return ChallengeSubmitResponse(
-        score=overall_score,
-        pass_node=passed,
-        feedback_summary=tutor_result.get("feedback_summary", ""),
-        suggestions=tutor_result.get("suggestions", []),
-    )
+            if was_completed != (new_status == NodeProgressStatus.COMPLETED):
+                db.flush()
+                completion_changed(db, user_uuid, path.id, struggling_node.id)
+            record_change(db, path.id, PathChangeType.PROGRESS_CHANGED, progress_payload(np))
+
+            # ---- ADAPTIVE INTERVENTION LOGIC ----
+            # The remedial node is generated by the worker (a job queued
+            # with this commit) and the response only announces it.
+            # Generation already starts on the second failure, so the node
+            # is usually ready by the third.
+            if new_status == NodeProgressStatus.COMPLETED:
+                discard_drafts(db, user_uuid, struggling_node.id)
+            elif new_status == NodeProgressStatus.BLOCKED or (
+                REMEDIAL_SPECULATIVE_ENABLED
+                and np.attempts_count == REMEDIAL_SPECULATIVE_ATTEMPTS
+            ):
+                speculative = new_status != NodeProgressStatus.BLOCKED
+                remedial_draft = request_remedial(
+                    db,
+                    user_uuid=user_uuid,
+                    path_id=path.id,
+                    node_id=struggling_node.id,
+                    adaptation_suggestion=(
+                        adaptation_suggestion
+                        or (tutor_result.get("feedback_summary") if speculative else None)
+                    ),
+                    speculative=speculative,
+                )
+                if speculative:
+                    remedial_draft = None
+
+        db.commit()
+
+        remedial = None
+        if remedial_draft is not None:
+            if remedial_draft.status == RemedialStatus.READY:
+                # A speculative draft was waiting: splice it in right away
+                inserted = apply_if_requested(db, remedial_draft.id)
+                if inserted is not None:
+                    REMEDIAL_DRAFTS.inc(event="applied_on_block")
+                    remedial = RemedialNodeStatus(
+                        status=RemedialStatus.APPLIED,
+                        node_id=inserted.node_id,
+                        path_version=inserted.path_version,
+                    )
+            if remedial is None:
+                remedial = RemedialNodeStatus(
+                    status=RemedialStatus.PENDING,
+                    path_version=path.version,
+                )
+
+        return idem.store(ChallengeSubmitResponse(
+            score=overall_score,
+            pass_node=passed,
+            feedback_summary=tutor_result.get("feedback_summary", ""),
+            suggestions=tutor_result.get("suggestions", []),
+            remedial_node=remedial,
+        ))
 
 
 @router.post("/challenges/{challenge_id}/hint", response_model=HintSchema)
@@ -0,0 +1,39 @@
+import json
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from core.auth import AuthenticatedUser, get_current_user
+from core.config import EVENTS_HEARTBEAT_SECONDS
+from services.events import broker
+from services.request_timing import TimedRoute
+
+router = APIRouter(prefix="/api/events", tags=["events"], route_class=TimedRoute)
+
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    The user's events as newline-delimited JSON, as they are committed:
+    path_change (same shape as GET /api/paths/{id}/changes entries, plus
+    path_id), challenge_created, resync, and an idle ping.
+    """
+    async def events():
+        sub = broker.subscribe(user.id)
+        try:
+            yield json.dumps({"type": "subscribed"}) + "\n"
+            while not await request.is_disconnected():
+                message = await sub.get(EVENTS_HEARTBEAT_SECONDS)
+                yield json.dumps(message or {"type": "ping"}, default=str) + "\n"
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        # Proxies must not buffer a long-lived stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,104 +1,383 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
 from uuid import UUID
-from typing import List
+from typing import Any, Dict, List, Optional
 
 
 from models import LearningPath, PathNode, PathEdge, NodeProgress, NodeProgressStatus
 from schemas import (
-    CreatePathRequest, LearningPathResponse, PathNodeSchema, PathEdgeSchema
+    CreatePathRequest, LearningPathResponse, PathNodeSchema, PathEdgeSchema,
+    PathLayoutSchema, NodeDependenciesResponse, NodeProgressState,
+    PathChangeSchema, PathChangesResponse, PathSnapshot,
 )
-from db import get_db
+from db import get_db, SessionLocal
 from agents.research_agent import run_research_agent
-from agents.dag_builder_agent import run_dag_builder_agent
+from agents.dag_builder_agent import run_dag_builder_agent, stream_dag_builder_agent
 from core.auth import get_current_user_id, get_optional_user, require_role, enforce_ownership, get_current_user
+from core.config import DAG_STREAM_BATCH_SIZE
+from graph.validate import NodeIds
+from services.frontier import build_frontier
+from services.idempotency import IdempotentRequest
+from services.layouts import current_layout, store_layout
+from services.node_catalog import catalog_entries
+from services.path_changes import changes_since
+from services.reachability import ancestors, descendants, index_path
+from services.request_timing import TimedRoute
 
-router = APIRouter(prefix="/api/paths", tags=["paths"])
-
-
-@router.post("", response_model=LearningPathResponse)
-def create_path(
-    payload: CreatePathRequest,
-    db: Session = Depends(get_db),
-    user_id: str = Depends(get_current_user_id),  # Supabase UUID
-):
-    user_uuid = UUID(user_id)
+router = APIRouter(prefix="/api/paths", tags=["paths"], route_class=TimedRoute)
 
-    research_result = run_research_agent(
-        user_id=user_id,
-        goal_title=payload.goal_title,
-        goal_description=payload.goal_description,
-        domain_hint=payload.domain_hint,
-        level=payload.level,
-    )
-    
-    research_competencies = research_result["competencies"]
-    research_context = research_result["research_context"]
-
-    dag = run_dag_builder_agent(
-        user_id=user_id,
-        goal_title=payload.goal_title,
-        competencies=research_competencies,
-        user_background=payload.user_background,
-    )
 
-    lp = LearningPath(
-        user_id=user_uuid,
-        goal_title=payload.goal_title,
-        goal_description=payload.goal_description,
-        domain_hint=payload.domain_hint,
-        level=payload.level,
-        summary=dag.get("summary", ""),
-        research_context=research_context,
-    )
-    db.add(lp)
+def _persist_node_batch(
+    db: Session,
+    path_id: int,
+    user_uuid: UUID,
+    batch: List[Dict[str, Any]],
+    node_id_map: Dict[str, int],
+) -> List[PathNode]:
+    """
+    Inserts a batch of DAG nodes (and their progress rows) with one flush,
+    resolving their content through the node catalog and recording the model id -> DB id mapping in `node_id_map`.
+    """
+    rows = [
+        PathNode(path_id=path_id, catalog=entry)
+        for entry in catalog_entries(db, batch)
+    ]
+    db.add_all(rows)
     db.flush()
 
-    node_id_map = {}
-
-    for node in dag.get("nodes", []):
-        n = PathNode(
-            path_id=lp.id,
-            title=node["title"],
-            description=node["description"],
-            node_type=node.get("node_type", "concept"),
-            estimated_minutes=node.get("estimated_minutes"),
-            metadata_json={"tags": node.get("tags", [])},
-        )
-        db.add(n)
-        db.flush()
-        node_id_map[node["id"]] = n.id
-
-        db.add(NodeProgress(
+    db.add_all([
+        NodeProgress(
             user_id=user_uuid,
             node_id=n.id,
             status=NodeProgressStatus.NOT_STARTED,
-        ))
+        )
+        for n in rows
+    ])
+
+    for node, n in zip(batch, rows):
+        node_id_map[node["id"]] = n.id
+
+    return rows
 
-    for edge in dag.get("edges", []):
-        if edge["from"] in node_id_map and edge["to"] in node_id_map:
-            db.add(PathEdge(
-                path_id=lp.id,
+
+def _resolve_edges(
+    db: Session,
+    path_id: int,
+    edges: List[Dict[str, Any]],
+    node_id_map: Dict[str, int],
+) -> List[PathEdge]:
+    """
+    Adds the edges whose endpoints are already persisted and removes them
+    from `edges`; the rest are left for a later call.
+    """
+    resolved = []
+    remaining = []
+    for edge in edges:
+        if edge.get("from") in node_id_map and edge.get("to") in node_id_map:
+            resolved.append(PathEdge(
+                path_id=path_id,
                 from_node_id=node_id_map[edge["from"]],
                 to_node_id=node_id_map[edge["to"]],
             ))
+        else:
+            remaining.append(edge)
+
+    db.add_all(resolved)
+    edges[:] = remaining
+    return resolved
 
-    db.commit()
-    db.refresh(lp)
 
+def _path_response(lp: LearningPath, layout: Optional[Dict[str, Any]] = None) -> LearningPathResponse:
     return LearningPathResponse(
         id=lp.id,
+        version=lp.version,
         goal_title=lp.goal_title,
         summary=lp.summary,
         research_context=lp.research_context,
         nodes=[PathNodeSchema.from_orm(n) for n in lp.nodes],
         edges=[PathEdgeSchema(from_node_id=e.from_node_id, to_node_id=e.to_node_id) for e in lp.edges],
+        layout=PathLayoutSchema(**layout) if layout else None,
     )
 
 
+@router.post("", response_model=LearningPathResponse)
+def create_path(
+    payload: CreatePathRequest,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_current_user_id),  # Supabase UUID
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    user_uuid = UUID(user_id)
+
+    # Client retries with the same Idempotency-Key get the first result
+    # instead of a second research + DAG pipeline and a duplicate path.
+    with IdempotentRequest(db, user_id, "POST /api/paths", idempotency_key, payload.dict()) as idem:
+        if idem.response is not None:
+            return idem.response
+
+        research_result = run_research_agent(
+            user_id=user_id,
+            goal_title=payload.goal_title,
+            goal_description=payload.goal_description,
+            domain_hint=payload.domain_hint,
+            level=payload.level,
+        )
+    
+        research_competencies = research_result["competencies"]
+        research_context = research_result["research_context"]
+
+        dag = run_dag_builder_agent(
+            user_id=user_id,
+            goal_title=payload.goal_title,
+            competencies=research_competencies,
+            user_background=payload.user_background,
+        )
+
+        lp = LearningPath(
+            user_id=user_uuid,
+            goal_title=payload.goal_title,
+            goal_description=payload.goal_description,
+            domain_hint=payload.domain_hint,
+            level=payload.level,
+            summary=dag.get("summary", ""),
+            research_context=research_context,
+        )
+        db.add(lp)
+        db.flush()
+
+        node_id_map = {}
+        _persist_node_batch(db, lp.id, user_uuid, dag.get("nodes", []), node_id_map)
+        _resolve_edges(db, lp.id, list(dag.get("edges", [])), node_id_map)
+        db.flush()
+        build_frontier(db, user_uuid, lp.id)
+        index_path(db, lp.id)
+        layout = store_layout(db, lp.id)
+
+        db.commit()
+        db.refresh(lp)
+
+        return idem.store(_path_response(lp, layout))
+
+
+@router.post("/stream")
+def create_path_stream(
+    payload: CreatePathRequest,
+    user_id: str = Depends(get_current_user_id),  # Supabase UUID
+):
+    """
+    Streaming variant of create_path.
+
+    Responds with newline-delimited JSON events so the graph view can render
+    the path while the DAG builder is still generating it:
+
+    - {"type": "research_complete", "competencies_count": int}
+    - {"type": "path", "id": int, "goal_title": str}
+    - {"type": "summary", "summary": str}
+    - {"type": "node", "node": PathNodeSchema}
+    - {"type": "edge", "edge": PathEdgeSchema}
+    - {"type": "edge_removed", "edge": PathEdgeSchema}
+    - {"type": "node_removed", "node_id": int}
+    - {"type": "done", "path": LearningPathResponse}
+    - {"type": "error", "detail": str}
+
+    Nodes are persisted (and committed) in batches of DAG_STREAM_BATCH_SIZE
+    as they arrive, with the same node id rules as the final validation
+    (missing ids filled in, repeated ids dropped). Streamed edges that the
+    final validation drops (cycles, duplicates, transitive edges) are
+    deleted and reported as edge_removed; nodes are reconciled against the
+    final DAG the same way, so the stored path matches create_path's.
+    """
+    user_uuid = UUID(user_id)
+
+    def event(data: Dict[str, Any]) -> str:
+        return json.dumps(data, default=str) + "\n"
+
+    def events():
+        # The request-scoped session may be closed before the body is
+        # streamed, so the generator owns its own session.
+        db = SessionLocal()
+        lp = None
+        try:
+            research_result = run_research_agent(
+                user_id=user_id,
+                goal_title=payload.goal_title,
+                goal_description=payload.goal_description,
+                domain_hint=payload.domain_hint,
+                level=payload.level,
+            )
+            research_competencies = research_result["competencies"]
+
+            yield event({
+                "type": "research_complete",
+                "competencies_count": len(research_competencies.get("competencies", [])),
+            })
+
+            lp = LearningPath(
+                user_id=user_uuid,
+                goal_title=payload.goal_title,
+                goal_description=payload.goal_description,
+                domain_hint=payload.domain_hint,
+                level=payload.level,
+                summary="",
+                research_context=research_result["research_context"],
+            )
+            db.add(lp)
+            db.commit()
+
+            yield event({"type": "path", "id": lp.id, "goal_title": lp.goal_title})
+
+            node_id_map: Dict[str, int] = {}
+            streamed_ids = NodeIds()
+            pending_nodes: List[Dict[str, Any]] = []
+            pending_edges: List[Dict[str, Any]] = []
+            persisted_edges: List[PathEdge] = []
+
+            def flush_batch():
+                rows = _persist_node_batch(db, lp.id, user_uuid, pending_nodes, node_id_map)
+                pending_nodes.clear()
+                edges = _resolve_edges(db, lp.id, pending_edges, node_id_map)
+                persisted_edges.extend(edges)
+                db.commit()
+
+                for n in rows:
+                    yield event({"type": "node", "node": PathNodeSchema.from_orm(n).dict()})
+                for e in edges:
+                    yield event({
+                        "type": "edge",
+                        "edge": PathEdgeSchema(
+                            from_node_id=e.from_node_id,
+                            to_node_id=e.to_node_id,
+                        ).dict(),
+                    })
+
+            def reconcile_nodes(final_dag: Dict[str, Any]):
+                final_ids = {str(n["id"]) for n in final_dag.get("nodes", [])}
+                # Not persisted yet: queued for the next batch
+                pending_nodes[:] = [n for n in pending_nodes if str(n["id"]) in final_ids]
+                known = {str(k) for k in node_id_map} | {str(n["id"]) for n in pending_nodes}
+                pending_nodes.extend(
+                    n for n in final_dag.get("nodes", []) if str(n["id"]) not in known
+                )
+
+                removed = {
+                    node_id_map.pop(k) for k in list(node_id_map) if str(k) not in final_ids
+                }
+                if not removed:
+                    return
+                dropped_edges = [
+                    e for e in persisted_edges
+                    if e.from_node_id in removed or e.to_node_id in removed
+                ]
+                for e in dropped_edges:
+                    persisted_edges.remove(e)
+                    db.delete(e)
+                db.flush()
+                db.query(NodeProgress).filter(
+                    NodeProgress.node_id.in_(removed)
+                ).delete(synchronize_session=False)
+                db.query(PathNode).filter(
+                    PathNode.id.in_(removed)
+                ).delete(synchronize_session=False)
+                db.commit()
+
+                for e in dropped_edges:
+                    yield event({
+                        "type": "edge_removed",
+                        "edge": PathEdgeSchema(
+                            from_node_id=e.from_node_id,
+                            to_node_id=e.to_node_id,
+                        ).dict(),
+                    })
+                for node_id in sorted(removed):
+                    yield event({"type": "node_removed", "node_id": node_id})
+
+            def drop_invalid_edges(final_dag: Dict[str, Any]):
+                wanted = {
+                    (node_id_map.get(e["from"]), node_id_map.get(e["to"]))
+                    for e in final_dag.get("edges", [])
+                }
+                removed = []
+                for e in persisted_edges:
+                    key = (e.from_node_id, e.to_node_id)
+                    if key in wanted:
+                        wanted.discard(key)  # keeps one copy of a duplicate
+                    else:
+                        db.delete(e)
+                        removed.append(key)
+                db.commit()
+
+                for from_node_id, to_node_id in removed:
+                    yield event({
+                        "type": "edge_removed",
+                        "edge": PathEdgeSchema(
+                            from_node_id=from_node_id,
+                            to_node_id=to_node_id,
+                        ).dict(),
+                    })
+
+            for kind, value in stream_dag_builder_agent(
+                user_id=user_id,
+                goal_title=payload.goal_title,
+                competencies=research_competencies,
+                user_background=payload.user_background,
+            ):
+                if kind == "summary":
+                    lp.summary = value
+                    yield event({"type": "summary", "summary": value})
+                elif kind == "node":
+                    node = streamed_ids.accept(value)
+                    if node is None:
+                        continue
+                    pending_nodes.append(node)
+                    if len(pending_nodes) >= DAG_STREAM_BATCH_SIZE:
+                        yield from flush_batch()
+                elif kind == "edge":
+                    pending_edges.append(value)
+                    # Edges follow the nodes in the model output, so the
+                    # first edge is the signal to persist the remaining nodes.
+                    if pending_nodes or len(pending_edges) >= DAG_STREAM_BATCH_SIZE:
+                        yield from flush_batch()
+                elif kind == "dag":
+                    yield from reconcile_nodes(value)
+                    yield from flush_batch()
+                    yield from drop_invalid_edges(value)
+
+            # Edges to unknown node ids are dropped, as in create_path.
+            yield from flush_batch()
+            build_frontier(db, user_uuid, lp.id)
+            index_path(db, lp.id)
+            layout = store_layout(db, lp.id)
+            db.commit()
+
+            db.refresh(lp)
+            yield event({"type": "done", "path": _path_response(lp, layout).dict()})
+
+        except Exception as exc:
+            db.rollback()
+            if lp is not None and lp.id is not None:
+                # Drop the partially streamed path so a retry starts clean.
+                db.query(NodeProgress).filter(
+                    NodeProgress.node_id.in_(
+                        db.query(PathNode.id).filter(PathNode.path_id == lp.id)
+                    )
+                ).delete(synchronize_session=False)
+                db.delete(lp)
+                db.commit()
+            yield event({"type": "error", "detail": str(exc)})
+
+        finally:
+            db.close()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @router.get("/{path_id}", response_model=LearningPathResponse)
 def get_path(
     path_id: int,
+    include_layout: bool = Query(False),
     db: Session = Depends(get_db),
     user=Depends(get_optional_user),  # anonymous allowed
 ):
@@ -113,13 +392,92 @@ def get_path(
             current_user=user,
         )
 
-    return LearningPathResponse(
-        id=lp.id,
-        goal_title=lp.goal_title,
-        summary=lp.summary,
-        research_context=lp.research_context,
-        nodes=[PathNodeSchema.from_orm(n) for n in lp.nodes],
-        edges=[PathEdgeSchema(from_node_id=e.from_node_id, to_node_id=e.to_node_id) for e in lp.edges],
+    # Precomputed per path version; clients skip their own layout pass
+    return _path_response(lp, current_layout(db, lp) if include_layout else None)
+
+@router.get("/{path_id}/changes", response_model=PathChangesResponse)
+def get_path_changes(
+    path_id: int,
+    since: int = Query(..., ge=0),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    What changed after version `since`: the logged deltas in order, or a
+    full snapshot (graph, layout and progress) when the log has been
+    compacted past `since`.
+    """
+    lp = db.query(LearningPath).filter(LearningPath.id == path_id).first()
+    if not lp:
+        raise HTTPException(status_code=404, detail="Path not found")
+
+    enforce_ownership(
+        resource_user_id=lp.user_id,
+        current_user=user,
+    )
+
+    changes = changes_since(db, path_id, since, lp.version)
+    if changes is not None:
+        return PathChangesResponse(
+            path_id=path_id,
+            version=lp.version,
+            changes=[PathChangeSchema.from_orm(c) for c in changes],
+        )
+
+    progress = (
+        db.query(NodeProgress)
+        .join(PathNode, PathNode.id == NodeProgress.node_id)
+        .filter(PathNode.path_id == path_id, NodeProgress.user_id == lp.user_id)
+        .all()
+    )
+    return PathChangesResponse(
+        path_id=path_id,
+        version=lp.version,
+        snapshot=PathSnapshot(
+            path=_path_response(lp, current_layout(db, lp)),
+            progress=[
+                NodeProgressState(
+                    node_id=np.node_id,
+                    status=np.status,
+                    last_score=np.last_score,
+                    attempts_count=np.attempts_count,
+                )
+                for np in progress
+            ],
+        ),
+    )
+
+@router.get("/{path_id}/nodes/{node_id}/dependencies", response_model=NodeDependenciesResponse)
+def get_node_dependencies(
+    path_id: int,
+    node_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Transitive prerequisites and dependents of a node, read from the
+    reachability index (two indexed lookups, no graph walk).
+    """
+    lp = db.query(LearningPath).filter(LearningPath.id == path_id).first()
+    if not lp:
+        raise HTTPException(status_code=404, detail="Path not found")
+
+    enforce_ownership(
+        resource_user_id=lp.user_id,
+        current_user=user,
+    )
+
+    node = db.query(PathNode.id).filter(
+        PathNode.id == node_id,
+        PathNode.path_id == path_id,
+    ).first()
+    if not node:
+        raise HTTPException(status_code=404, detail="Node not found")
+
+    return NodeDependenciesResponse(
+        node_id=node_id,
+        ancestors=sorted(ancestors(db, node_id)),
+        descendants=sorted(descendants(db, node_id)),
     )
 
 @router.delete("/{path_id}")
@@ -149,29 +507,13 @@ def list_paths(
 ):
     user_uuid = UUID(user_id)
 
+    # Nodes and edges of every path in one query each, not one per path
     paths = (
         db.query(LearningPath)
+        .options(selectinload(LearningPath.nodes), selectinload(LearningPath.edges))
         .filter(LearningPath.user_id == user_uuid)
         .order_by(LearningPath.created_at.desc())
         .all()
     )
 
-    return [
-        LearningPathResponse(
-            id=lp.id,
-            goal_title=lp.goal_title,
-            summary=lp.summary,
-            research_context=lp.research_context,
-            nodes=[
-                PathNodeSchema.from_orm(n) for n in lp.nodes
-            ],
-            edges=[
-                PathEdgeSchema(
-                    from_node_id=e.from_node_id,
-                    to_node_id=e.to_node_id,
-                )
-                for e in lp.edges
-            ],
-        )
-        for lp in paths
-    ]
\ No newline at end of file
+    return [_path_response(lp) for lp in paths]
\ No newline at end of file
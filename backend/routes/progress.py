@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
 from db import get_db
 from models import LearningPath, NodeProgress, NodeProgressStatus
 from pydantic import BaseModel
 from core.auth import get_current_user_id
+from services.frontier import get_frontier
+from services.request_timing import TimedRoute
 
-router = APIRouter(prefix="/api/paths", tags=["progress"])
+router = APIRouter(prefix="/api/paths", tags=["progress"], route_class=TimedRoute)
 
 
 class NodeProgressItem(BaseModel):
@@ -25,6 +27,23 @@ class PathProgressResponse(BaseModel):
     nodes: List[NodeProgressItem]
 
 
+class FrontierNode(BaseModel):
+    node_id: int
+    title: str
+    node_type: str
+    estimated_minutes: Optional[int]
+    last_score: float | None
+    attempts_count: int
+
+
+class PathFrontierResponse(BaseModel):
+    path_id: int
+    path_version: int
+    available: List[FrontierNode]
+    in_progress: List[FrontierNode]
+    blocked: List[FrontierNode]
+
+
 @router.get("/{path_id}/progress", response_model=PathProgressResponse)
 def get_path_progress(
     path_id: int,
@@ -68,3 +87,48 @@ def get_path_progress(
         completion_ratio=completed / len(lp.nodes) if lp.nodes else 0.0,
         nodes=items,
     )
+
+
+@router.get("/{path_id}/frontier", response_model=PathFrontierResponse)
+def get_path_frontier(
+    path_id: int,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    The nodes the learner can work on next: every prerequisite completed,
+    split by their own status. Read from the maintained frontier, so the
+    cost depends on the frontier's size rather than the path's.
+    """
+    user_uuid = UUID(user_id)
+
+    lp = db.query(LearningPath).filter(
+        LearningPath.id == path_id,
+        LearningPath.user_id == user_uuid,
+    ).first()
+    if not lp:
+        raise HTTPException(status_code=404, detail="Path not found")
+
+    groups = {
+        NodeProgressStatus.NOT_STARTED: [],
+        NodeProgressStatus.IN_PROGRESS: [],
+        NodeProgressStatus.BLOCKED: [],
+    }
+    for node, p in get_frontier(db, user_uuid, path_id):
+        status = p.status if p else NodeProgressStatus.NOT_STARTED
+        groups.get(status, groups[NodeProgressStatus.NOT_STARTED]).append(FrontierNode(
+            node_id=node.id,
+            title=node.title,
+            node_type=node.node_type,
+            estimated_minutes=node.estimated_minutes,
+            last_score=p.last_score if p else None,
+            attempts_count=p.attempts_count if p else 0,
+        ))
+
+    return PathFrontierResponse(
+        path_id=path_id,
+        path_version=lp.version,
+        available=groups[NodeProgressStatus.NOT_STARTED],
+        in_progress=groups[NodeProgressStatus.IN_PROGRESS],
+        blocked=groups[NodeProgressStatus.BLOCKED],
+    )
@@ -71,6 +71,92 @@ class Edge(EdgeBase):
         orm_mode = True
 
 
+class CreatePathRequest(BaseModel):
+    goal_title: str
+    goal_description: str | None = None
+    domain_hint: str | None = None
+    level: str | None = None
+    user_background: str | None = None
+
+
+class PathNodeSchema(NodeBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class PathEdgeSchema(EdgeBase):
+    pass
+
+
+class NodePosition(BaseModel):
+    node_id: int
+    x: int
+    y: int
+    layer: int
+
+
+class PathLayoutSchema(BaseModel):
+    # Top-left node coordinates, computed at path version `version`
+    version: int
+    width: int
+    height: int
+    nodes: list[NodePosition]
+
+
+class LearningPathResponse(BaseModel):
+    id: int
+    # Pass as `since` to GET /api/paths/{id}/changes to catch up later
+    version: int | None = None
+    goal_title: str
+    summary: str | None = None
+    research_context: dict | None = None
+    nodes: list[PathNodeSchema]
+    edges: list[PathEdgeSchema]
+    layout: PathLayoutSchema | None = None
+
+
+class NodeProgressState(BaseModel):
+    node_id: int
+    status: str
+    last_score: float | None = None
+    attempts_count: int
+
+
+class PathChangeSchema(BaseModel):
+    version: int
+    # node_added: {node, progress, edges_added, edges_removed}
+    # edge_added: {from_node_id, to_node_id}
+    # progress_changed: NodeProgressState fields
+    change_type: str
+    payload: dict
+
+    class Config:
+        from_attributes = True
+
+
+class PathSnapshot(BaseModel):
+    path: LearningPathResponse
+    progress: list[NodeProgressState]
+
+
+class PathChangesResponse(BaseModel):
+    path_id: int
+    version: int
+    # The changes after `since`, oldest first; when the log no longer
+    # reaches back that far, `changes` is empty and `snapshot` is set.
+    changes: list[PathChangeSchema] = []
+    snapshot: PathSnapshot | None = None
+
+
+class NodeDependenciesResponse(BaseModel):
+    node_id: int
+    # Everything the node ultimately depends on / everything downstream of it
+    ancestors: list[int]
+    descendants: list[int]
+
+
 class ChallengeBase(BaseModel):
     prompt: str
 
@@ -81,5 +167,30 @@ class Challenge(ChallengeBase):
     class Config:
         orm_mode = True
 
+
+class ChallengeCreateResponse(ChallengeBase):
+    challenge_id: int
+
+
+class ChallengeSubmitRequest(BaseModel):
+    answer: str
+
+
+class RemedialNodeStatus(BaseModel):
+    # "pending": generating in the background; the path's version is bumped
+    # once the node is inserted. "applied": already part of the path.
+    status: str
+    node_id: int | None = None
+    path_version: int
+
+
+class ChallengeSubmitResponse(BaseModel):
+    score: float
+    pass_node: bool
+    feedback_summary: str
+    suggestions: list[str] = []
+    remedial_node: RemedialNodeStatus | None = None
+
+
 class Hint(BaseModel):
     hint: str
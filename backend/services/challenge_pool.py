@@ -0,0 +1,248 @@
+# services/challenge_pool.py
+
+import hashlib
+import random
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.config import (
+    CHALLENGE_POOL_ENABLED,
+    CHALLENGE_POOL_MAX_SERVES,
+    CHALLENGE_POOL_SELECTION,
+    CHALLENGE_POOL_SIZE,
+)
+from db import SessionLocal
+from models import Challenge, ChallengeVariant
+from agents.challenge_agent import run_challenge_agent
+from services.job_queue import enqueue
+from services.metrics import Counter, hit_ratio
+
+# -----------------------------------------------------------------------------
+# Cross-user challenge pool
+# -----------------------------------------------------------------------------
+#
+# Effectively identical nodes ("Python basics" in thousands of paths) share a
+# small set of pre-generated challenge variants, so handing a learner a
+# challenge is usually a database read instead of two LLM calls.
+
+CHALLENGE_POOL_REQUESTS = Counter(
+    "challenge_pool_requests_total",
+    "Challenge requests by pool result (hit, miss)",
+    ["result"],
+)
+hit_ratio("challenge_pool", CHALLENGE_POOL_REQUESTS, ["hit"])
+CHALLENGE_POOL_REFILLS = Counter(
+    "challenge_pool_refills_total",
+    "Challenge variants generated by background refills",
+)
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+
+
+def _normalize(text: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _PUNCT_RE.sub(" ", text)
+    return _WS_RE.sub(" ", text).strip()
+
+
+def node_fingerprint(title: str, tags: Iterable[str], domain: Optional[str]) -> str:
+    """
+    Canonical fingerprint of a node: normalized title + sorted tags + domain.
+    """
+    canonical_tags = sorted({_normalize(t) for t in tags or [] if _normalize(t)})
+    key = "\x1f".join([_normalize(title), ",".join(canonical_tags), _normalize(domain)])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def active_variant_count(db: Session, fingerprint: str) -> int:
+    return (
+        db.query(func.count(ChallengeVariant.id))
+        .filter(
+            ChallengeVariant.fingerprint == fingerprint,
+            ChallengeVariant.active.is_(True),
+        )
+        .scalar()
+    )
+
+
+def acquire_variant(db: Session, fingerprint: str) -> Optional[ChallengeVariant]:
+    """
+    Picks an active variant for a new learner and counts the use. Variants
+    reaching CHALLENGE_POOL_MAX_SERVES are retired so the pool rotates.
+    """
+    query = db.query(ChallengeVariant).filter(
+        ChallengeVariant.fingerprint == fingerprint,
+        ChallengeVariant.active.is_(True),
+    )
+
+    if CHALLENGE_POOL_SELECTION == "random":
+        candidates = query.all()
+        variant = random.choice(candidates) if candidates else None
+    else:
+        # Round-robin: least served first; skip rows another request is
+        # already bumping rather than waiting on them.
+        variant = (
+            query.order_by(ChallengeVariant.served_count, ChallengeVariant.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+
+    if variant is None:
+        return None
+
+    variant.served_count = ChallengeVariant.served_count + 1
+    db.flush()
+    db.refresh(variant)
+    if variant.served_count >= CHALLENGE_POOL_MAX_SERVES:
+        variant.active = False
+        db.flush()
+    return variant
+
+
+def add_variant(db: Session, fingerprint: str, challenge_json: Dict[str, Any]) -> ChallengeVariant:
+    variant = ChallengeVariant(
+        fingerprint=fingerprint,
+        challenge_type=challenge_json.get("challenge_type"),
+        prompt=challenge_json["prompt"],
+        expected_answer_outline="\n".join(challenge_json.get("expected_answer_outline") or []),
+        rubric_json=challenge_json.get("rubric") or {},
+        difficulty=challenge_json.get("difficulty"),
+        served_count=0,
+        active=True,
+    )
+    db.add(variant)
+    db.flush()
+    return variant
+
+
+def challenge_from_variant(node_id: int, variant: ChallengeVariant) -> Challenge:
+    return Challenge(
+        node_id=node_id,
+        variant_id=variant.id,
+        prompt=variant.prompt,
+        expected_answer_outline=variant.expected_answer_outline,
+        rubric_json=variant.rubric_json,
+        difficulty=variant.difficulty,
+    )
+
+
+def _usable(challenge_json: Dict[str, Any]) -> bool:
+    return not challenge_json.get("error") and bool(challenge_json.get("prompt"))
+
+
+# -----------------------------------------------------------------------------
+# Refill (job queue)
+# -----------------------------------------------------------------------------
+#
+# Refills run as "challenge_pool_refill" jobs in `python -m worker`, at most
+# one queued or running per fingerprint.
+
+REFILL_JOB = "challenge_pool_refill"
+
+
+def refill_pool(
+    fingerprint: str,
+    user_id: str,
+    path_id: int,
+    node: Dict[str, Any],
+    domain_hint: Optional[str],
+    research_context: Optional[list],
+) -> Dict[str, int]:
+    """
+    Job handler: tops the pool for `fingerprint` up to CHALLENGE_POOL_SIZE
+    active variants. Each variant is committed as soon as it is generated,
+    so a retry only generates what is still missing.
+    """
+    db = SessionLocal()
+    added = 0
+    try:
+        missing = CHALLENGE_POOL_SIZE - active_variant_count(db, fingerprint)
+        for _ in range(max(missing, 0)):
+            challenge_json = run_challenge_agent(
+                user_id=user_id,
+                path_id=path_id,
+                node=node,
+                domain_hint=domain_hint,
+                research_context=research_context,
+            )
+            if not _usable(challenge_json):
+                continue
+            add_variant(db, fingerprint, challenge_json)
+            db.commit()
+            added += 1
+            CHALLENGE_POOL_REFILLS.inc()
+    finally:
+        db.close()
+    if missing > 0 and not added:
+        raise RuntimeError(f"challenge pool {fingerprint[:12]}: no usable variant generated")
+    return {"added": added}
+
+
+# -----------------------------------------------------------------------------
+# Entry point
+# -----------------------------------------------------------------------------
+
+
+def get_pooled_challenge(
+    db: Session,
+    *,
+    user_id: str,
+    path_id: int,
+    node: Dict[str, Any],
+    domain_hint: Optional[str],
+    research_context: Optional[list],
+) -> Optional[Challenge]:
+    """
+    Creates (but does not commit) a Challenge for `node`, served from the
+    pool when possible. On a cold pool one variant is generated inline and
+    a refill job is queued with the caller's transaction. Returns None if
+    generation failed.
+    """
+    fingerprint = node_fingerprint(
+        node.get("title", ""),
+        node.get("tags", []),
+        domain_hint,
+    )
+
+    variant = acquire_variant(db, fingerprint) if CHALLENGE_POOL_ENABLED else None
+
+    if variant is not None:
+        CHALLENGE_POOL_REQUESTS.inc(result="hit")
+    else:
+        CHALLENGE_POOL_REQUESTS.inc(result="miss")
+        challenge_json = run_challenge_agent(
+            user_id=user_id,
+            path_id=path_id,
+            node=node,
+            domain_hint=domain_hint,
+            research_context=research_context,
+        )
+        if not _usable(challenge_json):
+            return None
+        variant = add_variant(db, fingerprint, challenge_json)
+        variant.served_count = 1
+
+    if CHALLENGE_POOL_ENABLED and active_variant_count(db, fingerprint) < CHALLENGE_POOL_SIZE:
+        enqueue(
+            db,
+            REFILL_JOB,
+            {
+                "fingerprint": fingerprint,
+                "user_id": user_id,
+                "path_id": path_id,
+                "node": node,
+                "domain_hint": domain_hint,
+                "research_context": research_context,
+            },
+            dedupe_key=fingerprint,
+        )
+
+    challenge = challenge_from_variant(node["id"], variant)
+    db.add(challenge)
+    db.flush()
+    return challenge
@@ -0,0 +1,276 @@
+# services/events.py
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Any, Dict, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import event, func, select as sql_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from core.config import EVENTS_BACKEND, EVENTS_QUEUE_SIZE
+from services.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Per-user event streams
+# -----------------------------------------------------------------------------
+#
+# Code that changes what a learner sees calls emit() inside its transaction.
+# Nothing is delivered unless that transaction commits:
+#
+# - "memory": events wait in session.info and are handed to the in-process
+#   broker after commit. Only streams served by the API process that
+#   committed them see them.
+# - "postgres": events are sent with pg_notify(), which Postgres delivers
+#   on commit to every process LISTENing on CHANNEL.
+#
+# Processes that serve no streams (`python -m worker`, which splices in
+# remedial nodes) call publish_over_notify() and always use pg_notify(), so
+# on Postgres each API process runs one listener thread (start_listener)
+# feeding its local broker whatever the backend. On SQLite there is no
+# NOTIFY: events committed by the worker reach no stream.
+#
+# Streams are best-effort. An event can be lost when a slow client's queue
+# overflows or the listener reconnects. Clients detect the gap from path
+# versions (or a "resync" event) and catch up via GET /api/paths/{id}/changes.
+
+CHANNEL = "traverse_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_BYTES = 7900
+
+EVENTS_PUBLISHED = Counter(
+    "events_published_total",
+    "Events handed to the local broker by type",
+    ["type"],
+)
+EVENTS_DROPPED = Counter(
+    "events_dropped_total",
+    "Events dropped because a subscriber's queue was full",
+)
+EVENT_SUBSCRIBERS = Gauge(
+    "event_subscribers",
+    "Open event streams in this process",
+)
+
+
+class Subscription:
+    """
+    One open stream: a bounded queue read on the event loop that opened it.
+    """
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize)
+
+    def _put(self, message: Dict[str, Any]) -> None:
+        # Runs on self.loop
+        if self.queue.full():
+            # Keep the newest events; the client resyncs over the gap
+            self.queue.get_nowait()
+            EVENTS_DROPPED.inc()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        The next event, or None after `timeout` seconds without one.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """
+    In-process fan-out from publishers (any thread) to subscribers (async
+    stream handlers), keyed by user id.
+    """
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: str) -> Subscription:
+        """
+        Must be called from the event loop that will read the stream.
+        """
+        sub = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        EVENT_SUBSCRIBERS.inc()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is None or sub not in subs:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.user_id]
+        EVENT_SUBSCRIBERS.dec()
+
+    def publish(self, user_id: str, message: Dict[str, Any]) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, message)
+            except RuntimeError:
+                # The loop is closed (shutdown); the stream is gone anyway
+                self.unsubscribe(sub)
+        EVENTS_PUBLISHED.inc(type=message.get("type", ""))
+
+    def publish_all(self, message: Dict[str, Any]) -> None:
+        with self._lock:
+            user_ids = list(self._subscribers)
+        for user_id in user_ids:
+            self.publish(user_id, message)
+
+
+broker = EventBroker()
+
+# Set by publish_over_notify() in processes without streams of their own
+_notify_always = False
+
+
+# -----------------------------------------------------------------------------
+# Publishing
+# -----------------------------------------------------------------------------
+
+
+def emit(db: Session, user_id: UUID | str, message: Dict[str, Any]) -> None:
+    """
+    Queues `message` ({"type": ..., ...}) for `user_id`'s streams. It is
+    delivered when `db`'s transaction commits and dropped on rollback.
+    """
+    if EVENTS_BACKEND == "postgres" or _notify_always:
+        notification = json.dumps({"user_id": str(user_id), "event": message}, default=str)
+        if len(notification.encode()) > NOTIFY_MAX_BYTES:
+            # Too big for NOTIFY: send the envelope, the client fetches the rest
+            message = {k: v for k, v in message.items() if k != "payload"}
+            message["truncated"] = True
+            notification = json.dumps({"user_id": str(user_id), "event": message}, default=str)
+        db.execute(sql_select(func.pg_notify(CHANNEL, notification)))
+    else:
+        db.info.setdefault("pending_events", []).append((str(user_id), message))
+
+
+def publish_over_notify(engine: Engine) -> bool:
+    """
+    Sends this process's events with pg_notify() whatever EVENTS_BACKEND is,
+    for processes that serve no streams. False (nothing changes) when the
+    database is not Postgres.
+    """
+    global _notify_always
+    _notify_always = engine.dialect.name == "postgresql"
+    return _notify_always
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for user_id, message in session.info.pop("pending_events", ()):
+        broker.publish(user_id, message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop("pending_events", None)
+
+
+# -----------------------------------------------------------------------------
+# Postgres LISTEN
+# -----------------------------------------------------------------------------
+
+
+class PostgresListener(threading.Thread):
+    """
+    LISTENs on CHANNEL with a dedicated connection (outside the pool) and
+    publishes notifications to the local broker. Reconnects with backoff;
+    after a reconnect every local stream gets a "resync" event, since
+    notifications sent meanwhile are lost.
+    """
+
+    def __init__(self, engine: Engine, poll_seconds: float = 5.0):
+        super().__init__(name="events-listener", daemon=True)
+        self.engine = engine
+        self.poll_seconds = poll_seconds
+        self.stop = threading.Event()
+
+    def _connect(self):
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        conn = self.engine.dialect.connect(*cargs, **cparams)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+        return conn
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            notification = json.loads(payload)
+            broker.publish(notification["user_id"], notification["event"])
+        except (ValueError, KeyError):
+            logger.warning("events: ignoring malformed notification %r", payload[:200])
+
+    def run(self) -> None:
+        backoff = 1.0
+        connected_before = False
+        while not self.stop.is_set():
+            try:
+                conn = self._connect()
+            except Exception:
+                logger.exception("events: LISTEN connection failed, retrying in %.0fs", backoff)
+                self.stop.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+
+            backoff = 1.0
+            if connected_before:
+                broker.publish_all({"type": "resync"})
+            connected_before = True
+            try:
+                while not self.stop.is_set():
+                    readable, _, _ = select.select([conn], [], [], self.poll_seconds)
+                    if not readable:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("events: LISTEN connection lost")
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+_listener: Optional[PostgresListener] = None
+
+
+def start_listener(engine: Engine) -> None:
+    """
+    Starts this process's listener when the database is Postgres: it
+    carries events from the other API processes ("postgres" backend) and
+    from the worker (any backend).
+    """
+    global _listener
+    if engine.dialect.name != "postgresql" or _listener is not None:
+        return
+    _listener = PostgresListener(engine)
+    _listener.start()
+
+
+def stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop.set()
+        _listener = None
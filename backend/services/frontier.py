@@ -0,0 +1,116 @@
+# services/frontier.py
+
+from typing import Callable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, delete, exists, insert, literal, not_, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from models import PathNode, PathEdge, PathFrontier, NodeProgress, NodeProgressStatus
+from services.metrics import Counter
+
+# -----------------------------------------------------------------------------
+# Per-learner frontier
+# -----------------------------------------------------------------------------
+#
+# PathFrontier holds, per (user, path), the nodes that are not completed and
+# whose prerequisites all are. It is built once when a path is created and
+# then only the nodes whose membership can change are recomputed: a node and
+# its direct successors when its completion changes, or the nodes touched by
+# graph surgery. Each refresh is one DELETE and one INSERT ... SELECT over
+# those nodes' edges, so the cost depends on node degree, not path size.
+
+FRONTIER_REFRESHES = Counter(
+    "frontier_refreshes_total",
+    "Frontier recomputations by reason (build, completion, graph)",
+    ["reason"],
+)
+
+
+def _completed(user_id: UUID, node_id_col) -> exists:
+    return exists().where(
+        NodeProgress.user_id == user_id,
+        NodeProgress.node_id == node_id_col,
+        NodeProgress.status == NodeProgressStatus.COMPLETED,
+    )
+
+
+def _refresh(db: Session, user_id: UUID, path_id: int, scope: Callable) -> None:
+    """
+    Recomputes membership of the path's nodes whose id satisfies
+    `scope(column)`.
+    """
+    db.execute(
+        delete(PathFrontier)
+        .where(
+            PathFrontier.user_id == user_id,
+            PathFrontier.path_id == path_id,
+            scope(PathFrontier.node_id),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    prereq = aliased(PathEdge)
+    unlocked = (
+        select(literal(user_id, PathFrontier.user_id.type), PathNode.path_id, PathNode.id)
+        .where(
+            PathNode.path_id == path_id,
+            scope(PathNode.id),
+            not_(_completed(user_id, PathNode.id)),
+            not_(
+                exists().where(
+                    prereq.to_node_id == PathNode.id,
+                    not_(_completed(user_id, prereq.from_node_id)),
+                )
+            ),
+        )
+    )
+    db.execute(
+        insert(PathFrontier).from_select(["user_id", "path_id", "node_id"], unlocked)
+    )
+
+
+def build_frontier(db: Session, user_id: UUID, path_id: int) -> None:
+    """
+    Computes the whole frontier of a path (on creation). Does not commit.
+    """
+    _refresh(db, user_id, path_id, lambda col: literal(True))
+    FRONTIER_REFRESHES.inc(reason="build")
+
+
+def refresh_nodes(db: Session, user_id: UUID, path_id: int, node_ids: List[int]) -> None:
+    """
+    Recomputes membership of `node_ids` after their prerequisites changed
+    (graph surgery). Does not commit.
+    """
+    _refresh(db, user_id, path_id, lambda col: col.in_(node_ids))
+    FRONTIER_REFRESHES.inc(reason="graph")
+
+
+def completion_changed(db: Session, user_id: UUID, path_id: int, node_id: int) -> None:
+    """
+    A node became completed (or stopped being): it and its direct
+    successors may enter or leave the frontier. Does not commit.
+    """
+    successors = select(PathEdge.to_node_id).where(PathEdge.from_node_id == node_id)
+    _refresh(db, user_id, path_id, lambda col: or_(col == node_id, col.in_(successors)))
+    FRONTIER_REFRESHES.inc(reason="completion")
+
+
+def get_frontier(
+    db: Session, user_id: UUID, path_id: int
+) -> List[Tuple[PathNode, Optional[NodeProgress]]]:
+    """
+    The frontier's nodes with the learner's progress on them, one query.
+    """
+    return (
+        db.query(PathNode, NodeProgress)
+        .join(PathFrontier, PathFrontier.node_id == PathNode.id)
+        .outerjoin(
+            NodeProgress,
+            and_(NodeProgress.node_id == PathNode.id, NodeProgress.user_id == user_id),
+        )
+        .filter(PathFrontier.user_id == user_id, PathFrontier.path_id == path_id)
+        .order_by(PathNode.id)
+        .all()
+    )
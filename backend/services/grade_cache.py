@@ -0,0 +1,153 @@
+# services/grade_cache.py
+
+import hashlib
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from core.config import (
+    GRADE_CACHE_ENABLED,
+    GRADE_CACHE_MODE,
+    GRADE_CACHE_SIMHASH_CANDIDATES,
+    GRADE_CACHE_SIMHASH_MAX_DISTANCE,
+)
+from models import ChallengeAttempt
+from services.metrics import Counter, hit_ratio
+
+# -----------------------------------------------------------------------------
+# Grade cache
+# -----------------------------------------------------------------------------
+#
+# Resubmitted answers are served from the ChallengeAttempt history instead of
+# being regraded: the full tutor result of every graded attempt is stored in
+# `grading_json`, keyed by (challenge_id, normalized answer hash).
+
+GRADE_CACHE_LOOKUPS = Counter(
+    "grade_cache_lookups_total",
+    "Grade cache lookups by result (hit_exact, hit_near, miss)",
+    ["result"],
+)
+hit_ratio("grade_cache", GRADE_CACHE_LOOKUPS, ["hit_exact", "hit_near"])
+
+_WS_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_answer(answer: str) -> str:
+    """
+    Unicode-normalized, case-folded, whitespace-collapsed answer text.
+    """
+    text = unicodedata.normalize("NFKC", answer or "").casefold()
+    return _WS_RE.sub(" ", text).strip()
+
+
+def answer_hash(answer: str) -> str:
+    return hashlib.sha256(normalize_answer(answer).encode("utf-8")).hexdigest()
+
+
+def simhash64(answer: str, shingle: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles, returned as a signed int so it fits
+    a Postgres BIGINT.
+    """
+    tokens = _TOKEN_RE.findall(normalize_answer(answer))
+    if len(tokens) >= shingle:
+        features = [" ".join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1)]
+    else:
+        features = [" ".join(tokens)]
+
+    weights = [0] * 64
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    value = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            value |= 1 << bit
+
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+def cache_fields(answer: str) -> Dict[str, Any]:
+    """
+    Column values to store on a new ChallengeAttempt.
+    """
+    return {
+        "answer_hash": answer_hash(answer),
+        "answer_simhash": simhash64(answer),
+    }
+
+
+def _usable(grading: Optional[Dict[str, Any]], attempts_count: int) -> bool:
+    """
+    A stored failing grade without a remedial suggestion is not reused once
+    the learner is at the attempt where the tutor would propose one.
+    """
+    if not grading:
+        return False
+    if grading.get("pass") or grading.get("adaptation_suggestion"):
+        return True
+    return attempts_count < 2
+
+
+def lookup_cached_grade(
+    db: Session,
+    challenge_id: int,
+    fields: Dict[str, Any],
+    attempts_count: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    Returns the stored tutor result for an identical (or, in simhash mode,
+    near-identical) earlier answer to this challenge, or None.
+    `fields` is the answer's cache_fields().
+    """
+    if not GRADE_CACHE_ENABLED:
+        return None
+
+    exact = (
+        db.query(ChallengeAttempt.grading_json)
+        .filter(
+            ChallengeAttempt.challenge_id == challenge_id,
+            ChallengeAttempt.answer_hash == fields["answer_hash"],
+            ChallengeAttempt.grading_json.isnot(None),
+        )
+        .order_by(ChallengeAttempt.created_at.desc())
+    )
+    # The newest grade may not be reusable at this attempt; an older one can be
+    for row in exact:
+        if _usable(row.grading_json, attempts_count):
+            GRADE_CACHE_LOOKUPS.inc(result="hit_exact")
+            return row.grading_json
+
+    if GRADE_CACHE_MODE == "simhash":
+        candidates = (
+            db.query(ChallengeAttempt.answer_simhash, ChallengeAttempt.grading_json)
+            .filter(
+                ChallengeAttempt.challenge_id == challenge_id,
+                ChallengeAttempt.answer_simhash.isnot(None),
+                ChallengeAttempt.grading_json.isnot(None),
+            )
+            .order_by(ChallengeAttempt.created_at.desc())
+            .limit(GRADE_CACHE_SIMHASH_CANDIDATES)
+            .all()
+        )
+        best = None
+        best_distance = GRADE_CACHE_SIMHASH_MAX_DISTANCE + 1
+        for row in candidates:
+            distance = hamming_distance(row.answer_simhash, fields["answer_simhash"])
+            if distance < best_distance and _usable(row.grading_json, attempts_count):
+                best, best_distance = row.grading_json, distance
+        if best is not None:
+            GRADE_CACHE_LOOKUPS.inc(result="hit_near")
+            return best
+
+    GRADE_CACHE_LOOKUPS.inc(result="miss")
+    return None
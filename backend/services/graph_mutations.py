@@ -0,0 +1,219 @@
+# services/graph_mutations.py
+
+from dataclasses import dataclass
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from models import LearningPath, PathNode, PathEdge, NodeProgress, NodeProgressStatus, PathChangeType
+from services.frontier import refresh_nodes
+from services.layouts import store_layout
+from services.metrics import Counter
+from services.path_changes import node_payload, record_change
+from services.reachability import on_add_edge, on_insert_before, reaches
+
+# -----------------------------------------------------------------------------
+# Set-based graph mutations
+# -----------------------------------------------------------------------------
+#
+# Structural edits to a path run as a fixed number of SQL statements,
+# independent of the node's degree. Each mutation first bumps the path's
+# version with an UPDATE, which also row-locks the path, so concurrent
+# mutations of one path are serialized until the caller commits. The
+# reachability index, the learner's frontier, the stored layout and the
+# change log are updated in the same transaction.
+
+GRAPH_MUTATIONS = Counter(
+    "graph_mutations_total",
+    "Path graph mutations by operation and outcome",
+    ["operation", "outcome"],
+)
+
+
+class GraphMutationError(ValueError):
+    pass
+
+
+class GraphCycleError(GraphMutationError):
+    pass
+
+
+@dataclass
+class InsertResult:
+    node_id: int
+    path_version: int
+    rerouted_from: List[int]
+
+
+def lock_path(db: Session, path_id: int, *must_contain: int) -> int:
+    """
+    Bumps and returns the path's version, holding its row lock until
+    commit. Raises GraphMutationError unless every node in `must_contain`
+    belongs to the path.
+    """
+    stmt = update(LearningPath).where(LearningPath.id == path_id)
+    for node_id in must_contain:
+        stmt = stmt.where(
+            exists().where(PathNode.id == node_id, PathNode.path_id == path_id)
+        )
+    version = db.execute(
+        stmt.values(version=LearningPath.version + 1)
+        .returning(LearningPath.version)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if version is None:
+        raise GraphMutationError(f"path {path_id} or nodes {must_contain} not found")
+    return version
+
+
+def _insert_node(
+    db: Session,
+    path_id: int,
+    catalog_id: int,
+    target_node_id: int,
+    user_id: UUID,
+) -> int:
+    """
+    Inserts the node, its edge to the target and its progress row. One
+    statement on Postgres (data-modifying CTEs), three elsewhere.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        new_node = (
+            insert(PathNode)
+            .values(path_id=path_id, catalog_id=catalog_id)
+            .returning(PathNode.id)
+            .cte("new_node")
+        )
+        new_edge = (
+            insert(PathEdge)
+            .from_select(
+                ["path_id", "from_node_id", "to_node_id"],
+                select(literal(path_id), new_node.c.id, literal(target_node_id)),
+            )
+            .cte("new_edge")
+        )
+        new_progress = (
+            insert(NodeProgress)
+            .from_select(
+                ["user_id", "node_id", "status", "attempts_count"],
+                select(
+                    literal(user_id, NodeProgress.user_id.type),
+                    new_node.c.id,
+                    literal(NodeProgressStatus.NOT_STARTED),
+                    literal(0),
+                ),
+            )
+            .cte("new_progress")
+        )
+        return db.execute(
+            select(new_node.c.id).add_cte(new_edge, new_progress)
+        ).scalar_one()
+
+    node_id = db.execute(
+        insert(PathNode).values(path_id=path_id, catalog_id=catalog_id).returning(PathNode.id)
+    ).scalar_one()
+    db.execute(
+        insert(PathEdge).values(path_id=path_id, from_node_id=node_id, to_node_id=target_node_id)
+    )
+    db.execute(
+        insert(NodeProgress).values(
+            user_id=user_id,
+            node_id=node_id,
+            status=NodeProgressStatus.NOT_STARTED,
+            attempts_count=0,
+        )
+    )
+    return node_id
+
+
+def insert_node_before(
+    db: Session,
+    *,
+    path_id: int,
+    target_node_id: int,
+    catalog_id: int,
+    user_id: UUID,
+) -> InsertResult:
+    """
+    Inserts a new node (content `catalog_id`) as the only prerequisite of
+    `target_node_id`: every edge P -> target becomes P -> new, plus
+    new -> target. Does not commit.
+
+    A fresh node spliced in front of an existing one cannot close a cycle
+    (a cycle through it would already pass through the target), so the
+    acyclicity invariant holds as long as the path was acyclic before.
+    """
+    version = lock_path(db, path_id, target_node_id)
+
+    node_id = _insert_node(db, path_id, catalog_id, target_node_id, user_id)
+
+    rerouted_from = db.execute(
+        update(PathEdge)
+        .where(
+            PathEdge.path_id == path_id,
+            PathEdge.to_node_id == target_node_id,
+            PathEdge.from_node_id != node_id,
+        )
+        .values(to_node_id=node_id)
+        .returning(PathEdge.from_node_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    on_insert_before(db, path_id, node_id, target_node_id)
+    # The target is locked again until the new node is completed
+    refresh_nodes(db, user_id, path_id, [node_id, target_node_id])
+    store_layout(db, path_id)
+    record_change(
+        db,
+        path_id,
+        PathChangeType.NODE_ADDED,
+        {
+            "node": node_payload(db, node_id, catalog_id),
+            "progress": {
+                "node_id": node_id,
+                "status": NodeProgressStatus.NOT_STARTED,
+                "last_score": None,
+                "attempts_count": 0,
+            },
+            "edges_added": [[p, node_id] for p in rerouted_from] + [[node_id, target_node_id]],
+            "edges_removed": [[p, target_node_id] for p in rerouted_from],
+        },
+        version=version,
+    )
+
+    GRAPH_MUTATIONS.inc(operation="insert_node_before", outcome="ok")
+    return InsertResult(node_id=node_id, path_version=version, rerouted_from=list(rerouted_from))
+
+
+def add_edge(db: Session, *, path_id: int, from_node_id: int, to_node_id: int) -> int:
+    """
+    Adds from -> to unless it would create a cycle (GraphCycleError).
+    Returns the path's new version. Does not commit; on error the caller
+    rolls back (the version bump included).
+    """
+    version = lock_path(db, path_id, from_node_id, to_node_id)
+
+    if from_node_id == to_node_id or reaches(db, to_node_id, from_node_id):
+        GRAPH_MUTATIONS.inc(operation="add_edge", outcome="cycle")
+        raise GraphCycleError(f"edge {from_node_id} -> {to_node_id} would create a cycle")
+
+    db.execute(
+        insert(PathEdge).values(path_id=path_id, from_node_id=from_node_id, to_node_id=to_node_id)
+    )
+    on_add_edge(db, path_id, from_node_id, to_node_id)
+    owner_id = db.execute(
+        select(LearningPath.user_id).where(LearningPath.id == path_id)
+    ).scalar_one()
+    refresh_nodes(db, owner_id, path_id, [to_node_id])
+    store_layout(db, path_id)
+    record_change(
+        db,
+        path_id,
+        PathChangeType.EDGE_ADDED,
+        {"from_node_id": from_node_id, "to_node_id": to_node_id},
+        version=version,
+    )
+    GRAPH_MUTATIONS.inc(operation="add_edge", outcome="ok")
+    return version
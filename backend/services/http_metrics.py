@@ -0,0 +1,87 @@
+# services/http_metrics.py
+
+import time
+
+from services.metrics import Gauge, Histogram
+
+# -----------------------------------------------------------------------------
+# Request metrics
+# -----------------------------------------------------------------------------
+#
+# A plain ASGI middleware (no BaseHTTPMiddleware task overhead). Latency is
+# labeled by the matched route's template (/api/paths/{path_id}), never the
+# raw path, so label cardinality stays bounded.
+#
+# Streaming responses (NDJSON / SSE: /api/paths/stream, /api/events) stay
+# open for minutes or hours. For them the latency is the time until the
+# stream starts, and once it has started the connection moves from
+# http_requests_in_flight to http_streams_open.
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by method, route template and status (streams: until the stream starts)",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being served, by method (open streams excluded)",
+    ["method"],
+)
+HTTP_STREAMS_OPEN = Gauge(
+    "http_streams_open",
+    "Streaming responses being sent, by route template",
+    ["route"],
+)
+
+STREAMING_CONTENT_TYPES = (b"application/x-ndjson", b"text/event-stream")
+
+
+def _is_stream(message) -> bool:
+    for name, value in message.get("headers", ()):
+        if name.lower() == b"content-type":
+            return value.split(b";")[0].strip().lower() in STREAMING_CONTENT_TYPES
+    return False
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        stream_route = None
+
+        def observe():
+            # Set by the router once a route matched
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=method, route=route, status=status
+            )
+            return route
+
+        async def send_with_status(message):
+            nonlocal status, stream_route
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                if _is_stream(message):
+                    stream_route = observe()
+                    HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+                    HTTP_STREAMS_OPEN.inc(route=stream_route)
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if stream_route is not None:
+                HTTP_STREAMS_OPEN.dec(route=stream_route)
+            else:
+                HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+                observe()
@@ -0,0 +1,240 @@
+# services/idempotency.py
+
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import (
+    IDEMPOTENCY_STALE_SECONDS,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS,
+)
+from models import IdempotencyKey, IdempotencyStatus
+from services.metrics import Counter
+
+# -----------------------------------------------------------------------------
+# Idempotency keys
+# -----------------------------------------------------------------------------
+#
+# A request carrying an `Idempotency-Key` header is recorded before it runs.
+# A retry with the same key (same user and endpoint) gets the stored response,
+# or waits for the original request if it is still running, instead of
+# starting another LLM pipeline.
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total",
+    "Requests with an Idempotency-Key by result (executed, replayed, attached, conflict, mismatch)",
+    ["endpoint", "result"],
+)
+
+POLL_INTERVAL_SECONDS = 0.5
+PURGE_PROBABILITY = 0.01
+
+
+def request_fingerprint(payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def purge_expired(db: Session) -> int:
+    deleted = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.expires_at <= datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+class IdempotentRequest:
+    """
+    Context manager around a route body:
+
+        with IdempotentRequest(db, user_id, "POST /api/paths", key, payload) as idem:
+            if idem.response is not None:
+                return idem.response
+            ...
+            return idem.store(response)
+
+    Without a key it does nothing. If the body raises before store(), the
+    entry is removed so a retry runs the request again.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        user_id: str,
+        endpoint: str,
+        key: Optional[str],
+        payload: Dict[str, Any],
+    ):
+        self.db = db
+        self.user_id = UUID(user_id)
+        self.endpoint = endpoint
+        self.key = key
+        self.request_hash = request_fingerprint(payload) if key else None
+        self.response: Optional[Dict[str, Any]] = None
+        self._record_id: Optional[int] = None
+
+    # -------------------------------------------------------------------------
+
+    def _lookup(self) -> Optional[IdempotencyKey]:
+        return (
+            self.db.query(IdempotencyKey)
+            .filter(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.endpoint == self.endpoint,
+                IdempotencyKey.key == self.key,
+            )
+            .first()
+        )
+
+    def _insert(self) -> bool:
+        now = datetime.utcnow()
+        record = IdempotencyKey(
+            user_id=self.user_id,
+            endpoint=self.endpoint,
+            key=self.key,
+            request_hash=self.request_hash,
+            status=IdempotencyStatus.IN_PROGRESS,
+            created_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        )
+        self.db.add(record)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent request with the same key got there first
+            self.db.rollback()
+            return False
+        self._record_id = record.id
+        return True
+
+    def _take_over(self, record: IdempotencyKey) -> bool:
+        """
+        Claims an abandoned in-progress entry; only one retry can win.
+        """
+        now = datetime.utcnow()
+        claimed = (
+            self.db.query(IdempotencyKey)
+            .filter(
+                IdempotencyKey.id == record.id,
+                IdempotencyKey.status == IdempotencyStatus.IN_PROGRESS,
+                IdempotencyKey.created_at == record.created_at,
+            )
+            .update(
+                {
+                    IdempotencyKey.created_at: now,
+                    IdempotencyKey.expires_at: now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+                },
+                synchronize_session=False,
+            )
+        )
+        self.db.commit()
+        if claimed:
+            self._record_id = record.id
+        return bool(claimed)
+
+    def _count(self, result: str) -> None:
+        IDEMPOTENCY_REQUESTS.inc(endpoint=self.endpoint, result=result)
+
+    # -------------------------------------------------------------------------
+
+    def __enter__(self) -> "IdempotentRequest":
+        if not self.key:
+            return self
+
+        if random.random() < PURGE_PROBABILITY:
+            purge_expired(self.db)
+
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            # End the previous read so the next lookup sees other sessions' commits
+            self.db.rollback()
+            record = self._lookup()
+            now = datetime.utcnow()
+
+            if record is not None and record.expires_at <= now:
+                self.db.delete(record)
+                self.db.commit()
+                record = None
+
+            if record is None:
+                if self._insert():
+                    self._count("executed")
+                    return self
+                continue
+
+            if record.request_hash != self.request_hash:
+                self._count("mismatch")
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used with a different request",
+                )
+
+            if record.status == IdempotencyStatus.COMPLETED:
+                self._count("attached" if waited else "replayed")
+                self.response = record.response_json
+                return self
+
+            if (now - record.created_at).total_seconds() > IDEMPOTENCY_STALE_SECONDS:
+                if self._take_over(record):
+                    self._count("executed")
+                    return self
+                continue
+
+            if time.monotonic() - started > IDEMPOTENCY_WAIT_SECONDS:
+                self._count("conflict")
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": "5"},
+                )
+
+            waited = True
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    def store(self, response: Any) -> Any:
+        """
+        Records the response for replays and returns it unchanged.
+        """
+        if self._record_id is None:
+            return response
+
+        (
+            self.db.query(IdempotencyKey)
+            .filter(IdempotencyKey.id == self._record_id)
+            .update(
+                {
+                    IdempotencyKey.status: IdempotencyStatus.COMPLETED,
+                    IdempotencyKey.response_status: 200,
+                    IdempotencyKey.response_json: jsonable_encoder(response),
+                },
+                synchronize_session=False,
+            )
+        )
+        self.db.commit()
+        self._record_id = None
+        return response
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._record_id is not None:
+            # Failed (or did not store): let the next retry run it again
+            self.db.rollback()
+            self.db.query(IdempotencyKey).filter(
+                IdempotencyKey.id == self._record_id
+            ).delete(synchronize_session=False)
+            self.db.commit()
+            self._record_id = None
+        return False
@@ -0,0 +1,270 @@
+# services/job_queue.py
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, func, or_, text
+from sqlalchemy.orm import Session
+
+from core.config import (
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+)
+from models import DEDUPE_ACTIVE, Job, JobStatus
+from services.metrics import Counter, Gauge, Histogram
+
+# -----------------------------------------------------------------------------
+# Durable job queue
+# -----------------------------------------------------------------------------
+#
+# Jobs live in the `jobs` table. Workers claim them with
+# SELECT ... FOR UPDATE SKIP LOCKED on Postgres; the claim itself is a
+# conditional UPDATE, so the queue also stays correct on databases without
+# row locks (SQLite as a local stand-in).
+
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth",
+    "Jobs waiting to run (queued or with an expired lease)",
+    ["job_type"],
+    aggregate="max",
+)
+JOB_WAIT_SECONDS = Histogram(
+    "job_wait_seconds",
+    "Time from enqueue (or retry) to claim",
+    ["job_type"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+JOB_RUN_SECONDS = Histogram(
+    "job_run_seconds",
+    "Handler run time per attempt",
+    ["job_type"],
+)
+JOBS_TOTAL = Counter(
+    "jobs_total",
+    "Finished job attempts by outcome (succeeded, retried, failed, lost_lease)",
+    ["job_type", "outcome"],
+)
+
+
+def enqueue(
+    db: Session,
+    job_type: str,
+    payload: Dict[str, Any],
+    *,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    delay_seconds: float = 0.0,
+    dedupe_key: Optional[str] = None,
+) -> Job:
+    """
+    Adds a job (flushed, not committed: it becomes visible to workers with
+    the caller's transaction). With `dedupe_key`, a queued or running job
+    of the same type and key is returned instead of adding another.
+    """
+    row = dict(
+        job_type=job_type,
+        payload=payload,
+        dedupe_key=dedupe_key,
+        status=JobStatus.QUEUED,
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay_seconds),
+    )
+    if dedupe_key is not None and _insert_deduped(db, row):
+        # Ours, or the one a concurrent enqueue committed first
+        job = (
+            db.query(Job)
+            .filter(
+                Job.job_type == job_type,
+                Job.dedupe_key == dedupe_key,
+                Job.status.in_((JobStatus.QUEUED, JobStatus.RUNNING)),
+            )
+            .first()
+        )
+        if job is not None:
+            return job
+        # That one already finished
+
+    job = Job(**row)
+    db.add(job)
+    db.flush()
+    return job
+
+
+def _insert_deduped(db: Session, row: Dict[str, Any]) -> bool:
+    """
+    Inserts `row` unless an active job holds its dedupe key. False when the
+    database has no ON CONFLICT (the caller inserts, and ux_jobs_dedupe
+    rejects a duplicate).
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return False
+
+    # Concurrent enqueues for one key: the unique index lets one insert
+    # through, the others wait for it to commit and become no-ops.
+    db.execute(
+        insert(Job)
+        .values(**row)
+        .on_conflict_do_nothing(
+            index_elements=["job_type", "dedupe_key"],
+            index_where=text(DEDUPE_ACTIVE),
+        )
+    )
+    return True
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Job.status == JobStatus.QUEUED, Job.run_after <= now),
+        # Lease expired: the worker died or stalled without a heartbeat
+        and_(Job.status == JobStatus.RUNNING, Job.locked_until < now),
+    )
+
+
+def claim(db: Session, job_type: str, worker_id: str) -> Optional[Job]:
+    """
+    Leases the oldest claimable job of `job_type` and commits the lease.
+    Returns None when there is nothing to do.
+    """
+    now = datetime.utcnow()
+    candidate = (
+        db.query(Job.id, Job.status, Job.run_after, Job.locked_until)
+        .filter(Job.job_type == job_type, _claimable(now))
+        .order_by(Job.run_after, Job.id)
+        .with_for_update(skip_locked=True)
+        .limit(1)
+        .first()
+    )
+    if candidate is None:
+        db.rollback()
+        return None
+
+    lease = f"{worker_id}/{uuid.uuid4().hex[:12]}"
+    claimed = (
+        db.query(Job)
+        .filter(Job.id == candidate.id, _claimable(now))
+        .update(
+            {
+                Job.status: JobStatus.RUNNING,
+                Job.attempts: Job.attempts + 1,
+                Job.locked_by: lease,
+                Job.locked_until: now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS),
+                Job.started_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not claimed:
+        # Another worker won the race (no row locks on this database)
+        return None
+
+    job = db.get(Job, candidate.id)
+    if job.locked_by != lease:
+        return None
+
+    waited_since = candidate.run_after
+    if candidate.status == JobStatus.RUNNING and candidate.locked_until:
+        waited_since = candidate.locked_until
+    JOB_WAIT_SECONDS.observe(max((now - waited_since).total_seconds(), 0.0), job_type=job_type)
+    return job
+
+
+def _owned(job: Job):
+    return and_(Job.id == job.id, Job.locked_by == job.locked_by)
+
+
+def heartbeat(db: Session, job_id: int, lease: str) -> bool:
+    """
+    Extends the lease (`Job.locked_by` of the claim) on a running job.
+    False if the lease was lost. Takes plain values so it can run from a
+    different thread and session than the one running the job.
+    """
+    extended = (
+        db.query(Job)
+        .filter(Job.id == job_id, Job.locked_by == lease, Job.status == JobStatus.RUNNING)
+        .update(
+            {Job.locked_until: datetime.utcnow() + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return bool(extended)
+
+
+def _finish(db: Session, job: Job, values: Dict[Any, Any], outcome: str, run_seconds: float) -> bool:
+    updated = (
+        db.query(Job)
+        .filter(_owned(job), Job.status == JobStatus.RUNNING)
+        .update(values, synchronize_session=False)
+    )
+    db.commit()
+    JOB_RUN_SECONDS.observe(run_seconds, job_type=job.job_type)
+    # A worker whose lease expired must not overwrite the new owner's state
+    JOBS_TOTAL.inc(job_type=job.job_type, outcome=outcome if updated else "lost_lease")
+    return bool(updated)
+
+
+def complete(db: Session, job: Job, result: Any, run_seconds: float) -> bool:
+    return _finish(
+        db,
+        job,
+        {
+            Job.status: JobStatus.SUCCEEDED,
+            Job.result: result,
+            Job.locked_until: None,
+            Job.finished_at: datetime.utcnow(),
+        },
+        "succeeded",
+        run_seconds,
+    )
+
+
+def fail(db: Session, job: Job, error: str, run_seconds: float) -> bool:
+    """
+    Requeues the job with exponential backoff, or marks it failed once
+    max_attempts is reached.
+    """
+    now = datetime.utcnow()
+    if job.attempts < job.max_attempts:
+        backoff = JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        values = {
+            Job.status: JobStatus.QUEUED,
+            Job.run_after: now + timedelta(seconds=backoff),
+            Job.locked_until: None,
+            Job.last_error: error,
+        }
+        outcome = "retried"
+    else:
+        values = {
+            Job.status: JobStatus.FAILED,
+            Job.locked_until: None,
+            Job.last_error: error,
+            Job.finished_at: now,
+        }
+        outcome = "failed"
+    return _finish(db, job, values, outcome, run_seconds)
+
+
+def queue_depths(db: Session) -> Dict[str, int]:
+    """
+    Claimable jobs per type; also updates the JOB_QUEUE_DEPTH gauge.
+    """
+    now = datetime.utcnow()
+    rows = (
+        db.query(Job.job_type, func.count(Job.id))
+        .filter(_claimable(now))
+        .group_by(Job.job_type)
+        .all()
+    )
+    db.rollback()
+    depths = dict(rows)
+    for job_type in set(depths) | {key[0] for key in JOB_QUEUE_DEPTH.samples()}:
+        JOB_QUEUE_DEPTH.set(depths.get(job_type, 0), job_type=job_type)
+    return depths
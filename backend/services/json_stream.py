@@ -0,0 +1,157 @@
+# services/json_stream.py
+
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+# -----------------------------------------------------------------------------
+# Incremental JSON parser for streamed model output
+# -----------------------------------------------------------------------------
+
+
+class IncrementalObjectParser:
+    """
+    Incrementally scans a streamed top-level JSON object and emits its parts
+    as soon as they are complete:
+
+    - ("item", key, obj)   for each element of a top-level array listed in
+                           `array_keys` (e.g. every node in "nodes")
+    - ("value", key, val)  for every other top-level scalar value
+
+    Anything before the first "{" (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self, array_keys: Iterable[str]):
+        self.array_keys = set(array_keys)
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._token_start: Optional[int] = None
+        self._array_key: Optional[str] = None
+        self._item_start: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        events: List[Tuple[str, str, Any]] = []
+        self._buf += chunk
+
+        while self._pos < len(self._buf) and not self._done:
+            i = self._pos
+            ch = self._buf[i]
+            self._pos += 1
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_top_level_string(i, events)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token_start = i
+                continue
+
+            if ch in "{[":
+                if self._depth == 1:
+                    self._token_start = None
+                    if ch == "[" and self._key in self.array_keys:
+                        self._array_key = self._key
+                elif (
+                    self._depth == 2
+                    and ch == "{"
+                    and self._array_key is not None
+                ):
+                    self._item_start = i
+                self._depth += 1
+                continue
+
+            if ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flush_scalar(i, events)
+                    self._done = True
+                elif self._depth == 2 and self._item_start is not None:
+                    item = self._load(self._buf[self._item_start:i + 1])
+                    if item is not None:
+                        events.append(("item", self._array_key, item))
+                    self._item_start = None
+                elif self._depth == 1:
+                    self._array_key = None
+                continue
+
+            if self._depth != 1:
+                continue
+
+            if ch == ":":
+                self._expect_key = False
+                self._token_start = None
+            elif ch == ",":
+                self._flush_scalar(i, events)
+                self._expect_key = True
+            elif not ch.isspace() and self._token_start is None:
+                # start of a bare scalar (number / true / false / null)
+                self._token_start = i
+
+        return events
+
+    def _end_top_level_string(self, end: int, events: List[Tuple[str, str, Any]]):
+        raw = self._buf[self._token_start:end + 1]
+        self._token_start = None
+        if self._expect_key:
+            self._key = self._load(raw)
+        else:
+            events.append(("value", self._key, self._load(raw)))
+
+    def _flush_scalar(self, end: int, events: List[Tuple[str, str, Any]]):
+        if self._token_start is None or self._expect_key:
+            self._token_start = None
+            return
+        raw = self._buf[self._token_start:end].strip()
+        self._token_start = None
+        if raw:
+            events.append(("value", self._key, self._load(raw)))
+
+    @staticmethod
+    def _load(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+
+def iter_object_events(
+    chunks: Iterable[str],
+    array_keys: Iterable[str],
+):
+    """
+    Convenience generator around IncrementalObjectParser.
+    """
+    parser = IncrementalObjectParser(array_keys)
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            yield event
+        if parser.done:
+            break
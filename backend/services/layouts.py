@@ -0,0 +1,87 @@
+# services/layouts.py
+
+from typing import Any, Dict
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from models import LearningPath, PathLayout
+from graph.dag import CSRDag
+from graph.layout import layered_layout
+from services.metrics import Counter
+
+# -----------------------------------------------------------------------------
+# Cached path layouts
+# -----------------------------------------------------------------------------
+#
+# The layered layout is computed when a path is created or its graph
+# changes, not on every view. get_path serves the latest stored layout;
+# progress changes bump the version too but leave the layout as it is.
+
+PATH_LAYOUTS = Counter(
+    "path_layouts_total",
+    "Path layout lookups by result (computed, cached)",
+    ["result"],
+)
+
+
+def _insert_ignoring_conflict(db: Session, row: Dict[str, Any]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        # Two requests may compute the same version; either result is fine
+        db.execute(
+            insert(PathLayout)
+            .values(**row)
+            .on_conflict_do_nothing(index_elements=["path_id", "version"])
+        )
+    else:
+        db.add(PathLayout(**row))
+        db.flush()
+
+
+def store_layout(db: Session, path_id: int) -> Dict[str, Any]:
+    """
+    Computes and stores the layout of the path's current version, dropping
+    older ones. Does not commit.
+    """
+    version = db.execute(
+        select(LearningPath.version).where(LearningPath.id == path_id)
+    ).scalar_one()
+
+    layout = {"version": version, **layered_layout(CSRDag.from_db(db, path_id))}
+
+    db.execute(
+        delete(PathLayout)
+        .where(PathLayout.path_id == path_id, PathLayout.version != version)
+        .execution_options(synchronize_session=False)
+    )
+    _insert_ignoring_conflict(db, {"path_id": path_id, "version": version, "layout_json": layout})
+    PATH_LAYOUTS.inc(result="computed")
+    return layout
+
+
+def current_layout(db: Session, lp: LearningPath) -> Dict[str, Any]:
+    """
+    The latest stored layout for `lp`. Paths created before layouts were
+    stored get one computed (and committed) on first use.
+    """
+    layout = db.execute(
+        select(PathLayout.layout_json)
+        .where(PathLayout.path_id == lp.id)
+        .order_by(PathLayout.version.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if layout is not None:
+        PATH_LAYOUTS.inc(result="cached")
+        return layout
+
+    layout = store_layout(db, lp.id)
+    db.commit()
+    return layout
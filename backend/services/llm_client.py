@@ -1,22 +1,467 @@
+import itertools
+import math
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Type
+
 from google import genai
-from core.config import GOOGLE_API_KEY, GEMINI_MODEL
+from pydantic import BaseModel
+
+from core.config import GOOGLE_API_KEY, GEMINI_MODEL, LLM_INPUT_BUDGETS
+from services import request_timing
+from services.metrics import Counter, Histogram
+from services.llm_resilience import run_with_resilience
+from services.llm_hedging import hedged_call, record_latency
+from services.llm_router import (
+    ModelTarget,
+    RouteDecision,
+    choose_route,
+    fallback_decision,
+    record_model_latency,
+)
 
 client = genai.Client(api_key=GOOGLE_API_KEY)
 
-def call_gemini(
+# -----------------------------------------------------------------------------
+# Token accounting
+# -----------------------------------------------------------------------------
+
+# Gemini tokenizers average ~4 characters per token on English prose / JSON.
+CHARS_PER_TOKEN = 4
+
+TOKEN_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+LLM_INPUT_TOKENS = Histogram(
+    "llm_input_tokens",
+    "Prompt tokens per LLM call",
+    ["agent"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_OUTPUT_TOKENS = Histogram(
+    "llm_output_tokens",
+    "Generated tokens per LLM call",
+    ["agent"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_TOKENS_TOTAL = Counter(
+    "llm_tokens_total",
+    "Tokens consumed, by agent and direction (input / output)",
+    ["agent", "direction"],
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds",
+    "call_gemini / stream_gemini wall time including retries, hedging and "
+    "fallback, by agent and outcome (ok, error, cancelled)",
+    ["agent", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+)
+LLM_BUDGET_EXCEEDED = Counter(
+    "llm_input_budget_exceeded_total",
+    "Calls whose estimated prompt size exceeded the agent's input budget",
+    ["agent"],
+)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Fast local token estimate, used for budgeting before a call is made.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def count_tokens(text: str, model: str = GEMINI_MODEL) -> int:
+    """
+    Exact token count from the Gemini tokenizer (one API round trip).
+    """
+    resp = client.models.count_tokens(model=model, contents=text)
+    return resp.total_tokens
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts `text` to roughly `max_tokens`, preferring a line or word boundary.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    cut = text[:max(max_tokens, 0) * CHARS_PER_TOKEN]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > len(cut) * 0.8:
+        cut = cut[:boundary]
+    return cut + "\n[...truncated]"
+
+
+def input_budget(agent: str) -> int:
+    return LLM_INPUT_BUDGETS.get(agent, LLM_INPUT_BUDGETS["default"])
+
+
+def _check_budget(agent: str, system_instruction: str, user_message: str, span) -> None:
+    estimated = estimate_tokens(system_instruction) + estimate_tokens(user_message)
+    budget = input_budget(agent)
+    if estimated > budget:
+        LLM_BUDGET_EXCEEDED.inc(agent=agent)
+        if span:
+            span.add_event(
+                name="llm_input_budget_exceeded",
+                metadata={"agent": agent, "estimated_tokens": estimated, "budget": budget},
+            )
+
+
+def _record_usage(
+    agent: str,
+    model: str,
+    input_tokens: Optional[int],
+    output_tokens: Optional[int],
+    span,
     system_instruction: str,
     user_message: str,
-    model: str = GEMINI_MODEL,
-    temperature: float = 0.6,
-) -> str:
+) -> None:
+    if input_tokens is None:
+        input_tokens = estimate_tokens(system_instruction) + estimate_tokens(user_message)
+    output_tokens = output_tokens or 0
+
+    LLM_INPUT_TOKENS.observe(input_tokens, agent=agent)
+    LLM_OUTPUT_TOKENS.observe(output_tokens, agent=agent)
+    LLM_TOKENS_TOTAL.inc(input_tokens, agent=agent, direction="input")
+    LLM_TOKENS_TOTAL.inc(output_tokens, agent=agent, direction="output")
+
+    if span:
+        span.add_event(
+            name="llm_usage",
+            metadata={
+                "agent": agent,
+                "model": model,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+            },
+        )
+
+
+# -----------------------------------------------------------------------------
+# Providers
+# -----------------------------------------------------------------------------
+#
+# Each provider returns (text, input_tokens, output_tokens); token counts are
+# None when the provider did not report them.
+
+Completion = Tuple[str, Optional[int], Optional[int]]
+
+
+def _generation_config(
+    system_instruction: str,
+    temperature: float,
+    response_schema: Optional[Type[BaseModel]],
+    timeout_seconds: Optional[float] = None,
+) -> Dict[str, Any]:
+    config: Dict[str, Any] = {
+        "system_instruction": system_instruction,
+        "temperature": temperature,
+    }
+    if timeout_seconds is not None:
+        # Per-attempt HTTP deadline (milliseconds)
+        config["http_options"] = {"timeout": max(int(timeout_seconds * 1000), 1)}
+    if response_schema is not None:
+        # Constrained decoding: the model can only emit JSON matching the schema
+        config["response_mime_type"] = "application/json"
+        config["response_schema"] = response_schema
+    return config
+
+
+def _gemini_generate(
+    target: ModelTarget,
+    system_instruction: str,
+    user_message: str,
+    temperature: float,
+    response_schema: Optional[Type[BaseModel]],
+    timeout_seconds: float,
+) -> Completion:
     resp = client.models.generate_content(
-        model=model,
+        model=target.model,
         contents=[
             {"role": "user", "parts": [user_message]},
         ],
-        config={
-            "system_instruction": system_instruction,
-            "temperature": temperature,
-        },
+        config=_generation_config(
+            system_instruction, temperature, response_schema, timeout_seconds
+        ),
+    )
+    usage = resp.usage_metadata
+    return (
+        resp.text,
+        getattr(usage, "prompt_token_count", None),
+        getattr(usage, "candidates_token_count", None),
+    )
+
+
+def _gemini_stream(
+    target: ModelTarget,
+    system_instruction: str,
+    user_message: str,
+    temperature: float,
+    response_schema: Optional[Type[BaseModel]],
+    timeout_seconds: float,
+) -> Iterator[Completion]:
+    for chunk in client.models.generate_content_stream(
+        model=target.model,
+        contents=[
+            {"role": "user", "parts": [user_message]},
+        ],
+        config=_generation_config(
+            system_instruction, temperature, response_schema, timeout_seconds
+        ),
+    ):
+        # Usage is reported (cumulatively) on the final chunks
+        usage = chunk.usage_metadata
+        yield (
+            chunk.text or "",
+            getattr(usage, "prompt_token_count", None),
+            getattr(usage, "candidates_token_count", None),
+        )
+
+
+def _litellm_kwargs(
+    target: ModelTarget,
+    system_instruction: str,
+    user_message: str,
+    temperature: float,
+    response_schema: Optional[Type[BaseModel]],
+    timeout_seconds: float,
+) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {
+        "model": target.model,
+        "messages": [
+            {"role": "system", "content": system_instruction},
+            {"role": "user", "content": user_message},
+        ],
+        "temperature": temperature,
+        "timeout": timeout_seconds,
+    }
+    if target.api_base:
+        kwargs["api_base"] = target.api_base
+    if response_schema is not None:
+        # OpenAI-compatible servers only reliably support plain JSON mode;
+        # the schema itself is enforced by parse_model_json.
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
+
+
+def _litellm_generate(
+    target: ModelTarget,
+    system_instruction: str,
+    user_message: str,
+    temperature: float,
+    response_schema: Optional[Type[BaseModel]],
+    timeout_seconds: float,
+) -> Completion:
+    import litellm  # only loaded when a route actually uses it
+
+    resp = litellm.completion(**_litellm_kwargs(
+        target, system_instruction, user_message, temperature, response_schema, timeout_seconds
+    ))
+    usage = getattr(resp, "usage", None)
+    return (
+        resp.choices[0].message.content or "",
+        getattr(usage, "prompt_tokens", None),
+        getattr(usage, "completion_tokens", None),
+    )
+
+
+def _litellm_stream(
+    target: ModelTarget,
+    system_instruction: str,
+    user_message: str,
+    temperature: float,
+    response_schema: Optional[Type[BaseModel]],
+    timeout_seconds: float,
+) -> Iterator[Completion]:
+    import litellm  # only loaded when a route actually uses it
+
+    for chunk in litellm.completion(
+        stream=True,
+        stream_options={"include_usage": True},
+        **_litellm_kwargs(
+            target, system_instruction, user_message, temperature, response_schema, timeout_seconds
+        ),
+    ):
+        usage = getattr(chunk, "usage", None)
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        yield (
+            delta or "",
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+
+_GENERATE: Dict[str, Callable[..., Completion]] = {
+    "gemini": _gemini_generate,
+    "litellm": _litellm_generate,
+}
+_STREAM: Dict[str, Callable[..., Iterator[Completion]]] = {
+    "gemini": _gemini_stream,
+    "litellm": _litellm_stream,
+}
+
+
+# -----------------------------------------------------------------------------
+# LLM calls
+# -----------------------------------------------------------------------------
+
+def _record_route(decision: RouteDecision, span) -> None:
+    if span:
+        span.add_event(
+            name="llm_route",
+            metadata={
+                "agent": decision.agent,
+                "model": decision.target.key,
+                "reason": decision.reason,
+            },
+        )
+
+
+def _call_routed(
+    decision: RouteDecision,
+    system_instruction: str,
+    user_message: str,
+    temperature: float,
+    response_schema: Optional[Type[BaseModel]],
+    span,
+) -> str:
+    agent, target = decision.agent, decision.target
+    generate = _GENERATE[target.provider]
+    _record_route(decision, span)
+
+    def attempt(timeout_seconds: float) -> Completion:
+        return generate(
+            target, system_instruction, user_message, temperature, response_schema, timeout_seconds
+        )
+
+    started = time.monotonic()
+    text, input_tokens, output_tokens = hedged_call(agent, lambda: run_with_resilience(
+        agent,
+        target.key,
+        estimate_tokens(system_instruction) + estimate_tokens(user_message),
+        attempt,
+    ))
+    record_model_latency(agent, target, time.monotonic() - started)
+
+    _record_usage(
+        agent, target.key, input_tokens, output_tokens, span, system_instruction, user_message
     )
-    return resp.text
+    return text
+
+
+def call_gemini(
+    system_instruction: str,
+    user_message: str,
+    model: Optional[str] = None,
+    temperature: float = 0.6,
+    response_schema: Optional[Type[BaseModel]] = None,
+    agent: str = "default",
+    span=None,
+) -> str:
+    """
+    Single LLM call for `agent`.
+
+    The model comes from the agent's route (services/llm_router.py) unless
+    `model` is given. The call runs behind the per-agent resilience policy
+    (rate limits, retries, deadline, circuit breaker), is hedged for
+    latency-critical agents, and is retried once on the fallback model if
+    the primary is unavailable.
+    """
+    _check_budget(agent, system_instruction, user_message, span)
+
+    started = time.monotonic()
+    outcome = "error"
+    try:
+        decision = choose_route(agent, model)
+        try:
+            text = _call_routed(
+                decision, system_instruction, user_message, temperature, response_schema, span
+            )
+        except Exception as exc:
+            fallback = fallback_decision(decision, exc)
+            if fallback is None:
+                raise
+            if span:
+                span.add_event(
+                    name="llm_route_fallback",
+                    metadata={"agent": agent, "failed_model": decision.target.key, "error": str(exc)},
+                )
+            text = _call_routed(
+                fallback, system_instruction, user_message, temperature, response_schema, span
+            )
+        outcome = "ok"
+        return text
+    finally:
+        elapsed = time.monotonic() - started
+        LLM_REQUEST_SECONDS.observe(elapsed, agent=agent, outcome=outcome)
+        request_timing.record("llm", elapsed, f"{agent} {outcome}")
+
+
+def stream_gemini(
+    system_instruction: str,
+    user_message: str,
+    model: Optional[str] = None,
+    temperature: float = 0.6,
+    response_schema: Optional[Type[BaseModel]] = None,
+    agent: str = "default",
+    span=None,
+) -> Iterator[str]:
+    """
+    Same as call_gemini, but yields text chunks as the model produces them.
+
+    Only opening the stream (up to the first chunk) goes through the retry
+    loop and the fallback model; once chunks are flowing, errors propagate
+    to the caller.
+    """
+    _check_budget(agent, system_instruction, user_message, span)
+    estimated = estimate_tokens(system_instruction) + estimate_tokens(user_message)
+
+    def open_stream(decision: RouteDecision):
+        target = decision.target
+        stream_fn = _STREAM[target.provider]
+        _record_route(decision, span)
+
+        def attempt(timeout_seconds: float):
+            stream = stream_fn(
+                target, system_instruction, user_message, temperature, response_schema, timeout_seconds
+            )
+            return stream, next(stream, None)
+
+        return run_with_resilience(agent, target.key, estimated, attempt)
+
+    started = time.monotonic()
+    outcome = "error"
+    try:
+        decision = choose_route(agent, model)
+        try:
+            stream, first = open_stream(decision)
+        except Exception as exc:
+            fallback = fallback_decision(decision, exc)
+            if fallback is None:
+                raise
+            decision = fallback
+            stream, first = open_stream(decision)
+
+        input_tokens = output_tokens = None
+        for text, chunk_input, chunk_output in itertools.chain([first] if first is not None else [], stream):
+            input_tokens = chunk_input or input_tokens
+            output_tokens = chunk_output or output_tokens
+            if text:
+                yield text
+
+        elapsed = time.monotonic() - started
+        record_latency(agent, elapsed)
+        record_model_latency(agent, decision.target, elapsed)
+        _record_usage(
+            agent, decision.target.key, input_tokens, output_tokens, span, system_instruction, user_message
+        )
+        outcome = "ok"
+    except GeneratorExit:
+        # The consumer stopped reading (e.g. the client disconnected)
+        outcome = "cancelled"
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        LLM_REQUEST_SECONDS.observe(elapsed, agent=agent, outcome=outcome)
+        request_timing.record("llm", elapsed, f"{agent} {outcome} (stream)")
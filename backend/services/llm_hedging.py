@@ -0,0 +1,170 @@
+# services/llm_hedging.py
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+from core.config import (
+    LLM_HEDGE_MAX_WORKERS,
+    LLM_HEDGE_POLICIES,
+    LLM_LATENCY_SLOS,
+    LLM_LATENCY_WINDOW_SIZE,
+)
+from services.metrics import Counter, RollingWindow, ratio
+
+T = TypeVar("T")
+
+# -----------------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------------
+
+HEDGE_ELIGIBLE = Counter(
+    "llm_hedge_eligible_calls_total",
+    "Calls made by agents with a hedging policy",
+    ["agent"],
+)
+HEDGES = Counter(
+    "llm_hedges_total",
+    "Hedge (second) requests sent",
+    ["agent"],
+)
+HEDGE_WINS = Counter(
+    "llm_hedge_wins_total",
+    "Hedged calls where the second request finished first",
+    ["agent"],
+)
+SLO_VIOLATIONS = Counter(
+    "llm_slo_violations_total",
+    "LLM calls slower than the agent's latency SLO",
+    ["agent"],
+)
+
+# -----------------------------------------------------------------------------
+# Rolling latency per agent
+# -----------------------------------------------------------------------------
+
+_windows: Dict[str, RollingWindow] = {}
+_hedge_windows: Dict[str, RollingWindow] = {}
+_windows_lock = threading.Lock()
+
+
+def _window(registry: Dict[str, RollingWindow], key: str) -> RollingWindow:
+    with _windows_lock:
+        window = registry.get(key)
+        if window is None:
+            window = registry[key] = RollingWindow(LLM_LATENCY_WINDOW_SIZE)
+        return window
+
+
+def latency_window(agent: str) -> RollingWindow:
+    """
+    End-to-end latency (seconds) of recent successful calls for `agent`.
+    """
+    return _window(_windows, agent)
+
+
+def latency_slo(agent: str) -> float:
+    return LLM_LATENCY_SLOS.get(agent, LLM_LATENCY_SLOS["default"])
+
+
+def record_latency(agent: str, seconds: float) -> None:
+    latency_window(agent).observe(seconds)
+    if seconds > latency_slo(agent):
+        SLO_VIOLATIONS.inc(agent=agent)
+
+
+def hedge_delay(agent: str) -> Optional[float]:
+    """
+    Seconds to wait before hedging a call for `agent`, or None when the
+    agent is not hedged.
+    """
+    policy = LLM_HEDGE_POLICIES.get(agent)
+    if not policy:
+        return None
+
+    window = latency_window(agent)
+    if len(window) < 20:
+        return policy["initial_delay_seconds"]
+
+    delay = window.percentile(policy["percentile"])
+    return min(max(delay, policy["min_delay_seconds"]), policy["max_delay_seconds"])
+
+
+def hedge_rate(agent: str) -> Optional[float]:
+    """
+    Share of recent eligible calls that were hedged.
+    """
+    return _window(_hedge_windows, agent).mean()
+
+
+def hedge_win_rate(agent: str) -> Optional[float]:
+    """
+    Share of hedged calls won by the second request.
+    """
+    return ratio(HEDGE_WINS, HEDGES, agent=agent)
+
+
+# -----------------------------------------------------------------------------
+# Hedged execution
+# -----------------------------------------------------------------------------
+
+_executor = ThreadPoolExecutor(
+    max_workers=LLM_HEDGE_MAX_WORKERS,
+    thread_name_prefix="llm-hedge",
+)
+
+
+def _submit(fn: Callable[[], T]):
+    # Carry request-scoped context (tracing, timings) into the worker thread
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, fn)
+
+
+def hedged_call(agent: str, fn: Callable[[], T]) -> T:
+    """
+    Runs `fn`, and for agents with a hedging policy sends an identical
+    second call if the first has not finished after hedge_delay(agent).
+    The first successful result wins; the loser is left to finish in the
+    background. Latency is recorded for every agent.
+    """
+    started = time.monotonic()
+    delay = hedge_delay(agent)
+
+    if delay is None:
+        result = fn()
+        record_latency(agent, time.monotonic() - started)
+        return result
+
+    HEDGE_ELIGIBLE.inc(agent=agent)
+    hedges = _window(_hedge_windows, agent)
+
+    primary = _submit(fn)
+    done, _ = wait([primary], timeout=delay)
+
+    allow_hedge = (hedges.mean() or 0.0) < LLM_HEDGE_POLICIES[agent]["max_hedge_ratio"]
+    if done or not allow_hedge:
+        hedges.observe(0.0)
+        result = primary.result()
+        record_latency(agent, time.monotonic() - started)
+        return result
+
+    hedges.observe(1.0)
+    HEDGES.inc(agent=agent)
+    secondary = _submit(fn)
+    pending = {primary, secondary}
+    error: Optional[BaseException] = None
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            if future is secondary:
+                HEDGE_WINS.inc(agent=agent)
+            record_latency(agent, time.monotonic() - started)
+            return future.result()
+
+    raise error
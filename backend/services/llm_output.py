@@ -0,0 +1,121 @@
+# services/llm_output.py
+
+import json
+import re
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from services.metrics import Counter, ratio
+
+# -----------------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------------
+
+PARSE_ATTEMPTS = Counter(
+    "llm_output_parse_attempts_total",
+    "Model outputs parsed as JSON, per agent",
+    ["agent"],
+)
+PARSE_REPAIRS = Counter(
+    "llm_output_parse_repairs_total",
+    "Model outputs that only parsed after the local repair pass",
+    ["agent"],
+)
+PARSE_FAILURES = Counter(
+    "llm_output_parse_failures_total",
+    "Model outputs that could not be parsed or validated",
+    ["agent"],
+)
+
+
+def parse_failure_rate(agent: str) -> Optional[float]:
+    return ratio(PARSE_FAILURES, PARSE_ATTEMPTS, agent=agent)
+
+
+# -----------------------------------------------------------------------------
+# Parsing
+# -----------------------------------------------------------------------------
+
+
+class ModelOutputError(ValueError):
+    """Raised when a model output cannot be turned into the expected JSON."""
+
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?|\n?\s*```\s*$")
+
+
+def _strip_trailing_commas(text: str) -> str:
+    out = []
+    in_string = False
+    escape = False
+    n = len(text)
+
+    for i, ch in enumerate(text):
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] in "}]":
+                continue
+        out.append(ch)
+
+    return "".join(out)
+
+
+def repair_json(raw: str) -> str:
+    """
+    Cheap, local fixes for the usual ways models break JSON:
+    markdown code fences, prose around the object and trailing commas.
+    """
+    text = _FENCE_RE.sub("", raw.strip())
+
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start != -1:
+        end = max(text.rfind("}"), text.rfind("]"))
+        if end > start:
+            text = text[start:end + 1]
+
+    return _strip_trailing_commas(text)
+
+
+def parse_model_json(
+    raw: str,
+    *,
+    agent: str,
+    schema: Optional[Type[BaseModel]] = None,
+) -> Dict[str, Any]:
+    """
+    Parses a model output, falling back to repair_json before giving up,
+    and validates it against `schema` when given.
+
+    Raises ModelOutputError on failure. Outcomes are counted per agent.
+    """
+    PARSE_ATTEMPTS.inc(agent=agent)
+
+    try:
+        try:
+            parsed = json.loads(raw)
+        except (TypeError, ValueError):
+            parsed = json.loads(repair_json(raw or ""))
+            PARSE_REPAIRS.inc(agent=agent)
+
+        if schema is not None:
+            parsed = schema.model_validate(parsed).model_dump(by_alias=True)
+    except (ValueError, ValidationError) as exc:
+        PARSE_FAILURES.inc(agent=agent)
+        raise ModelOutputError(str(exc)) from exc
+
+    return parsed
@@ -0,0 +1,351 @@
+# services/llm_resilience.py
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import httpx
+from google.genai import errors as genai_errors
+
+from core.config import (
+    LLM_BREAKER_FAILURE_RATIO,
+    LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_OPEN_SECONDS,
+    LLM_BREAKER_WINDOW_SECONDS,
+    LLM_CALL_POLICIES,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+)
+from services.metrics import Counter, Gauge, Histogram
+
+T = TypeVar("T")
+
+# -----------------------------------------------------------------------------
+# Errors
+# -----------------------------------------------------------------------------
+
+
+class LLMUnavailableError(RuntimeError):
+    """The LLM call was not (or could no longer be) attempted."""
+
+    retry_after: float = 1.0
+
+
+class CircuitOpenError(LLMUnavailableError):
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Circuit open for model {model}")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(LLMUnavailableError):
+    pass
+
+
+# -----------------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------------
+
+LLM_CALLS = Counter(
+    "llm_calls_total",
+    "LLM calls by agent and outcome (ok, error, circuit_open, deadline)",
+    ["agent", "outcome"],
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "Retried LLM attempts",
+    ["agent"],
+)
+LLM_CALL_LATENCY = Histogram(
+    "llm_call_latency_seconds",
+    "Wall time of a single LLM attempt",
+    ["agent"],
+)
+LLM_RATE_LIMIT_WAIT = Histogram(
+    "llm_rate_limit_wait_seconds",
+    "Time spent waiting on the client-side rate limiter",
+    ["agent"],
+)
+LLM_CIRCUIT_STATE = Gauge(
+    "llm_circuit_state",
+    "Circuit breaker state per model (0 closed, 1 half-open, 2 open)",
+    ["model"],
+    aggregate="max",
+)
+
+
+# -----------------------------------------------------------------------------
+# Policies
+# -----------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    timeout_seconds: float
+    max_retries: int
+    backoff_base_seconds: float
+    backoff_max_seconds: float
+    requests_per_minute: Optional[int] = None
+
+
+def get_policy(agent: str) -> CallPolicy:
+    return CallPolicy(**{
+        **LLM_CALL_POLICIES["default"],
+        **LLM_CALL_POLICIES.get(agent, {}),
+    })
+
+
+# -----------------------------------------------------------------------------
+# Token bucket
+# -----------------------------------------------------------------------------
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate_per_minute`.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> float:
+        """
+        Takes `amount` tokens (possibly going negative) and returns how long
+        the caller has to wait before the reservation is covered.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(amount, self.capacity)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _refund(self, amount: float) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+    def acquire(self, amount: float, deadline: float) -> float:
+        """
+        Blocks until `amount` tokens are available. Returns the time waited.
+        Raises DeadlineExceededError if that would take past `deadline`.
+        """
+        wait = self._reserve(amount)
+        if wait <= 0:
+            return 0.0
+        if time.monotonic() + wait > deadline:
+            self._refund(amount)
+            raise DeadlineExceededError("Rate limit wait exceeds call deadline")
+        time.sleep(wait)
+        return wait
+
+
+_global_requests = TokenBucket(LLM_REQUESTS_PER_MINUTE)
+_global_tokens = TokenBucket(LLM_TOKENS_PER_MINUTE)
+_agent_buckets: Dict[str, TokenBucket] = {}
+_agent_buckets_lock = threading.Lock()
+
+
+def _agent_bucket(agent: str, policy: CallPolicy) -> Optional[TokenBucket]:
+    if not policy.requests_per_minute:
+        return None
+    with _agent_buckets_lock:
+        bucket = _agent_buckets.get(agent)
+        if bucket is None:
+            bucket = _agent_buckets[agent] = TokenBucket(policy.requests_per_minute)
+        return bucket
+
+
+# -----------------------------------------------------------------------------
+# Circuit breaker
+# -----------------------------------------------------------------------------
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a rolling time window.
+
+    closed -> open when the failure ratio crosses the threshold,
+    open -> half-open after `open_seconds` (one probe call is let through),
+    half-open -> closed on success, back to open on failure.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = LLM_BREAKER_FAILURE_RATIO,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        window_seconds: float = LLM_BREAKER_WINDOW_SECONDS,
+        open_seconds: float = LLM_BREAKER_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: int) -> None:
+        self.state = state
+        LLM_CIRCUIT_STATE.set(state, model=self.name)
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                if elapsed < self.open_seconds:
+                    raise CircuitOpenError(self.name, self.open_seconds - elapsed)
+                self._set_state(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.name, 1.0)
+                self._probe_in_flight = True
+
+    def cancel(self) -> None:
+        """
+        Releases a half-open probe slot for a call that was never made.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                if ok:
+                    self._set_state(self.CLOSED)
+                else:
+                    self._opened_at = now
+                    self._set_state(self.OPEN)
+                return
+
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+                self._outcomes.popleft()
+
+            total = len(self._outcomes)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if failures / total >= self.failure_ratio:
+                self._opened_at = now
+                self._set_state(self.OPEN)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = _breakers[model] = CircuitBreaker(model)
+        return breaker
+
+
+# -----------------------------------------------------------------------------
+# Retry loop
+# -----------------------------------------------------------------------------
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError, TimeoutError)):
+        return True
+    # LiteLLM / OpenAI-style exceptions carry the HTTP status
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(policy: CallPolicy, attempt: int) -> float:
+    """
+    Exponential backoff with full jitter.
+    """
+    cap = min(policy.backoff_max_seconds, policy.backoff_base_seconds * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def run_with_resilience(
+    agent: str,
+    model: str,
+    estimated_tokens: int,
+    call: Callable[[float], T],
+) -> T:
+    """
+    Runs `call(timeout_seconds)` behind the rate limiters and the model's
+    circuit breaker, retrying retryable errors with jittered backoff until
+    the agent's deadline. `call` receives the time left for that attempt.
+    """
+    policy = get_policy(agent)
+    breaker = breaker_for(model)
+    deadline = time.monotonic() + policy.timeout_seconds
+    attempt = 0
+
+    while True:
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            LLM_CALLS.inc(agent=agent, outcome="circuit_open")
+            raise
+
+        try:
+            waited = 0.0
+            bucket = _agent_bucket(agent, policy)
+            if bucket:
+                waited += bucket.acquire(1, deadline)
+            waited += _global_requests.acquire(1, deadline)
+            waited += _global_tokens.acquire(estimated_tokens, deadline)
+            LLM_RATE_LIMIT_WAIT.observe(waited, agent=agent)
+        except DeadlineExceededError:
+            breaker.cancel()
+            LLM_CALLS.inc(agent=agent, outcome="deadline")
+            raise
+
+        remaining = deadline - time.monotonic()
+        started = time.monotonic()
+        try:
+            result = call(remaining)
+        except Exception as exc:
+            LLM_CALL_LATENCY.observe(time.monotonic() - started, agent=agent)
+            retryable = is_retryable(exc)
+            breaker.record(ok=not retryable)
+
+            delay = backoff_delay(policy, attempt)
+            if (
+                not retryable
+                or attempt >= policy.max_retries
+                or time.monotonic() + delay >= deadline
+            ):
+                LLM_CALLS.inc(agent=agent, outcome="error")
+                raise
+
+            LLM_RETRIES.inc(agent=agent)
+            attempt += 1
+            time.sleep(delay)
+            continue
+
+        LLM_CALL_LATENCY.observe(time.monotonic() - started, agent=agent)
+        breaker.record(ok=True)
+        LLM_CALLS.inc(agent=agent, outcome="ok")
+        return result
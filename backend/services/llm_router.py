@@ -0,0 +1,142 @@
+# services/llm_router.py
+
+import random
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from core.config import LITELLM_API_BASE, LLM_ROUTE_PROBE_RATIO, LLM_ROUTES
+from services.llm_hedging import latency_slo
+from services.llm_resilience import LLMUnavailableError, is_retryable
+from services.metrics import Counter, RollingWindow
+
+# -----------------------------------------------------------------------------
+# Routing table
+# -----------------------------------------------------------------------------
+
+LITELLM_PREFIX = "litellm:"
+
+ROUTE_DECISIONS = Counter(
+    "llm_route_decisions_total",
+    "Model chosen per call and why (primary, primary_probe, latency_fallback, error_fallback, explicit)",
+    ["agent", "model", "reason"],
+)
+
+
+@dataclass(frozen=True)
+class ModelTarget:
+    provider: str  # "gemini" | "litellm"
+    model: str
+    api_base: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return self.model if self.provider == "gemini" else f"{LITELLM_PREFIX}{self.model}"
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    agent: str
+    target: ModelTarget
+    reason: str
+    fallback: Optional[ModelTarget] = None
+
+
+def parse_target(spec) -> Optional[ModelTarget]:
+    """
+    "gemini-2.5-flash"                -> Gemini
+    "litellm:openai/qwen2.5"          -> LiteLLM at LITELLM_API_BASE
+    {"model": "litellm:...", "api_base": "http://..."}
+    """
+    if not spec:
+        return None
+    api_base = None
+    if isinstance(spec, dict):
+        api_base = spec.get("api_base")
+        spec = spec["model"]
+    if spec.startswith(LITELLM_PREFIX):
+        return ModelTarget("litellm", spec[len(LITELLM_PREFIX):], api_base or LITELLM_API_BASE)
+    return ModelTarget("gemini", spec)
+
+
+def route_for(agent: str) -> Dict[str, Optional[ModelTarget]]:
+    route = {**LLM_ROUTES["default"], **LLM_ROUTES.get(agent, {})}
+    primary = parse_target(route.get("primary"))
+    fallback = parse_target(route.get("fallback"))
+    if fallback == primary:
+        fallback = None
+    return {"primary": primary, "fallback": fallback}
+
+
+# -----------------------------------------------------------------------------
+# Rolling latency per (agent, model)
+# -----------------------------------------------------------------------------
+
+MIN_SAMPLES = 20
+
+_windows: Dict[str, RollingWindow] = {}
+_windows_lock = threading.Lock()
+
+
+def model_latency_window(agent: str, target: ModelTarget) -> RollingWindow:
+    key = f"{agent}|{target.key}"
+    with _windows_lock:
+        window = _windows.get(key)
+        if window is None:
+            window = _windows[key] = RollingWindow()
+        return window
+
+
+def record_model_latency(agent: str, target: ModelTarget, seconds: float) -> None:
+    model_latency_window(agent, target).observe(seconds)
+
+
+def primary_p95(agent: str) -> Optional[float]:
+    primary = route_for(agent)["primary"]
+    window = model_latency_window(agent, primary)
+    if len(window) < MIN_SAMPLES:
+        return None
+    return window.percentile(95)
+
+
+# -----------------------------------------------------------------------------
+# Decisions
+# -----------------------------------------------------------------------------
+
+
+def choose_route(agent: str, model: Optional[str] = None) -> RouteDecision:
+    """
+    Picks the model for a call. An explicit `model` bypasses the table.
+    """
+    if model is not None:
+        decision = RouteDecision(agent, parse_target(model), "explicit")
+    else:
+        route = route_for(agent)
+        primary, fallback = route["primary"], route["fallback"]
+        p95 = primary_p95(agent)
+
+        if fallback is None or p95 is None or p95 <= latency_slo(agent):
+            decision = RouteDecision(agent, primary, "primary", fallback)
+        elif random.random() < LLM_ROUTE_PROBE_RATIO:
+            decision = RouteDecision(agent, primary, "primary_probe", fallback)
+        else:
+            # The primary is too slow for this agent; the fallback becomes
+            # the only candidate for this call.
+            decision = RouteDecision(agent, fallback, "latency_fallback")
+
+    ROUTE_DECISIONS.inc(agent=agent, model=decision.target.key, reason=decision.reason)
+    return decision
+
+
+def fallback_decision(decision: RouteDecision, exc: Exception) -> Optional[RouteDecision]:
+    """
+    The decision to retry a failed call on the fallback model, if any.
+    """
+    if decision.fallback is None:
+        return None
+    if not (isinstance(exc, LLMUnavailableError) or is_retryable(exc)):
+        return None
+
+    fallback = RouteDecision(decision.agent, decision.fallback, "error_fallback")
+    ROUTE_DECISIONS.inc(agent=decision.agent, model=fallback.target.key, reason=fallback.reason)
+    return fallback
@@ -0,0 +1,581 @@
+# services/metrics.py
+
+import atexit
+import fcntl
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from core.config import METRICS_FLUSH_SECONDS, METRICS_MULTIPROC_DIR
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# In-process metrics
+# -----------------------------------------------------------------------------
+#
+# Minimal counters / gauges / histograms keyed by label values. Every metric
+# registers itself in REGISTRY so it can be inspected or exported.
+#
+# Updates take no lock: each thread writes to its own shard (a plain dict
+# only that thread mutates) and readers sum the shards. Copying a dict is
+# atomic under the GIL, so a reader sees each shard at a consistent point;
+# a histogram row may be read between its bucket and sum updates.
+
+LabelValues = Tuple[str, ...]
+
+REGISTRY: List["_Metric"] = []
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        # Guards shard registration and Gauge.set, never inc / observe
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, Any]] = []
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple([str(labels.get(name, "")) for name in self.labelnames])
+
+    def _shard(self) -> Dict[LabelValues, Any]:
+        """
+        The calling thread's shard, created on its first update.
+        """
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        key = self._key(labels)
+        return sum(shard.get(key, 0.0) for shard in list(self._shards))
+
+    def samples(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in list(self._shards):
+            for key, value in dict(shard).items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+class Gauge(Counter):
+    """
+    `aggregate` says how values from several processes combine (see
+    Aggregation below): "sum" for things like in-flight requests, "max"
+    for values every process sets to the same reading (queue depths,
+    circuit states). Use either set() or inc()/dec() for a given gauge:
+    set() discards increments racing with it from other threads.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        aggregate: str = "sum",
+    ):
+        super().__init__(name, description, labelnames)
+        self.aggregate = aggregate
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        own = self._shard()
+        with self._lock:
+            for shard in self._shards:
+                shard.pop(key, None)
+            own[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        # key -> [bucket counts..., +Inf count, sum]
+        shard = self._shard()
+        key = self._key(labels)
+        row = shard.get(key)
+        if row is None:
+            row = shard[key] = [0.0] * (len(self.buckets) + 2)
+        # First bucket with value <= bound; past the last one is +Inf
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def samples(self) -> Dict[LabelValues, List[float]]:
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in list(self._shards):
+            for key, row in dict(shard).items():
+                row = list(row)
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = row
+                else:
+                    for i, value in enumerate(row):
+                        total[i] += value
+        return totals
+
+
+def ratio(numerator: Counter, denominator: Counter, **labels: str) -> Optional[float]:
+    """
+    numerator / denominator for the given labels, or None when there is no data.
+    """
+    total = denominator.get(**labels)
+    if not total:
+        return None
+    return numerator.get(**labels) / total
+
+
+class RollingWindow:
+    """
+    The last `size` observations, for rolling percentiles (e.g. per-agent
+    latency) that plain histograms cannot answer once they are cumulative.
+    """
+
+    def __init__(self, size: int = 512):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Nearest-rank percentile, p in [0, 100]. None when empty.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, min(len(samples), math.ceil(p / 100.0 * len(samples))))
+        return samples[rank - 1]
+
+    def mean(self) -> Optional[float]:
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return None
+        return sum(samples) / len(samples)
+
+
+# -----------------------------------------------------------------------------
+# Collection
+# -----------------------------------------------------------------------------
+#
+# collect() snapshots every metric as plain data ("families"), after running
+# the on_collect callbacks that refresh sampled gauges (e.g. pool usage).
+# Cache hit ratios are derived at render time from the registered counters,
+# so with several processes they are ratios of the summed counts.
+
+Family = Dict[str, Any]
+
+_COLLECT_CALLBACKS: List[Callable[[], None]] = []
+# (cache name, counter, label holding the result, results that are hits)
+_HIT_RATIOS: List[Tuple[str, Counter, str, Tuple[str, ...]]] = []
+
+
+def on_collect(callback: Callable[[], None]) -> None:
+    _COLLECT_CALLBACKS.append(callback)
+
+
+def hit_ratio(cache: str, counter: Counter, hits: Sequence[str], label: str = "result") -> None:
+    """
+    Exports cache_hit_ratio{cache=...}: the share of `counter` whose
+    `label` is one of `hits`.
+    """
+    _HIT_RATIOS.append((cache, counter, label, tuple(hits)))
+
+
+def collect() -> Dict[str, Family]:
+    for callback in _COLLECT_CALLBACKS:
+        try:
+            callback()
+        except Exception:
+            logger.exception("metrics: collect callback failed")
+
+    families: Dict[str, Family] = {}
+    for metric in REGISTRY:
+        family = families.setdefault(metric.name, {
+            "kind": metric.kind,
+            "description": metric.description,
+            "labelnames": list(metric.labelnames),
+            "samples": {},
+        })
+        if isinstance(metric, Gauge):
+            family["aggregate"] = metric.aggregate
+        if isinstance(metric, Histogram):
+            family["buckets"] = list(metric.buckets)
+        family["samples"].update(metric.samples())
+    return families
+
+
+# -----------------------------------------------------------------------------
+# Aggregation
+# -----------------------------------------------------------------------------
+#
+# With several uvicorn workers (or `python -m worker` next to the API),
+# each process has its own REGISTRY. When METRICS_MULTIPROC_DIR is set,
+# every process writes its snapshot to <dir>/<pid>-<token>.json every
+# METRICS_FLUSH_SECONDS and at exit; the random token keeps a restarted
+# process that reuses a PID from overwriting its predecessor's totals.
+# /metrics merges all snapshots: counters and histograms are summed over
+# every file, gauges only over live processes.
+#
+# A snapshot is dead once its process is gone or it has not been rewritten
+# for STALE_FLUSHES flush intervals. Flushers periodically fold dead
+# snapshots' counters and histograms into <dir>/archive.json and delete
+# them, so totals never go backwards and the directory stays bounded. The
+# archive lists the files it has folded; a file that is still on disk after
+# a crash mid-compaction is skipped rather than counted twice.
+
+STALE_FLUSHES = 6
+COMPACT_EVERY_FLUSHES = 12
+_ARCHIVE = "archive.json"
+_LOCK = ".lock"
+
+_token: Optional[Tuple[int, str]] = None
+
+
+def _snapshot_path(directory: str) -> str:
+    global _token
+    # Recomputed after a fork, so children never share their parent's file
+    if _token is None or _token[0] != os.getpid():
+        _token = (os.getpid(), uuid.uuid4().hex[:12])
+    return os.path.join(directory, f"{_token[0]}-{_token[1]}.json")
+
+
+def _encode(families: Dict[str, Family]) -> Dict[str, Any]:
+    return {
+        name: {**family, "samples": [[list(k), v] for k, v in family["samples"].items()]}
+        for name, family in families.items()
+    }
+
+
+def _decode(data: Dict[str, Any]) -> Dict[str, Family]:
+    for family in data.values():
+        family["samples"] = {tuple(k): v for k, v in family["samples"]}
+    return data
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+# What this process last wrote, and what an earlier file of this process
+# (already folded into the archive) accounted for
+_last_written: Dict[str, Family] = {}
+_baseline: Dict[str, Family] = {}
+_snapshot_lock = threading.Lock()
+
+
+def _subtract(families: Dict[str, Family], baseline: Dict[str, Family]) -> Dict[str, Family]:
+    out = {}
+    for name, family in families.items():
+        base = baseline.get(name)
+        if base is None or family["kind"] == "gauge":
+            out[name] = family
+            continue
+        samples = {}
+        for key, value in family["samples"].items():
+            old = base["samples"].get(key)
+            if old is None:
+                samples[key] = value
+            elif family["kind"] == "histogram":
+                samples[key] = [a - b for a, b in zip(value, old)]
+            else:
+                samples[key] = value - old
+        out[name] = {**family, "samples": samples}
+    return out
+
+
+def write_snapshot(directory: str = METRICS_MULTIPROC_DIR) -> None:
+    global _token, _last_written, _baseline
+    with _snapshot_lock:
+        path = _snapshot_path(directory)
+        if _last_written and not os.path.exists(path):
+            # Folded while this process was stalled: continue in a new file
+            # with only what the archive does not have yet
+            _baseline = merge([(False, _baseline), (False, _last_written)])
+            _token = None
+            path = _snapshot_path(directory)
+        families = _subtract(collect(), _baseline)
+        _write_json(path, _encode(families))
+        _last_written = families
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_archive(directory: str) -> Tuple[set, Dict[str, Family]]:
+    try:
+        with open(os.path.join(directory, _ARCHIVE)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return set(), {}
+    return set(data["folded"]), _decode(data["families"])
+
+
+def _read_snapshots(directory: str, folded: set) -> List[Tuple[str, bool, Dict[str, Family]]]:
+    """
+    (filename, live, families) for every process snapshot not yet folded.
+    """
+    stale_before = time.time() - STALE_FLUSHES * METRICS_FLUSH_SECONDS
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json") or filename == _ARCHIVE or filename in folded:
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            pid = int(filename.split("-", 1)[0])
+            fresh = os.path.getmtime(path) >= stale_before
+            with open(path) as f:
+                data = json.load(f)
+        except (ValueError, OSError):
+            continue
+        snapshots.append((filename, fresh and _pid_alive(pid), _decode(data)))
+    return snapshots
+
+
+def merge(snapshots: List[Tuple[bool, Dict[str, Family]]]) -> Dict[str, Family]:
+    """
+    Merges (live, families) snapshots; gauges only come from live ones.
+    """
+    merged: Dict[str, Family] = {}
+    for live, families in snapshots:
+        for name, family in families.items():
+            if family["kind"] == "gauge" and not live:
+                continue
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {**family, "samples": {}}
+            elif target["kind"] != family["kind"]:
+                continue
+
+            if family["kind"] == "gauge":
+                combine = max if family.get("aggregate") == "max" else (lambda a, b: a + b)
+                for key, value in family["samples"].items():
+                    target["samples"][key] = (
+                        combine(target["samples"][key], value) if key in target["samples"] else value
+                    )
+            elif family["kind"] == "histogram":
+                for key, row in family["samples"].items():
+                    total = target["samples"].get(key)
+                    if total is None or len(total) != len(row):
+                        target["samples"][key] = list(row)
+                    else:
+                        target["samples"][key] = [a + b for a, b in zip(total, row)]
+            else:
+                for key, value in family["samples"].items():
+                    target["samples"][key] = target["samples"].get(key, 0.0) + value
+    return merged
+
+
+def read_merged(directory: str = METRICS_MULTIPROC_DIR) -> Dict[str, Family]:
+    folded, archive = _read_archive(directory)
+    snapshots = _read_snapshots(directory, folded)
+    return merge([(False, archive)] + [(live, families) for _, live, families in snapshots])
+
+
+def compact(directory: str = METRICS_MULTIPROC_DIR) -> int:
+    """
+    Folds dead snapshots into the archive and deletes them. Returns how
+    many were folded.
+    """
+    with open(os.path.join(directory, _LOCK), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            folded, archive = _read_archive(directory)
+            present = set(os.listdir(directory))
+            dead = [
+                (filename, families)
+                for filename, live, families in _read_snapshots(directory, folded)
+                if not live
+            ]
+            # Forget folded files that are gone, so the list stays short
+            folded &= present
+            if dead:
+                archive = merge([(False, archive)] + [(False, families) for _, families in dead])
+                folded |= {filename for filename, _ in dead}
+            _write_json(
+                os.path.join(directory, _ARCHIVE),
+                {"folded": sorted(folded), "families": _encode(archive)},
+            )
+            for filename in folded:
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    pass
+            # Temp files left by a process killed mid-write
+            stale_before = time.time() - STALE_FLUSHES * METRICS_FLUSH_SECONDS
+            for filename in present:
+                path = os.path.join(directory, filename)
+                if filename.endswith(".tmp") and os.path.getmtime(path) < stale_before:
+                    os.remove(path)
+            return len(dead)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+_flusher: Optional[threading.Thread] = None
+
+
+def start_flusher() -> None:
+    """
+    Periodically writes this process's snapshot when METRICS_MULTIPROC_DIR
+    is set. Safe to call more than once.
+    """
+    global _flusher
+    if not METRICS_MULTIPROC_DIR or _flusher is not None:
+        return
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+
+    def run() -> None:
+        flushes = 0
+        while True:
+            try:
+                write_snapshot()
+                flushes += 1
+                if flushes % COMPACT_EVERY_FLUSHES == 0:
+                    compact()
+            except Exception:
+                logger.exception("metrics: writing snapshot failed")
+            time.sleep(METRICS_FLUSH_SECONDS)
+
+    _flusher = threading.Thread(target=run, name="metrics-flusher", daemon=True)
+    _flusher.start()
+    atexit.register(write_snapshot)
+
+
+# -----------------------------------------------------------------------------
+# Exposition
+# -----------------------------------------------------------------------------
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _hit_ratio_family(families: Dict[str, Family]) -> Family:
+    samples: Dict[LabelValues, float] = {}
+    for cache, counter, label, hits in _HIT_RATIOS:
+        family = families.get(counter.name)
+        if family is None or label not in family["labelnames"]:
+            continue
+        index = family["labelnames"].index(label)
+        total = sum(family["samples"].values())
+        if total:
+            hit = sum(v for k, v in family["samples"].items() if k[index] in hits)
+            samples[(cache,)] = hit / total
+    return {
+        "kind": "gauge",
+        "description": "Share of cache lookups that were hits",
+        "labelnames": ["cache"],
+        "samples": samples,
+    }
+
+
+def render(families: Dict[str, Family]) -> str:
+    """
+    Prometheus text exposition format (version 0.0.4).
+    """
+    families = {**families, "cache_hit_ratio": _hit_ratio_family(families)}
+    lines: List[str] = []
+    for name in sorted(families):
+        family = families[name]
+        names = family["labelnames"]
+        lines.append(f"# HELP {name} {_escape(family['description'])}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        for key in sorted(family["samples"]):
+            value = family["samples"][key]
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                continue
+            cumulative = 0.0
+            for bound, count in [*zip(family["buckets"], value), (math.inf, value[-2])]:
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(names, key)} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_latest() -> str:
+    """
+    This process's metrics, merged with every other process's snapshot
+    when METRICS_MULTIPROC_DIR is set.
+    """
+    if not METRICS_MULTIPROC_DIR:
+        return render(collect())
+    write_snapshot()
+    return render(read_merged())
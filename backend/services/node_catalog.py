@@ -0,0 +1,114 @@
+# services/node_catalog.py
+
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session
+
+from models import NodeCatalog
+from services.metrics import Counter, hit_ratio
+
+# -----------------------------------------------------------------------------
+# Content-addressed node catalog
+# -----------------------------------------------------------------------------
+#
+# Path nodes only reference their text. Identical nodes across paths (the
+# same curriculum step generated for thousands of learners) share one
+# NodeCatalog row, so the text is stored and cached once.
+
+NODE_CATALOG_LOOKUPS = Counter(
+    "node_catalog_lookups_total",
+    "Catalog entries resolved by result (existing, created)",
+    ["result"],
+)
+hit_ratio("node_catalog", NODE_CATALOG_LOOKUPS, ["existing"])
+
+
+def node_content(node: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The stored content of a model-generated node (DAG or remedial).
+    """
+    return {
+        "title": node["title"],
+        "description": node["description"],
+        "node_type": node.get("node_type") or "concept",
+        "estimated_minutes": node.get("estimated_minutes"),
+        "metadata_json": {"tags": node.get("tags", [])},
+    }
+
+
+def content_hash(content: Dict[str, Any]) -> str:
+    """
+    SHA-256 over the canonical JSON of a node_content() dict. Keep in sync
+    with the backfill in the add_node_catalog migration.
+    """
+    canonical = json.dumps(
+        [
+            content["title"],
+            content["description"],
+            content["node_type"],
+            content["estimated_minutes"],
+            content["metadata_json"],
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _insert_missing(db: Session, rows: List[Dict[str, Any]]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        # Concurrent requests may create the same entry; the loser's
+        # insert is a no-op and the re-select below picks up the winner.
+        db.execute(
+            insert(NodeCatalog)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["content_hash"])
+        )
+    else:
+        db.add_all([NodeCatalog(**row) for row in rows])
+        db.flush()
+
+
+def catalog_entries(db: Session, nodes: List[Dict[str, Any]]) -> List[NodeCatalog]:
+    """
+    Catalog entries for `nodes` (model-generated node dicts), in order,
+    creating the missing ones. At most one SELECT, one INSERT and one
+    re-SELECT per call regardless of batch size.
+    """
+    contents = [node_content(node) for node in nodes]
+    hashes = [content_hash(c) for c in contents]
+    if not hashes:
+        return []
+
+    unique = set(hashes)
+    found = {
+        entry.content_hash: entry
+        for entry in db.query(NodeCatalog).filter(NodeCatalog.content_hash.in_(unique))
+    }
+    NODE_CATALOG_LOOKUPS.inc(len(found), result="existing")
+
+    missing = {}
+    for h, content in zip(hashes, contents):
+        if h not in found and h not in missing:
+            missing[h] = {"content_hash": h, **content}
+
+    if missing:
+        _insert_missing(db, list(missing.values()))
+        found.update({
+            entry.content_hash: entry
+            for entry in db.query(NodeCatalog).filter(NodeCatalog.content_hash.in_(missing))
+        })
+        NODE_CATALOG_LOOKUPS.inc(len(missing), result="created")
+
+    return [found[h] for h in hashes]
@@ -0,0 +1,144 @@
+# services/path_changes.py
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from core.config import PATH_CHANGE_LOG_RETENTION
+from models import LearningPath, NodeCatalog, NodeProgress, PathChange
+from services.events import emit
+from services.metrics import Counter
+
+# -----------------------------------------------------------------------------
+# Path change log
+# -----------------------------------------------------------------------------
+#
+# Every change a client can see (graph surgery, new edges, progress) bumps
+# LearningPath.version by one and records one PathChange with that version,
+# so versions in the log are contiguous. A client that knows version N asks
+# for the changes after N and applies them in order; if the log has been
+# compacted past N it gets a full snapshot instead. The same entry is pushed
+# to the owner's event stream once the transaction commits.
+
+PATH_CHANGES = Counter(
+    "path_changes_total",
+    "Path change log entries by change type",
+    ["change_type"],
+)
+
+PATH_SYNCS = Counter(
+    "path_syncs_total",
+    "Change log reads by result (up_to_date, delta, snapshot)",
+    ["result"],
+)
+
+
+def bump_version(db: Session, path_id: int) -> int:
+    """
+    Increments and returns the path's version, row-locking the path until
+    commit.
+    """
+    return db.execute(
+        update(LearningPath)
+        .where(LearningPath.id == path_id)
+        .values(version=LearningPath.version + 1)
+        .returning(LearningPath.version)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+
+def record_change(
+    db: Session,
+    path_id: int,
+    change_type: str,
+    payload: Dict[str, Any],
+    version: Optional[int] = None,
+) -> int:
+    """
+    Logs a change as `version` (already bumped by the caller, e.g. by
+    graph_mutations.lock_path) or as a freshly bumped version, and queues
+    it for the owner's event stream. Returns the version. Does not commit.
+    """
+    if version is None:
+        version = bump_version(db, path_id)
+
+    db.execute(
+        insert(PathChange).values(
+            path_id=path_id,
+            version=version,
+            change_type=change_type,
+            payload=payload,
+        )
+    )
+    db.execute(
+        delete(PathChange)
+        .where(
+            PathChange.path_id == path_id,
+            PathChange.version <= version - PATH_CHANGE_LOG_RETENTION,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    owner_id = db.execute(
+        select(LearningPath.user_id).where(LearningPath.id == path_id)
+    ).scalar_one()
+    emit(db, owner_id, {
+        "type": "path_change",
+        "path_id": path_id,
+        "version": version,
+        "change_type": change_type,
+        "payload": payload,
+    })
+    PATH_CHANGES.inc(change_type=change_type)
+    return version
+
+
+def node_payload(db: Session, node_id: int, catalog_id: int) -> Dict[str, Any]:
+    """
+    A node as it appears in the path response (PathNodeSchema fields).
+    """
+    entry = db.get(NodeCatalog, catalog_id)
+    return {
+        "id": node_id,
+        "title": entry.title,
+        "description": entry.description,
+        "node_type": entry.node_type,
+        "estimated_minutes": entry.estimated_minutes,
+        "metadata_json": entry.metadata_json,
+    }
+
+
+def progress_payload(np: NodeProgress) -> Dict[str, Any]:
+    return {
+        "node_id": np.node_id,
+        "status": np.status,
+        "last_score": np.last_score,
+        "attempts_count": np.attempts_count,
+    }
+
+
+def changes_since(db: Session, path_id: int, since: int, version: int) -> Optional[List[PathChange]]:
+    """
+    The changes after `since` up to the current `version`, in order, or
+    None when the log cannot bridge the gap (compacted, or `since` is not
+    a version this path had) and the client needs a snapshot.
+    """
+    if since == version:
+        PATH_SYNCS.inc(result="up_to_date")
+        return []
+    if since < 0 or since > version:
+        PATH_SYNCS.inc(result="snapshot")
+        return None
+
+    changes = db.execute(
+        select(PathChange)
+        .where(PathChange.path_id == path_id, PathChange.version > since)
+        .order_by(PathChange.version)
+    ).scalars().all()
+
+    if len(changes) != version - since or changes[0].version != since + 1:
+        PATH_SYNCS.inc(result="snapshot")
+        return None
+
+    PATH_SYNCS.inc(result="delta")
+    return changes
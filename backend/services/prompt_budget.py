@@ -0,0 +1,62 @@
+# services/prompt_budget.py
+
+import json
+import re
+from typing import Any, Dict, List, Sequence
+
+from services.llm_client import estimate_tokens, truncate_to_tokens
+
+# -----------------------------------------------------------------------------
+# Prompt compaction helpers
+# -----------------------------------------------------------------------------
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def compact_json(obj: Any) -> str:
+    """
+    JSON without indentation or padding; ~30-40% fewer tokens than indent=2.
+    """
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def rank_sections(query: str, sections: Sequence[Dict[str, Any]], key: str = "content") -> List[Dict[str, Any]]:
+    """
+    Orders sections by how many of the query's words they mention.
+    Ties keep their original (search-ranked) order.
+    """
+    terms = set(_WORD_RE.findall(query.lower()))
+    if not terms:
+        return list(sections)
+
+    def score(item: Dict[str, Any]) -> int:
+        words = set(_WORD_RE.findall((item.get(key) or "").lower()))
+        return len(terms & words)
+
+    return sorted(sections, key=score, reverse=True)
+
+
+def fit_sections(
+    sections: Sequence[Dict[str, Any]],
+    budget_tokens: int,
+    key: str = "content",
+) -> List[Dict[str, Any]]:
+    """
+    Shares `budget_tokens` across sections in order, truncating each to a
+    fair share of what is left. Short sections hand their unused share on
+    to the ones after them; sections that no longer fit are dropped.
+    """
+    fitted = []
+    remaining = max(budget_tokens, 0)
+
+    for i, item in enumerate(sections):
+        if remaining <= 0:
+            break
+        share = remaining // (len(sections) - i)
+        content = item.get(key) or ""
+        if estimate_tokens(content) > share:
+            content = truncate_to_tokens(content, share)
+        remaining -= estimate_tokens(content)
+        fitted.append({**item, key: content})
+
+    return fitted
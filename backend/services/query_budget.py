@@ -0,0 +1,207 @@
+# services/query_budget.py
+
+import contextvars
+import logging
+import re
+import threading
+from collections import Counter as Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import N_PLUS_ONE_THRESHOLD
+from services.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per request, by route template",
+    ["route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+N_PLUS_ONE_WARNINGS = Counter(
+    "db_repeated_query_warnings_total",
+    "Requests where one statement shape ran more than N_PLUS_ONE_THRESHOLD times",
+    ["route"],
+)
+
+# -----------------------------------------------------------------------------
+# Statement shapes
+# -----------------------------------------------------------------------------
+#
+# ORM statements are already parameterized, so a lazy load in a loop
+# (`for lp in paths: lp.nodes`) repeats the exact same text. Expanded IN
+# lists and inline literals are folded so that they count as one shape too.
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+_IN_LIST = re.compile(r"\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")*\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def statement_shape(statement: str) -> str:
+    shape = " ".join(statement.split())
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _IN_LIST.sub("(?)", shape)
+
+
+# -----------------------------------------------------------------------------
+# Query counter
+# -----------------------------------------------------------------------------
+
+
+class QueryCounter:
+    """
+    Statements executed while the counter is active, by shape. An
+    executemany counts once.
+    """
+
+    def __init__(self, route: Optional[str] = None):
+        self.route = route
+        self.shapes: Tally = Tally()
+        self._lock = threading.Lock()
+
+    def add(self, statement: str) -> None:
+        shape = statement_shape(statement)
+        # Handlers run in the threadpool; the event loop may query too
+        with self._lock:
+            self.shapes[shape] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.shapes.values())
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Shapes that ran more than `threshold` times, most frequent first.
+        """
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def report(self, limit: int = 5) -> str:
+        lines = [f"{self.total} queries ({self.route or 'outside a request'})"]
+        lines.extend(f"  {count:4d}x {shape[:200]}" for shape, count in self.shapes.most_common(limit))
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[Optional[QueryCounter]] = contextvars.ContextVar(
+    "query_counter", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.add(statement)
+
+
+@contextmanager
+def counting(route: Optional[str] = None) -> Iterator[QueryCounter]:
+    """
+    Counts the statements run in this context (and in threadpool calls made
+    from it) while the block runs.
+    """
+    counter = QueryCounter(route)
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+#
+# Counts each request's statements. A shape that runs more than
+# N_PLUS_ONE_THRESHOLD times in one request is almost always a lazy load or
+# a per-row query in a loop: it is logged with the route and the statement,
+# once per shape. Finished requests are also handed to any observers
+# (query_budget below).
+
+_observers: List[Callable[[QueryCounter], None]] = []
+
+
+class QueryCountMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with counting() as counter:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                # Set by the router once a route matched
+                counter.route = getattr(scope.get("route"), "path", "unmatched")
+                _finish(scope["method"], counter)
+
+
+def _finish(method: str, counter: QueryCounter) -> None:
+    DB_QUERIES_PER_REQUEST.observe(counter.total, route=counter.route)
+
+    repeated = counter.repeated(N_PLUS_ONE_THRESHOLD)
+    if repeated:
+        N_PLUS_ONE_WARNINGS.inc(route=counter.route)
+    for shape, count in repeated:
+        logger.warning(
+            "possible N+1: %s %s ran one statement %d times: %s",
+            method, counter.route, count, shape[:500],
+        )
+
+    for observer in list(_observers):
+        observer(counter)
+
+
+# -----------------------------------------------------------------------------
+# Query budgets (tests)
+# -----------------------------------------------------------------------------
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(
+    budget: Union[int, Dict[str, int]],
+    max_repeats: Optional[int] = None,
+) -> Iterator[List[QueryCounter]]:
+    """
+    Fails if a request served while the block runs goes over its query
+    budget:
+
+        with query_budget({"/api/paths": 3, "/api/paths/{path_id}": 4}):
+            client.get("/api/paths", headers=auth)
+            client.get(f"/api/paths/{path_id}", headers=auth)
+
+    `budget` is either a limit for every request or limits by route
+    template (routes not listed are not checked). With `max_repeats`, no
+    statement shape may run more than that many times per request. Needs
+    QueryCountMiddleware on the app; works with TestClient, whose requests
+    run in another thread. Yields the counters of the requests seen.
+    """
+    seen: List[QueryCounter] = []
+    observe = seen.append
+    _observers.append(observe)
+    try:
+        yield seen
+    finally:
+        _observers.remove(observe)
+
+    failures = []
+    for counter in seen:
+        limit = budget if isinstance(budget, int) else budget.get(counter.route)
+        if limit is not None and counter.total > limit:
+            failures.append(f"over budget ({limit}): {counter.report()}")
+        elif max_repeats is not None and counter.repeated(max_repeats):
+            failures.append(f"a statement ran more than {max_repeats}x: {counter.report()}")
+    if failures:
+        raise QueryBudgetExceeded("\n".join(failures))
@@ -0,0 +1,145 @@
+# services/reachability.py
+
+from typing import List
+
+from sqlalchemy import delete, exists, insert, literal, select, true, union
+from sqlalchemy.orm import Session, aliased
+
+from models import PathReachability
+from graph.dag import CSRDag
+from services.metrics import Counter
+
+# -----------------------------------------------------------------------------
+# Reachability index
+# -----------------------------------------------------------------------------
+#
+# PathReachability stores each path's transitive closure. It is computed in
+# full once, when the path is persisted; the graph mutations then update it
+# with set-based statements that only touch the affected pairs. Reads are a
+# single lookup on (ancestor_id) or (descendant_id).
+
+REACHABILITY_UPDATES = Counter(
+    "reachability_updates_total",
+    "Reachability index updates by operation (index_path, insert_before, add_edge)",
+    ["operation"],
+)
+
+INSERT_CHUNK = 5000
+
+
+def index_path(db: Session, path_id: int) -> int:
+    """
+    (Re)computes a path's closure from its edges; returns the number of
+    pairs. Does not commit. Raises graph.dag.CycleError.
+    """
+    pairs = CSRDag.from_db(db, path_id).closure()
+
+    db.execute(
+        delete(PathReachability)
+        .where(PathReachability.path_id == path_id)
+        .execution_options(synchronize_session=False)
+    )
+    for start in range(0, len(pairs), INSERT_CHUNK):
+        db.execute(
+            insert(PathReachability),
+            [
+                {"path_id": path_id, "ancestor_id": a, "descendant_id": d}
+                for a, d in pairs[start:start + INSERT_CHUNK]
+            ],
+        )
+
+    REACHABILITY_UPDATES.inc(operation="index_path")
+    return len(pairs)
+
+
+def on_insert_before(db: Session, path_id: int, node_id: int, target_id: int) -> None:
+    """
+    `node_id` was spliced in as the only prerequisite of `target_id`. Every
+    existing pair survives (paths into the target now pass through the new
+    node); the new node inherits the target's ancestors and gains the
+    target and its descendants.
+    """
+    db.execute(
+        insert(PathReachability).from_select(
+            ["path_id", "ancestor_id", "descendant_id"],
+            select(literal(path_id), PathReachability.ancestor_id, literal(node_id))
+            .where(PathReachability.descendant_id == target_id),
+        )
+    )
+    db.execute(
+        insert(PathReachability).from_select(
+            ["path_id", "ancestor_id", "descendant_id"],
+            union(
+                select(literal(path_id), literal(node_id), literal(target_id)),
+                select(literal(path_id), literal(node_id), PathReachability.descendant_id)
+                .where(PathReachability.ancestor_id == target_id),
+            ),
+        )
+    )
+    REACHABILITY_UPDATES.inc(operation="insert_before")
+
+
+def on_add_edge(db: Session, path_id: int, from_node_id: int, to_node_id: int) -> None:
+    """
+    New edge from -> to: every ancestor of `from` (and `from` itself)
+    now reaches `to` and its descendants. Pairs already present are
+    skipped.
+    """
+    up = union(
+        select(literal(from_node_id).label("node_id")),
+        select(PathReachability.ancestor_id).where(PathReachability.descendant_id == from_node_id),
+    ).subquery()
+    down = union(
+        select(literal(to_node_id).label("node_id")),
+        select(PathReachability.descendant_id).where(PathReachability.ancestor_id == to_node_id),
+    ).subquery()
+
+    existing = aliased(PathReachability)
+    db.execute(
+        insert(PathReachability).from_select(
+            ["path_id", "ancestor_id", "descendant_id"],
+            select(literal(path_id), up.c.node_id, down.c.node_id)
+            .select_from(up.join(down, true()))
+            .where(
+                ~exists().where(
+                    existing.ancestor_id == up.c.node_id,
+                    existing.descendant_id == down.c.node_id,
+                )
+            ),
+        )
+    )
+    REACHABILITY_UPDATES.inc(operation="add_edge")
+
+
+# -----------------------------------------------------------------------------
+# Queries
+# -----------------------------------------------------------------------------
+
+
+def ancestors(db: Session, node_id: int) -> List[int]:
+    """
+    Everything `node_id` ultimately depends on.
+    """
+    return db.execute(
+        select(PathReachability.ancestor_id).where(PathReachability.descendant_id == node_id)
+    ).scalars().all()
+
+
+def descendants(db: Session, node_id: int) -> List[int]:
+    """
+    Everything downstream of `node_id`.
+    """
+    return db.execute(
+        select(PathReachability.descendant_id).where(PathReachability.ancestor_id == node_id)
+    ).scalars().all()
+
+
+def reaches(db: Session, source_id: int, target_id: int) -> bool:
+    return db.execute(
+        select(literal(True)).where(
+            exists().where(
+                PathReachability.ancestor_id == source_id,
+                PathReachability.descendant_id == target_id,
+            )
+        )
+    ).scalar() is not None
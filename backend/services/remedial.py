@@ -0,0 +1,273 @@
+# services/remedial.py
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from core.config import REMEDIAL_PENDING_TIMEOUT_SECONDS
+from db import SessionLocal
+from models import (
+    LearningPath, PathNode, NodeProgress, NodeProgressStatus, PathChangeType,
+    RemedialDraft, RemedialStatus,
+)
+from agents.dag_builder_agent import run_remedial_node_agent
+from services.graph_mutations import InsertResult, insert_node_before
+from services.job_queue import enqueue
+from services.metrics import Counter
+from services.path_changes import record_change
+from services.node_catalog import catalog_entries
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Background remedial nodes
+# -----------------------------------------------------------------------------
+#
+# A learner blocked on a node gets a remedial prerequisite spliced in front
+# of it. Generation (an LLM call) runs as a "remedial_node" job in
+# `python -m worker`, queued in the same transaction as the draft; the graph
+# surgery happens as soon as the draft is both ready and requested, by
+# whichever side (generation or the blocking submission) gets there last.
+
+REMEDIAL_DRAFTS = Counter(
+    "remedial_drafts_total",
+    "Remedial draft events (started, speculative_started, ready, failed, "
+    "expired, applied, applied_on_block, discarded)",
+    ["event"],
+)
+
+ACTIVE_STATUSES = (RemedialStatus.PENDING, RemedialStatus.READY)
+
+GENERATE_JOB = "remedial_node"
+
+
+def active_draft(db: Session, user_uuid: UUID, node_id: int) -> Optional[RemedialDraft]:
+    """
+    The learner's pending or ready draft for `node_id`. A draft pending for
+    longer than REMEDIAL_PENDING_TIMEOUT_SECONDS (its job was lost, or no
+    worker is running) is marked failed and not returned, so the caller
+    starts over.
+    """
+    draft = (
+        db.query(RemedialDraft)
+        .filter(
+            RemedialDraft.user_id == user_uuid,
+            RemedialDraft.struggling_node_id == node_id,
+            RemedialDraft.status.in_(ACTIVE_STATUSES),
+        )
+        .order_by(RemedialDraft.id.desc())
+        .first()
+    )
+    stale_before = datetime.utcnow() - timedelta(seconds=REMEDIAL_PENDING_TIMEOUT_SECONDS)
+    if draft is None or draft.status != RemedialStatus.PENDING or draft.created_at >= stale_before:
+        return draft
+
+    expired = (
+        db.query(RemedialDraft)
+        .filter(
+            RemedialDraft.id == draft.id,
+            RemedialDraft.status == RemedialStatus.PENDING,
+        )
+        .update({RemedialDraft.status: RemedialStatus.FAILED}, synchronize_session=False)
+    )
+    if expired:
+        logger.warning(
+            "remedial draft %s: still pending after %ss, giving up",
+            draft.id, REMEDIAL_PENDING_TIMEOUT_SECONDS,
+        )
+        REMEDIAL_DRAFTS.inc(event="expired")
+        return None
+    # Generation finished meanwhile
+    db.refresh(draft)
+    return draft if draft.status in ACTIVE_STATUSES else None
+
+
+def request_remedial(
+    db: Session,
+    *,
+    user_uuid: UUID,
+    path_id: int,
+    node_id: int,
+    adaptation_suggestion: Optional[str],
+    speculative: bool,
+) -> Optional[RemedialDraft]:
+    """
+    Returns the learner's active draft for `node_id`, creating a pending
+    one (and its generation job) if needed. A non-speculative request marks
+    the draft to be applied. Returns None when there is nothing to generate
+    from.
+    """
+    draft = active_draft(db, user_uuid, node_id)
+
+    if draft is None:
+        if not adaptation_suggestion:
+            return None
+        draft = RemedialDraft(
+            user_id=user_uuid,
+            path_id=path_id,
+            struggling_node_id=node_id,
+            status=RemedialStatus.PENDING,
+            speculative=speculative,
+            adaptation_suggestion=adaptation_suggestion,
+        )
+        db.add(draft)
+        db.flush()
+        enqueue(db, GENERATE_JOB, {"draft_id": draft.id})
+        REMEDIAL_DRAFTS.inc(event="speculative_started" if speculative else "started")
+
+    if not speculative:
+        draft.apply_requested = True
+
+    db.flush()
+    return draft
+
+
+def discard_drafts(db: Session, user_uuid: UUID, node_id: int) -> None:
+    """
+    The learner passed: speculative drafts for the node are not needed.
+    """
+    discarded = (
+        db.query(RemedialDraft)
+        .filter(
+            RemedialDraft.user_id == user_uuid,
+            RemedialDraft.struggling_node_id == node_id,
+            RemedialDraft.status.in_(ACTIVE_STATUSES),
+        )
+        .update({RemedialDraft.status: RemedialStatus.DISCARDED}, synchronize_session=False)
+    )
+    if discarded:
+        REMEDIAL_DRAFTS.inc(discarded, event="discarded")
+
+
+def apply_if_requested(db: Session, draft_id: int) -> Optional[InsertResult]:
+    """
+    Splices a ready, requested draft into its path and commits. Safe to call
+    from both the generation task and the request; only one applies it.
+    """
+    draft = (
+        db.query(RemedialDraft)
+        .filter(RemedialDraft.id == draft_id)
+        .with_for_update()
+        .first()
+    )
+    if draft is None or draft.status != RemedialStatus.READY or not draft.apply_requested:
+        db.rollback()
+        return None
+
+    inserted = insert_node_before(
+        db,
+        path_id=draft.path_id,
+        target_node_id=draft.struggling_node_id,
+        catalog_id=draft.catalog_id,
+        user_id=draft.user_id,
+    )
+
+    # The struggling node starts over once its prerequisite is in place
+    db.query(NodeProgress).filter(
+        NodeProgress.user_id == draft.user_id,
+        NodeProgress.node_id == draft.struggling_node_id,
+    ).update(
+        {
+            NodeProgress.status: NodeProgressStatus.NOT_STARTED,
+            NodeProgress.attempts_count: 0,
+            NodeProgress.last_score: None,
+        },
+        synchronize_session=False,
+    )
+    inserted.path_version = record_change(
+        db,
+        draft.path_id,
+        PathChangeType.PROGRESS_CHANGED,
+        {
+            "node_id": draft.struggling_node_id,
+            "status": NodeProgressStatus.NOT_STARTED,
+            "last_score": None,
+            "attempts_count": 0,
+        },
+    )
+
+    draft.status = RemedialStatus.APPLIED
+    draft.node_id = inserted.node_id
+    db.commit()
+
+    REMEDIAL_DRAFTS.inc(event="applied")
+    return inserted
+
+
+def generate_remedial(draft_id: int) -> Dict[str, Any]:
+    """
+    Job handler: generates the draft's node content, then applies it if the
+    learner is already blocked. Uses its own session. Raises when generation
+    fails, so the job is retried; mark_failed runs once retries run out.
+    """
+    db = SessionLocal()
+    try:
+        draft = db.get(RemedialDraft, draft_id)
+        if draft is None or draft.status != RemedialStatus.PENDING:
+            return {"draft_id": draft_id, "status": draft.status if draft else None}
+
+        path = db.get(LearningPath, draft.path_id)
+        struggling_node = db.get(PathNode, draft.struggling_node_id)
+
+        remedial_node_data = run_remedial_node_agent(
+            user_id=str(draft.user_id),
+            goal_title=path.goal_title,
+            struggling_node_title=struggling_node.title,
+            adaptation_suggestion=draft.adaptation_suggestion,
+        )
+        entry = catalog_entries(db, [remedial_node_data])[0]
+
+        # The draft may have been discarded while the agent ran
+        ready = (
+            db.query(RemedialDraft)
+            .filter(
+                RemedialDraft.id == draft_id,
+                RemedialDraft.status == RemedialStatus.PENDING,
+            )
+            .update(
+                {
+                    RemedialDraft.status: RemedialStatus.READY,
+                    RemedialDraft.catalog_id: entry.id,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+
+        if not ready:
+            return {"draft_id": draft_id, "status": RemedialStatus.DISCARDED}
+        REMEDIAL_DRAFTS.inc(event="ready")
+        inserted = apply_if_requested(db, draft_id)
+        return {
+            "draft_id": draft_id,
+            "status": RemedialStatus.APPLIED if inserted else RemedialStatus.READY,
+            "node_id": inserted.node_id if inserted else None,
+        }
+    finally:
+        db.close()
+
+
+def mark_failed(draft_id: int) -> None:
+    """
+    Gives up on a draft whose generation job failed for good. The learner's
+    next blocking submission starts a new one.
+    """
+    db = SessionLocal()
+    try:
+        failed = (
+            db.query(RemedialDraft)
+            .filter(
+                RemedialDraft.id == draft_id,
+                RemedialDraft.status == RemedialStatus.PENDING,
+            )
+            .update({RemedialDraft.status: RemedialStatus.FAILED}, synchronize_session=False)
+        )
+        db.commit()
+        if failed:
+            logger.warning("remedial draft %s: generation failed", draft_id)
+            REMEDIAL_DRAFTS.inc(event="failed")
+    finally:
+        db.close()
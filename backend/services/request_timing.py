@@ -0,0 +1,360 @@
+# services/request_timing.py
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import (
+    REQUEST_PROFILE_DIR,
+    REQUEST_PROFILE_INTERVAL_SECONDS,
+    REQUEST_PROFILING_ENABLED,
+    SLOW_REQUEST_MAX_EVENTS,
+    SLOW_REQUEST_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+slow_request_logger = logging.getLogger("traverse.slow_request")
+
+# -----------------------------------------------------------------------------
+# Request timeline
+# -----------------------------------------------------------------------------
+#
+# TimingMiddleware opens a RequestTimeline per request and exposes it through
+# a context variable. Sync handlers and dependencies run in the threadpool
+# with a copy of the context, so they record into the same timeline:
+#
+# - auth: core.auth.verify_supabase_jwt
+# - sql: every statement, via cursor execute events on all engines
+# - llm: every call_gemini / stream_gemini, with the agent
+# - handler: the endpoint function itself (TimedRoute)
+# - serialize: from the endpoint's return to the response start (response
+#   model validation and JSON encoding)
+#
+# The per-phase totals go out as a Server-Timing header. Requests slower than
+# SLOW_REQUEST_SECONDS are logged as one JSON line with every event. Phases
+# overlap: sql and llm run inside handler.
+
+_current: contextvars.ContextVar[Optional["RequestTimeline"]] = contextvars.ContextVar(
+    "request_timeline", default=None
+)
+
+
+class RequestTimeline:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        # (phase, start offset, duration, detail)
+        self.events: List[Tuple[str, float, float, Optional[str]]] = []
+        self.handler_done: Optional[float] = None
+        # Last body chunk sent; background tasks run after it
+        self.response_done: Optional[float] = None
+        self.threads: set = set()
+        self.profile_path: Optional[str] = None
+        self.closed = False
+
+    def record(self, phase: str, started: float, duration: float, detail: Optional[str] = None) -> None:
+        # list.append is atomic; handler threads and the event loop may both record
+        if not self.closed:
+            self.events.append((phase, started - self.started, duration, detail))
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        totals: Dict[str, Tuple[float, int]] = {}
+        for phase, _, duration, _ in list(self.events):
+            total, count = totals.get(phase, (0.0, 0))
+            totals[phase] = (total + duration, count + 1)
+        return totals
+
+    def server_timing(self, total: float) -> str:
+        parts = [
+            f'{phase};dur={duration * 1000:.1f};desc="{count}x"'
+            for phase, (duration, count) in self.totals().items()
+        ]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current() -> Optional[RequestTimeline]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str, detail: Optional[str] = None) -> Iterator[None]:
+    """
+    Times the block as `name` in the current request's timeline (no-op
+    outside a request).
+    """
+    timeline = _current.get()
+    if timeline is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timeline.record(name, started, time.perf_counter() - started, detail)
+
+
+def record(name: str, duration: float, detail: Optional[str] = None) -> None:
+    """
+    Records a phase that just ended after `duration` seconds.
+    """
+    timeline = _current.get()
+    if timeline is not None:
+        timeline.record(name, time.perf_counter() - duration, duration, detail)
+
+
+# -----------------------------------------------------------------------------
+# SQL statements
+# -----------------------------------------------------------------------------
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("request_timing_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timeline = _current.get()
+    stack = conn.info.get("request_timing_started")
+    if timeline is None or not stack:
+        return
+    started = stack.pop()
+    timeline.record("sql", started, time.perf_counter() - started, " ".join(statement.split())[:200])
+
+
+# -----------------------------------------------------------------------------
+# Endpoint timing
+# -----------------------------------------------------------------------------
+
+
+def _timed(endpoint):
+    def begin() -> Tuple[Optional[RequestTimeline], float]:
+        timeline = _current.get()
+        if timeline is not None:
+            timeline.threads.add(threading.get_ident())
+        return timeline, time.perf_counter()
+
+    def done(timeline: Optional[RequestTimeline], started: float) -> None:
+        if timeline is not None:
+            now = time.perf_counter()
+            timeline.record("handler", started, now - started)
+            timeline.handler_done = now
+            # The threadpool thread moves on to other requests
+            timeline.threads.discard(threading.get_ident())
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            timeline, started = begin()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                done(timeline, started)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            timeline, started = begin()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                done(timeline, started)
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    route_class for APIRouters: times the endpoint call ("handler") and
+    marks where serialization starts.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed(endpoint), **kwargs)
+
+
+# -----------------------------------------------------------------------------
+# Sampling profiler
+# -----------------------------------------------------------------------------
+#
+# Opt-in (REQUEST_PROFILING_ENABLED) per request with an `X-Profile: 1`
+# header. A thread samples the stacks of the threads running the request's
+# endpoint every REQUEST_PROFILE_INTERVAL_SECONDS; the result is written to
+# REQUEST_PROFILE_DIR as an indented call tree (time and share per frame)
+# followed by collapsed stacks for flame graph tools.
+
+
+class SamplingProfiler(threading.Thread):
+    def __init__(self, timeline: RequestTimeline, interval: float = REQUEST_PROFILE_INTERVAL_SECONDS):
+        super().__init__(name="request-profiler", daemon=True)
+        self.timeline = timeline
+        self.interval = interval
+        self.stacks: Dict[Tuple[str, ...], int] = {}
+        self.samples = 0
+        self._done = threading.Event()
+
+    @staticmethod
+    def _stack(frame) -> Tuple[str, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.timeline.threads):
+                frame = frames.get(ident)
+                if frame is None or ident == me:
+                    continue
+                stack = self._stack(frame)
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+    def render(self) -> str:
+        tree: Dict[str, Any] = {}
+        for stack, count in self.stacks.items():
+            node = tree
+            for frame in stack:
+                child = node.setdefault(frame, {"count": 0, "children": {}})
+                child["count"] += count
+                node = child["children"]
+
+        total = max(self.samples, 1)
+        lines = [
+            f"{self.timeline.method} {self.timeline.path}: {self.samples} samples "
+            f"every {self.interval * 1000:.0f} ms"
+        ]
+
+        def walk(children: Dict[str, Any], depth: int) -> None:
+            for frame, node in sorted(children.items(), key=lambda item: -item[1]["count"]):
+                share = node["count"] / total
+                if share < 0.01:
+                    continue
+                lines.append(
+                    f"{'  ' * depth}{node['count'] * self.interval:7.3f}s {share:6.1%}  {frame}"
+                )
+                walk(node["children"], depth + 1)
+
+        walk(tree, 0)
+        lines.append("")
+        lines.append("# collapsed stacks")
+        lines.extend(f"{';'.join(stack)} {count}" for stack, count in self.stacks.items())
+        return "\n".join(lines) + "\n"
+
+    def dump(self) -> str:
+        os.makedirs(REQUEST_PROFILE_DIR, exist_ok=True)
+        name = "-".join([
+            datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"),
+            self.timeline.method,
+            self.timeline.path.strip("/").replace("/", "_") or "root",
+        ])
+        path = os.path.join(REQUEST_PROFILE_DIR, f"{name}.txt")
+        with open(path, "w") as f:
+            f.write(self.render())
+        return path
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeline = RequestTimeline(scope["method"], scope["path"])
+        token = _current.set(timeline)
+
+        profiler = None
+        if REQUEST_PROFILING_ENABLED and (b"x-profile", b"1") in scope.get("headers", []):
+            profiler = SamplingProfiler(timeline)
+            profiler.start()
+
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status, profiler
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timeline.handler_done is not None:
+                    timeline.record("serialize", timeline.handler_done, now - timeline.handler_done)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timeline.server_timing(now - timeline.started).encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                timeline.response_done = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            end = timeline.response_done or time.perf_counter()
+            total = end - timeline.started
+            if profiler is not None:
+                profiler.stop()
+                timeline.profile_path = profiler.dump()
+                logger.info("request profile: %s", timeline.profile_path)
+            if total >= SLOW_REQUEST_SECONDS:
+                self._log_slow(scope, timeline, status, total)
+            timeline.closed = True
+
+    @staticmethod
+    def _log_slow(scope, timeline: RequestTimeline, status: int, total: float) -> None:
+        route = getattr(scope.get("route"), "path", None)
+        events = sorted(timeline.events, key=lambda e: e[1])
+        slow_request_logger.warning(json.dumps({
+            "event": "slow_request",
+            "method": timeline.method,
+            "path": timeline.path,
+            "route": route,
+            "status": status,
+            "total_ms": round(total * 1000, 1),
+            # Time spent in background tasks after the response
+            "background_ms": round((time.perf_counter() - timeline.started - total) * 1000, 1),
+            "phases": {
+                phase: {"ms": round(duration * 1000, 1), "count": count}
+                for phase, (duration, count) in timeline.totals().items()
+            },
+            "events": [
+                {
+                    "phase": phase,
+                    "start_ms": round(offset * 1000, 1),
+                    "ms": round(duration * 1000, 1),
+                    **({"detail": detail} if detail else {}),
+                }
+                for phase, offset, duration, detail in events[:SLOW_REQUEST_MAX_EVENTS]
+            ],
+            "events_dropped": max(len(events) - SLOW_REQUEST_MAX_EVENTS, 0),
+            "profile": timeline.profile_path,
+        }))
@@ -0,0 +1,170 @@
+# tests/test_query_budgets.py
+"""
+Query budgets for the read routes, served through the app's
+QueryCountMiddleware. A lazy load sneaking into a loop shows up as one
+statement shape repeated per node or per path. Run from backend/:
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+
+Uses a throwaway SQLite database unless TEST_DATABASE_URL is set.
+"""
+
+import os
+import tempfile
+import uuid
+
+import pytest
+
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL",
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_budgets.db"),
+)
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+# core.config insists on these; nothing here calls the LLM
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("GEMINI_MODEL", "test")
+
+# Skips (rather than failing collection) without the app's dependencies
+main = pytest.importorskip("main", exc_type=ImportError)
+
+from fastapi.testclient import TestClient
+
+from core.auth import AuthenticatedUser, get_current_user, get_current_user_id, get_optional_user
+from db import SessionLocal, engine
+from models import (
+    Base, LearningPath, NodeProgress, NodeProgressStatus, PathChangeType, PathEdge,
+    PathNode, User,
+)
+from services.frontier import build_frontier
+from services.layouts import store_layout
+from services.node_catalog import catalog_entries
+from services.path_changes import record_change
+from services.query_budget import query_budget
+from services.reachability import index_path
+
+# Letters in the hex: SQLite hands back an all-digit UUID as an int
+USER_ID = uuid.UUID("0a1b2c3d-4e5f-4a6b-8c7d-9e0f1a2b3c4d")
+
+NODES = 12
+PATHS = 5
+
+# Every statement shape at most twice per request: one per node or per
+# path fails no matter how small the fixture is.
+MAX_REPEATS = 2
+
+
+def _create_path(db, goal_title: str) -> LearningPath:
+    """
+    A chain of NODES nodes (plus a shortcut edge), with progress, frontier,
+    reachability index, layout and a few logged changes.
+    """
+    lp = LearningPath(user_id=USER_ID, goal_title=goal_title, summary="s")
+    db.add(lp)
+    db.flush()
+
+    entries = catalog_entries(db, [
+        {"title": f"{goal_title} {i}", "description": "d", "node_type": "concept"}
+        for i in range(NODES)
+    ])
+    nodes = [PathNode(path_id=lp.id, catalog_id=entry.id) for entry in entries]
+    db.add_all(nodes)
+    db.flush()
+
+    db.add_all([
+        NodeProgress(
+            user_id=USER_ID,
+            node_id=n.id,
+            status=NodeProgressStatus.COMPLETED if i < 2 else NodeProgressStatus.NOT_STARTED,
+            attempts_count=1 if i < 2 else 0,
+        )
+        for i, n in enumerate(nodes)
+    ])
+    db.add_all([
+        PathEdge(path_id=lp.id, from_node_id=a.id, to_node_id=b.id)
+        for a, b in zip(nodes, nodes[1:])
+    ])
+    db.add(PathEdge(path_id=lp.id, from_node_id=nodes[0].id, to_node_id=nodes[3].id))
+    db.flush()
+
+    build_frontier(db, USER_ID, lp.id)
+    index_path(db, lp.id)
+    store_layout(db, lp.id)
+    for n in nodes[:3]:
+        record_change(db, lp.id, PathChangeType.PROGRESS_CHANGED, {"node_id": n.id})
+    db.commit()
+    return lp
+
+
+@pytest.fixture(scope="module")
+def path():
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        db.add(User(id=USER_ID, email="budget@example.com"))
+        db.flush()
+        paths = [_create_path(db, f"goal {i}") for i in range(PATHS)]
+        yield {
+            "id": paths[-1].id,
+            "version": paths[-1].version,
+            "node_ids": [n.id for n in paths[-1].nodes],
+        }
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture(scope="module")
+def client(path):
+    user = AuthenticatedUser(user_id=str(USER_ID))
+    app = main.app
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_current_user_id] = lambda: user.id
+    app.dependency_overrides[get_optional_user] = lambda: user
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+def _get(client, url: str):
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_path_read_routes(client, path):
+    path_id = path["id"]
+    middle = path["node_ids"][NODES // 2]
+
+    with query_budget(
+        {
+            "/api/paths/{path_id}": 5,
+            "/api/paths/{path_id}/frontier": 3,
+            "/api/paths/{path_id}/progress": 4,
+            "/api/paths/{path_id}/changes": 3,
+            "/api/paths/{path_id}/nodes/{node_id}/dependencies": 5,
+        },
+        max_repeats=MAX_REPEATS,
+    ) as seen:
+        body = _get(client, f"/api/paths/{path_id}?include_layout=true")
+        assert len(body["nodes"]) == NODES and body["layout"]
+        _get(client, f"/api/paths/{path_id}/frontier")
+        _get(client, f"/api/paths/{path_id}/progress")
+        body = _get(client, f"/api/paths/{path_id}/changes?since={path['version'] - 2}")
+        assert len(body["changes"]) == 2
+        body = _get(client, f"/api/paths/{path_id}/nodes/{middle}/dependencies")
+        assert body["ancestors"] and body["descendants"]
+
+    assert len(seen) == 5
+
+
+def test_list_paths(client, path):
+    with query_budget({"/api/paths": 4}, max_repeats=MAX_REPEATS) as seen:
+        body = _get(client, "/api/paths")
+        assert len(body) == PATHS
+        assert all(len(p["nodes"]) == NODES and p["version"] for p in body)
+
+    assert len(seen) == 1
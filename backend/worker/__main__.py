@@ -0,0 +1,201 @@
+# worker/__main__.py
+#
+# Standalone agent worker. Run from backend/:
+#
+#   python -m worker                                # every job type
+#   python -m worker --types remedial_node --concurrency remedial_node=8
+#   python -m worker --once                         # drain the queue and exit
+#
+# Uses DATABASE_URL like the API, so a local SQLite database works as a
+# stand-in for Postgres (but events from jobs, e.g. a spliced-in remedial
+# node, then reach no /api/events stream).
+
+import argparse
+import logging
+import signal
+import socket
+import threading
+import time
+import traceback
+from typing import Dict, Tuple
+
+from core.config import (
+    JOB_CONCURRENCY,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+)
+from db import SessionLocal, engine
+from services.events import publish_over_notify
+from services.job_queue import claim, complete, fail, heartbeat, queue_depths
+from services.metrics import start_flusher
+from worker.handlers import HANDLERS, ON_FAILURE
+
+logger = logging.getLogger("worker")
+
+DEPTH_INTERVAL_SECONDS = 15.0
+
+
+class Worker:
+    def __init__(self, concurrency: Dict[str, int], once: bool = False):
+        self.concurrency = concurrency
+        self.once = once
+        self.name = f"{socket.gethostname()}:{id(self):x}"
+        self.stop = threading.Event()
+        # slot name -> (job id, lease) of the job it is running
+        self._running: Dict[str, Tuple[int, str]] = {}
+        self._running_lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Slots
+    # -------------------------------------------------------------------------
+
+    def _run_one(self, job_type: str, slot: str) -> bool:
+        """
+        Claims and runs one job. False when the queue was empty.
+        """
+        db = SessionLocal()
+        try:
+            job = claim(db, job_type, slot)
+            if job is None:
+                return False
+
+            with self._running_lock:
+                self._running[slot] = (job.id, job.locked_by)
+
+            started = time.monotonic()
+            try:
+                result = HANDLERS[job_type](job.payload)
+            except Exception:
+                logger.warning("job %s (%s) attempt %s failed", job.id, job_type, job.attempts)
+                failed = fail(db, job, traceback.format_exc(limit=5), time.monotonic() - started)
+                if failed and job.attempts >= job.max_attempts and job_type in ON_FAILURE:
+                    ON_FAILURE[job_type](job.payload)
+            else:
+                complete(db, job, result, time.monotonic() - started)
+            finally:
+                with self._running_lock:
+                    self._running.pop(slot, None)
+            return True
+        finally:
+            db.close()
+
+    def _slot_loop(self, job_type: str, slot: str) -> None:
+        while not self.stop.is_set():
+            try:
+                worked = self._run_one(job_type, slot)
+            except Exception:
+                logger.exception("slot %s: queue error", slot)
+                worked = False
+            if not worked:
+                if self.once:
+                    return
+                self.stop.wait(JOB_POLL_INTERVAL_SECONDS)
+
+    # -------------------------------------------------------------------------
+    # Housekeeping
+    # -------------------------------------------------------------------------
+
+    def _heartbeat_loop(self) -> None:
+        while not self.stop.wait(JOB_VISIBILITY_TIMEOUT_SECONDS / 3):
+            with self._running_lock:
+                leases = list(self._running.values())
+            if not leases:
+                continue
+            db = SessionLocal()
+            try:
+                for job_id, lease in leases:
+                    if not heartbeat(db, job_id, lease):
+                        logger.warning("job %s: lease lost", job_id)
+            except Exception:
+                logger.exception("heartbeat failed")
+            finally:
+                db.close()
+
+    def _depth_loop(self) -> None:
+        while not self.stop.is_set():
+            db = SessionLocal()
+            try:
+                depths = queue_depths(db)
+                logger.info("queue depth %s", depths or "{}")
+            except Exception:
+                logger.exception("queue depth query failed")
+            finally:
+                db.close()
+            self.stop.wait(DEPTH_INTERVAL_SECONDS)
+
+    # -------------------------------------------------------------------------
+    # Entry point
+    # -------------------------------------------------------------------------
+
+    def run(self) -> None:
+        slots = []
+        for job_type, count in self.concurrency.items():
+            for i in range(count):
+                slot = f"{self.name}/{job_type}-{i}"
+                slots.append(threading.Thread(
+                    target=self._slot_loop, args=(job_type, slot), name=slot
+                ))
+
+        housekeeping = [
+            threading.Thread(target=self._heartbeat_loop, name="heartbeat", daemon=True),
+            threading.Thread(target=self._depth_loop, name="queue-depth", daemon=True),
+        ]
+
+        logger.info("worker %s starting: %s", self.name, self.concurrency)
+        for thread in housekeeping + slots:
+            thread.start()
+
+        # Slots finish their current job before exiting
+        for thread in slots:
+            while thread.is_alive():
+                thread.join(timeout=1.0)
+
+        self.stop.set()
+        logger.info("worker %s stopped", self.name)
+
+
+def _parse_concurrency(types: str, overrides: str) -> Dict[str, int]:
+    selected = [t for t in types.split(",") if t] if types else list(JOB_CONCURRENCY)
+    concurrency = {t: JOB_CONCURRENCY.get(t, 1) for t in selected}
+    for item in filter(None, (overrides or "").split(",")):
+        job_type, _, count = item.partition("=")
+        concurrency[job_type] = int(count)
+
+    unknown = set(concurrency) - set(HANDLERS)
+    if unknown:
+        raise SystemExit(f"unknown job types: {', '.join(sorted(unknown))}")
+    return {t: n for t, n in concurrency.items() if n > 0}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m worker", description="Agent job worker")
+    parser.add_argument("--types", default="", help="comma-separated job types (default: all)")
+    parser.add_argument("--concurrency", default="", help="e.g. remedial_node=4,challenge_pool_refill=8")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(threadName)s %(message)s",
+    )
+
+    worker = Worker(_parse_concurrency(args.types, args.concurrency), once=args.once)
+
+    def shutdown(signum, frame):
+        logger.info("signal %s: finishing running jobs", signum)
+        worker.stop.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # LLM and job metrics show up in the API's /metrics when
+    # METRICS_MULTIPROC_DIR is shared
+    start_flusher()
+    # The worker serves no streams; its events go to the API processes
+    if not publish_over_notify(engine):
+        logger.warning("events: no NOTIFY on %s, job events reach no stream", engine.dialect.name)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# worker/handlers.py
+
+from typing import Any, Callable, Dict
+
+from services.challenge_pool import REFILL_JOB, refill_pool
+from services.remedial import GENERATE_JOB, generate_remedial, mark_failed
+
+# -----------------------------------------------------------------------------
+# Job handlers
+# -----------------------------------------------------------------------------
+#
+# One handler per job type. A handler receives the job payload, persists its
+# output itself and returns a small JSON-serializable summary, stored on the
+# job. Raising marks the attempt as failed and schedules a retry; once the
+# job runs out of attempts its ON_FAILURE hook (if any) runs.
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    # Queued by services.challenge_pool.get_pooled_challenge
+    REFILL_JOB: lambda payload: refill_pool(**payload),
+    # Queued by services.remedial.request_remedial
+    GENERATE_JOB: lambda payload: generate_remedial(payload["draft_id"]),
+}
+
+ON_FAILURE: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    GENERATE_JOB: lambda payload: mark_failed(payload["draft_id"]),
+}
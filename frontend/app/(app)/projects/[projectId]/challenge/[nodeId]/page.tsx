@@ -165,6 +165,14 @@ export default function ChallengePage({
                 {tutorResult.feedback_summary}
               </p>
 
+              {tutorResult.remedial_node && (
+                <p className="mt-4 text-sm text-muted">
+                  {tutorResult.remedial_node.status === "applied"
+                    ? "A new prerequisite node was added to your learning path."
+                    : "We're preparing a prerequisite node for this topic. It will appear in your learning path shortly."}
+                </p>
+              )}
+
               {tutorResult.suggestions.length > 0 && (
                 <div className="mt-4">
                     <h3 className="font-semibold">Suggestions for Improvement:</h3>
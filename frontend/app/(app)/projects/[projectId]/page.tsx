@@ -2,14 +2,20 @@
 
 import { useEffect, useState, useMemo } from "react";
 import { useSearchParams } from 'next/navigation';
-import { fetchProject, fetchPathProgress, PathProgress } from "@/lib/paths";
+import { fetchProject, fetchPathProgress, PathProgress, PathLayout } from "@/lib/paths";
 import DagView from "@/components/dag/DagView";
 import NodeDetailsPanel from "@/components/dag/NodeDetailsPanel";
 import Notification from "@/components/ui/Notification";
 import { Node, Edge } from "reactflow";
 
-// Helper function to perform a simple layout
-const getLayoutedElements = (nodes: any[], edges: any[], progress: PathProgress | null) => {
+// Builds the React Flow elements. Positions come from the backend's
+// precomputed layout; the grid is only a fallback.
+const getLayoutedElements = (
+  nodes: any[],
+  edges: any[],
+  progress: PathProgress | null,
+  layout: PathLayout | null
+) => {
   const isNodeLocked = (nodeId: number, progressMap: any, allEdges: any[]): boolean => {
     const prereqs = allEdges
       .filter((e) => e.to_node_id === nodeId)
@@ -23,6 +29,10 @@ const getLayoutedElements = (nodes: any[], edges: any[], progress: PathProgress
     ? Object.fromEntries(progress.nodes.map((p: any) => [p.node_id, p]))
     : {};
 
+  const positions = layout
+    ? Object.fromEntries(layout.nodes.map((p) => [p.node_id, { x: p.x, y: p.y }]))
+    : {};
+
   const layoutedNodes: Node[] = nodes.map((node, i) => {
     const nodeProgress = progressMap[node.id];
     const locked = isNodeLocked(node.id, progressMap, edges);
@@ -40,7 +50,7 @@ const getLayoutedElements = (nodes: any[], edges: any[], progress: PathProgress
         estimated_minutes: node.estimated_minutes,
         status: status,
        },
-      position: { x: (i % 4) * 250, y: Math.floor(i / 4) * 150 },
+      position: positions[node.id] ?? { x: (i % 4) * 250, y: Math.floor(i / 4) * 150 },
       style: {
         background: backgroundColor,
         color: 'white',
@@ -108,7 +118,7 @@ export default function ProjectDetailPage({
 
   const { layoutedNodes, layoutedEdges } = useMemo(() => {
     if (!project) return { layoutedNodes: [], layoutedEdges: [] };
-    return getLayoutedElements(project.nodes, project.edges, progress);
+    return getLayoutedElements(project.nodes, project.edges, progress, project.layout);
   }, [project, progress]);
 
 
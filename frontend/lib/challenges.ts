@@ -5,11 +5,21 @@ export type Challenge = {
   prompt: string;
 };
 
+// Set when the learner is blocked: a remedial node is being generated
+// ("pending", the path version increases once it is inserted) or was
+// inserted already ("applied").
+export type RemedialNodeStatus = {
+  status: "pending" | "applied";
+  node_id: number | null;
+  path_version: number;
+};
+
 export type TutorResult = {
   score: number;
   pass_node: boolean;
   feedback_summary: string;
   suggestions: string[];
+  remedial_node?: RemedialNodeStatus | null;
 };
 
 export type Hint = {
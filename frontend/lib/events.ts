@@ -0,0 +1,27 @@
+// lib/events.ts
+import { apiStream } from "./api";
+import type { PathChange } from "./paths";
+
+export type UserEvent =
+  | { type: "subscribed" }
+  | { type: "ping" }
+  // Events may have been missed: refetch via fetchPathChanges
+  | { type: "resync" }
+  | ({ type: "path_change"; path_id: number; truncated?: boolean } & PathChange)
+  | {
+      type: "challenge_created";
+      path_id: number;
+      node_id: number;
+      challenge_id: number;
+    };
+
+// Pushes the signed-in user's events as they are committed. Resolves when
+// the stream ends; abort `signal` to close it. A path_change whose version
+// is not the last seen + 1 (or that is `truncated`) means deltas were
+// missed: catch up with fetchPathChanges.
+export async function subscribeToEvents(
+  onEvent: (event: UserEvent) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  return apiStream<UserEvent>("/api/events", { signal }, onEvent);
+}
@@ -1,5 +1,5 @@
 // lib/paths.ts
-import { apiFetch } from "./api";
+import { apiFetch, apiStream } from "./api";
 
 export interface LearningPath {
   id: number;
@@ -28,12 +28,64 @@ export async function createPath(payload: {
   });
 }
 
+export type PathStreamEvent =
+  | { type: "research_complete"; competencies_count: number }
+  | { type: "path"; id: number; goal_title: string }
+  | { type: "summary"; summary: string }
+  | {
+      type: "node";
+      node: {
+        id: number;
+        title: string;
+        description: string;
+        node_type: string;
+        estimated_minutes?: number;
+        metadata_json?: any;
+      };
+    }
+  | { type: "edge"; edge: { from_node_id: number; to_node_id: number } }
+  | { type: "edge_removed"; edge: { from_node_id: number; to_node_id: number } }
+  | { type: "node_removed"; node_id: number }
+  | { type: "done"; path: any }
+  | { type: "error"; detail: string };
+
+// Same as createPath, but reports nodes and edges as the backend persists
+// them so the graph view can render the path progressively.
+export async function streamPath(
+  payload: {
+    goal_title: string;
+    goal_description?: string;
+    domain_hint?: string;
+    level?: string;
+    user_background?: string;
+  },
+  onEvent: (event: PathStreamEvent) => void
+): Promise<void> {
+  return apiStream<PathStreamEvent>(
+    "/api/paths/stream",
+    {
+      method: "POST",
+      body: JSON.stringify(payload),
+    },
+    onEvent
+  );
+}
+
+// Node coordinates precomputed by the backend for one path version
+export type PathLayout = {
+  version: number;
+  width: number;
+  height: number;
+  nodes: { node_id: number; x: number; y: number; layer: number }[];
+};
+
 export async function fetchProject(projectId: string) {
   // Renamed to fetchPath for consistency, but kept fetchProject for now
   // to avoid breaking other parts of the app if they use it.
   // Ideally, this should also return LearningPath
   return apiFetch<{
     id: number;
+    version: number;
     goal_title: string;
     summary: string;
     nodes: {
@@ -48,7 +100,8 @@ export async function fetchProject(projectId: string) {
       from_node_id: number;
       to_node_id: number;
     }[];
-  }>(`/api/paths/${projectId}`);
+    layout: PathLayout | null;
+  }>(`/api/paths/${projectId}?include_layout=true`);
 }
 
 export type NodeProgress = {
@@ -71,3 +124,71 @@ export async function fetchPathProgress(
   return apiFetch(`/api/paths/${projectId}/progress`);
 }
 
+
+export type FrontierNode = {
+  node_id: number;
+  title: string;
+  node_type: string;
+  estimated_minutes: number | null;
+  last_score: number | null;
+  attempts_count: number;
+};
+
+export type PathFrontier = {
+  path_id: number;
+  path_version: number;
+  available: FrontierNode[];
+  in_progress: FrontierNode[];
+  blocked: FrontierNode[];
+};
+
+// The nodes the learner can work on next, computed by the backend.
+export async function fetchPathFrontier(
+  projectId: string
+): Promise<PathFrontier> {
+  return apiFetch(`/api/paths/${projectId}/frontier`);
+}
+
+
+type PathNodeState = Omit<NodeProgress, "title">;
+
+export type PathChange =
+  | {
+      version: number;
+      change_type: "node_added";
+      payload: {
+        node: Awaited<ReturnType<typeof fetchProject>>["nodes"][number];
+        progress: PathNodeState;
+        edges_added: [number, number][];
+        edges_removed: [number, number][];
+      };
+    }
+  | {
+      version: number;
+      change_type: "edge_added";
+      payload: { from_node_id: number; to_node_id: number };
+    }
+  | {
+      version: number;
+      change_type: "progress_changed";
+      payload: PathNodeState;
+    };
+
+export type PathChanges = {
+  path_id: number;
+  version: number;
+  changes: PathChange[];
+  // Set instead of `changes` when the log no longer reaches back to `since`
+  snapshot: {
+    path: Awaited<ReturnType<typeof fetchProject>>;
+    progress: PathNodeState[];
+  } | null;
+};
+
+// Everything that changed after `since` (a path's `version`), oldest first.
+export async function fetchPathChanges(
+  projectId: string,
+  since: number
+): Promise<PathChanges> {
+  return apiFetch(`/api/paths/${projectId}/changes?since=${since}`);
+}